@@ -0,0 +1,65 @@
+"""
+Which projects and tasks a user may see and edit.
+
+A user sees the projects they own and the projects they have tasks assigned in, and the tasks of
+those projects; staff see everything. The project ids are computed with one query and kept on
+the request, so a request computes them at most once. They are not cached across requests:
+an authorization decision must not wait for a cache invalidation to reach this process. The
+permission classes compare ids against these sets and never load related objects.
+"""
+from django.db.models import Q, Value
+
+from .models import Project, Task
+
+
+def _project_ids(user):
+    # one UNION of the two id-only queries
+    owned = Project.objects.filter(owner_id=user.pk).annotate(kind=Value('owned')).values_list('id', 'kind')
+    assigned = Task.objects.filter(assignee_id=user.pk).annotate(kind=Value('assigned')).values_list('project_id', 'kind')
+    ids = {'owned': set(), 'assigned': set()}
+    for project_id, kind in owned.order_by().union(assigned.order_by()):
+        ids[kind].add(project_id)
+    return ids
+
+
+def project_ids(request):
+    """{'owned': ids, 'assigned': ids} of the projects the user owns and has tasks assigned in."""
+    ids = getattr(request, '_access_project_ids', None)
+    if ids is None:
+        ids = request._access_project_ids = _project_ids(request.user)
+    return ids
+
+
+def owned_project_ids(request):
+    return project_ids(request)['owned']
+
+
+def visible_project_ids(request):
+    ids = project_ids(request)
+    return ids['owned'] | ids['assigned']
+
+
+def sees_everything(user):
+    return user.is_staff
+
+
+def visible_tasks(request, queryset):
+    if sees_everything(request.user):
+        return queryset
+    return queryset.filter(project_id__in=visible_project_ids(request))
+
+
+def visible_tasks_lazily(user, queryset):
+    """visible_tasks() with subqueries instead of the ids, for querysets built before they may run, e.g. prefetches."""
+    if sees_everything(user):
+        return queryset
+    assigned = Task.objects.filter(assignee_id=user.pk).values('project_id')
+    return queryset.filter(Q(project__owner_id=user.pk) | Q(project_id__in=assigned))
+
+
+def can_see_task(request, task):
+    return sees_everything(request.user) or task.project_id in visible_project_ids(request)
+
+
+def can_edit_task(request, task):
+    return task.assignee_id == request.user.id or task.project_id in owned_project_ids(request)
@@ -1,7 +1,9 @@
 # api/admin.py
 
 from django.contrib import admin
+from django.db import transaction
 from .models import Project, Task, WorkLog
+from .task_events import acting_as
 
 
 class TaskInline(admin.TabularInline):
@@ -13,6 +15,7 @@ class TaskInline(admin.TabularInline):
 
 class WorkLogInline(admin.TabularInline):
     model = WorkLog
+    fk_name = 'project'
     extra = 1
     fields = ('user', 'date', 'hours_spent', 'description')
     autocomplete_fields = ['user']
@@ -38,6 +41,10 @@ class ProjectAdmin(admin.ModelAdmin):
     )
     inlines = [TaskInline, WorkLogInline]
 
+    def save_formset(self, request, form, formset, change):
+        with acting_as(request.user):
+            super().save_formset(request, form, formset, change)
+
 
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
@@ -65,13 +72,28 @@ class TaskAdmin(admin.ModelAdmin):
 
     @admin.action(description='Mark selected tasks as DONE')
     def mark_as_done_action(self, request, queryset):
-        queryset.update(status='DONE')
-        self.message_user(request, f"{queryset.count()} tasks were successfully marked as DONE.")
+        # save() each task instead of queryset.update() so completed_at and the rollups follow
+        tasks = self.set_status(request, queryset, 'DONE')
+        self.message_user(request, f"{len(tasks)} tasks were successfully marked as DONE.")
 
     @admin.action(description='Mark selected tasks as IN_PROGRESS')
     def mark_as_in_progress_action(self, request, queryset):
-        queryset.update(status='IN_PROGRESS')
-        self.message_user(request, f"{queryset.count()} tasks were successfully marked as IN_PROGRESS.")
+        tasks = self.set_status(request, queryset, 'IN_PROGRESS')
+        self.message_user(request, f"{len(tasks)} tasks were successfully marked as IN_PROGRESS.")
+
+    @staticmethod
+    @transaction.atomic
+    def set_status(request, queryset, status):
+        tasks = list(queryset.exclude(status=status))
+        with acting_as(request.user):
+            for task in tasks:
+                task.status = status
+                task.save(update_fields=['status', 'updated_at'])
+        return tasks
+
+    def save_model(self, request, obj, form, change):
+        with acting_as(request.user):
+            super().save_model(request, obj, form, change)
 
     actions = [mark_as_done_action, mark_as_in_progress_action]
 
@@ -0,0 +1,179 @@
+"""
+Async (ASGI-native) versions of the chart and dashboard endpoints, mounted under /api/v1/async/.
+
+They use the async ORM and aget_chart_url, so under an ASGI server
+(e.g. `uvicorn employeest_be.asgi:application`) a single worker keeps serving other requests
+while it waits on the database or on QuickChart. Responses match the sync endpoints.
+
+The task change feed (api.task_feed) is only served here: each open stream is a coroutine waiting
+on its queue, not a worker thread.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from . import access, charts, task_feed
+from .dashboards import owned_projects_with_task_counts, owner_summary_stats
+from .models import Project, Task
+from .quickchart_helper import aget_chart_url
+from .serializers import ProjectSerializer, ProjectSummarySerializer, TaskSerializer
+
+
+def _drf_user(request):
+    drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    try:
+        return drf_request.user
+    except APIException:
+        return AnonymousUser()
+
+
+async def aget_user(request):
+    user = await request.auser()
+    if user.is_authenticated or 'HTTP_AUTHORIZATION' not in request.META:
+        return user
+    # fall back to the REST framework authenticators (e.g. basic auth) accepted by the sync views
+    return await sync_to_async(_drf_user)(request)
+
+
+async def achart_response(request, chart_config):
+    chart_url = await aget_chart_url(chart_config)
+    if chart_url:
+        return JsonResponse({'chart_url': request.build_absolute_uri(chart_url)})
+    else:
+        return JsonResponse({'error': 'Could not generate chart URL.'}, status=500)
+
+
+class AsyncAPIView(View):
+    """Requires an authenticated user, like permissions.IsAuthenticated on the sync views."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        request.user = await aget_user(request)
+        if not request.user.is_authenticated:
+            return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=403)
+        return await super().dispatch(request, *args, **kwargs)
+
+    async def get_project(self, pk):
+        return await Project.objects.filter(pk=pk).afirst()
+
+
+class AsyncProjectVelocityChartView(AsyncAPIView):
+    async def get(self, request, pk):
+        project = await self.get_project(pk)
+        if project is None:
+            return JsonResponse({'detail': 'No Project matches the given query.'}, status=404)
+
+        velocity_data = (await charts.avelocity_by_project([project.id])).get(project.id)
+        if not velocity_data:
+            return JsonResponse({"message": charts.EMPTY_MESSAGES[charts.VELOCITY]}, status=404)
+
+        return await achart_response(request, charts.velocity_chart_config(project, velocity_data))
+
+
+class AsyncTaskStatusChartView(AsyncAPIView):
+    async def get(self, request, pk):
+        project = await self.get_project(pk)
+        if project is None:
+            return JsonResponse({'detail': 'No Project matches the given query.'}, status=404)
+
+        task_statuses = (await charts.atask_status_by_project([project.id])).get(project.id)
+        if not task_statuses:
+            return JsonResponse({"message": charts.EMPTY_MESSAGES[charts.TASK_STATUS]}, status=404)
+
+        return await achart_response(request, charts.task_status_chart_config(project, task_statuses))
+
+
+class AsyncBusinessStatisticsView(AsyncAPIView):
+    async def get(self, request):
+        completed_tasks_monthly = await charts.abusiness_story_points_monthly()
+        if not completed_tasks_monthly:
+            return JsonResponse({"message": charts.EMPTY_MESSAGES[charts.BUSINESS_STORY_POINTS]}, status=404)
+
+        return await achart_response(request, charts.business_story_points_chart_config(completed_tasks_monthly))
+
+
+class AsyncUserPersonalStatsView(AsyncAPIView):
+    async def get(self, request):
+        completed_tasks_monthly = await charts.apersonal_completions_monthly(request.user)
+        if not completed_tasks_monthly:
+            return JsonResponse({"message": charts.EMPTY_MESSAGES[charts.PERSONAL_COMPLETIONS]}, status=404)
+
+        return await achart_response(request, charts.personal_completions_chart_config(completed_tasks_monthly))
+
+
+class AsyncOwnerDashboardView(AsyncAPIView):
+    async def get(self, request):
+        user = request.user
+        if not await sync_to_async(lambda: user.profile.is_owner)():
+            return JsonResponse({"detail": "Not authorized"}, status=403)
+
+        owned_projects = [project async for project in owned_projects_with_task_counts(user)]
+        projects_data = ProjectSummarySerializer(owned_projects, many=True, context={'request': request}).data
+
+        return JsonResponse({
+            'summary_stats': owner_summary_stats(owned_projects),
+            'projects_list': projects_data,
+        })
+
+
+class AsyncEmployeeDashboardView(AsyncAPIView):
+    async def get(self, request):
+        user = request.user
+
+        assigned_task_projects_ids = Task.objects.filter(assignee=user).values_list('project_id', flat=True).distinct()
+        involved_projects = [
+            project async for project in
+            ProjectSerializer.setup_eager_loading(Project.objects.filter(id__in=assigned_task_projects_ids), request)
+        ]
+        current_tasks = [
+            task async for task in
+            Task.objects.filter(assignee=user, status__in=['TODO', 'IN_PROGRESS']).select_related('project', 'assignee')
+        ]
+
+        def serialize():
+            context = {'request': request}
+            return (ProjectSerializer(involved_projects, many=True, context=context).data,
+                    TaskSerializer(current_tasks, many=True, context=context).data)
+
+        projects_data, current_tasks_data = await sync_to_async(serialize)()
+
+        return JsonResponse({
+            'my_projects': projects_data,
+            'my_teams': [],
+            'my_current_tasks': current_tasks_data,
+        })
+
+
+class AsyncTaskFeedView(AsyncAPIView):
+    """
+    Server-Sent Events for the tasks of ?project=<id>,... and of ?assignee=<id|me>,...
+    Without either, the user's own tasks and the tasks of the projects they own. Other users
+    only subscribe to the projects they can see and to their own tasks; staff to anything.
+    """
+
+    @staticmethod
+    def ids(request, name):
+        values = [value.strip() for value in request.GET.get(name, '').split(',') if value.strip()]
+        return {request.user.id if value == 'me' else int(value) for value in values}
+
+    async def get(self, request):
+        try:
+            project_ids, assignee_ids = self.ids(request, 'project'), self.ids(request, 'assignee')
+        except ValueError:
+            return JsonResponse({'detail': 'project and assignee take comma-separated ids.'}, status=400)
+        ids = await sync_to_async(access.project_ids)(request)
+        if not project_ids and not assignee_ids:
+            project_ids, assignee_ids = ids['owned'], {request.user.id}
+        elif not access.sees_everything(request.user):
+            project_ids &= ids['owned'] | ids['assigned']
+            assignee_ids &= {request.user.id}
+
+        response = StreamingHttpResponse(task_feed.stream(project_ids, assignee_ids),
+                                         content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # nginx would otherwise buffer the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
@@ -0,0 +1,210 @@
+"""
+Benchmarks of the API hot paths, behind `manage.py generate_data` and `manage.py bench_api`.
+
+generate() fills the database with a reproducible data set (seeded); run() times each scenario
+with the test client and reports latency percentiles, queries per request and peak Python memory.
+Charts are rendered against FakeQuickChartServer, a local stand-in for QuickChart. Results are
+written as JSON so that compare() can show what changed between two runs.
+"""
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .chart_cache import chart_cache
+from .models import Project, Task, WorkLog
+from .task_events import record_status_changes
+
+STATUSES = ['TODO', 'IN_PROGRESS', 'DONE']
+WORDS = ['api', 'billing', 'dashboard', 'export', 'login', 'report', 'search', 'timesheet', 'upload', 'invoice']
+
+# name -> (method, url, query or body); urls and data are filled in from the generated data set
+SCENARIOS = {
+    'task-list': ('get', lambda d: reverse('task-list'), lambda d: {}),
+    'task-list-filtered': ('get', lambda d: reverse('task-list'),
+                           lambda d: {'project_id': d['project_id'], 'status__in': 'TODO,IN_PROGRESS'}),
+    'task-search': ('get', lambda d: reverse('task-list'), lambda d: {'search': d['word']}),
+    'project-list': ('get', lambda d: reverse('project-list'), lambda d: {}),
+    # no owner-dashboard: OwnerDashboardView needs user.profile, which no model provides yet
+    'employee-dashboard': ('get', lambda d: reverse('employee-dashboard'), lambda d: {}),
+    'business-stats': ('get', lambda d: reverse('business-stats-story-points'), lambda d: {}),
+    'personal-stats': ('get', lambda d: reverse('user-personal-task-stats'), lambda d: {}),
+    'velocity-chart': ('get', lambda d: reverse('project-project-velocity-chart', args=[d['project_id']]), lambda d: {}),
+    'worklog-create': ('post', lambda d: reverse('worklog-list'),
+                       lambda d: {'task_id': d['task_id'], 'hours_spent': '1.50', 'date': d['today']}),
+}
+
+
+class FakeQuickChartHandler(BaseHTTPRequestHandler):
+    delay = 0.0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(self.delay)
+        body = json.dumps({'success': True, 'url': 'https://quickchart.io/chart/render/fake'}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeQuickChartServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def percentile(latencies, p):
+    """The p-th percentile of `latencies` (seconds), in milliseconds."""
+    latencies = sorted(latencies)
+    return latencies[min(len(latencies) - 1, len(latencies) * p // 100)] * 1000
+
+
+def generate(users=20, projects=10, tasks=1000, worklogs=5000, seed=0, prefix='bench'):
+    """Creates the data set with bulk inserts; returns the created users."""
+    rng = random.Random(seed)
+    now = timezone.now()
+    created_users = User.objects.bulk_create(
+        User(username=f'{prefix}-user-{i}', password='!') for i in range(users)
+    )
+    created_projects = Project.objects.bulk_create(
+        Project(name=f'{prefix} {rng.choice(WORDS)} project {i}', owner=created_users[i % users])
+        for i in range(projects)
+    )
+
+    created_tasks = []
+    for i in range(tasks):
+        task = Task(
+            project=rng.choice(created_projects),
+            name=f'{rng.choice(WORDS)} {rng.choice(WORDS)} task {i}',
+            description=f'{prefix} task about {rng.choice(WORDS)}',
+            status=rng.choice(STATUSES),
+            assignee=rng.choice(created_users + [None]),
+            story_points=rng.choice([None, 1, 2, 3, 5, 8]),
+            deadline=(now + timedelta(days=rng.randint(-30, 60))).date(),
+        )
+        if task.status == 'DONE':
+            task.completed_at = now - timedelta(days=rng.randint(0, 364), hours=rng.randint(0, 23))
+        created_tasks.append(task)
+    Task.objects.bulk_create(created_tasks, batch_size=1000)
+    # events and rollups, which the statistics endpoints read
+    record_status_changes([(task, None) for task in created_tasks])
+
+    created_worklogs = []
+    for _ in range(worklogs):
+        # a task or a project, never both (see WorkLogSerializer); one in five is logged on a project
+        task, project = rng.choice(created_tasks), None
+        if rng.random() < 0.2:
+            task, project = None, task.project
+        created_worklogs.append(WorkLog(
+            user=rng.choice(created_users),
+            task=task,
+            project=project,
+            effective_project=project or task.project,
+            date=(now - timedelta(days=rng.randint(0, 89))).date(),
+            hours_spent=Decimal(rng.randint(1, 16)) / 2,
+        ))
+    WorkLog.objects.bulk_create(created_worklogs, batch_size=1000)
+    return created_users
+
+
+def scenario_data(user):
+    """Ids the scenarios refer to: a project the user owns and a task they are assigned."""
+    task = Task.objects.filter(assignee=user).order_by('id').first() or Task.objects.order_by('id').first()
+    project = Project.objects.filter(owner=user).order_by('id').first() or task.project
+    return {'project_id': project.id, 'task_id': task.id, 'word': WORDS[0], 'today': timezone.localdate().isoformat()}
+
+
+def clear_caches():
+    if settings.RESPONSE_CACHE_ALIAS is not None:
+        caches[settings.RESPONSE_CACHE_ALIAS].clear()
+    chart_cache.clear()
+
+
+def run_scenario(client, name, data, iterations, warm=False):
+    method, url, params = SCENARIOS[name]
+    request = getattr(client, method)
+    url, params = url(data), params(data)
+    latencies, queries, statuses = [], [], {}
+    for _ in range(iterations):
+        if not warm:
+            clear_caches()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = request(url, params)
+            latencies.append(time.perf_counter() - started)
+        queries.append(len(captured))
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    # one more request, traced, for the memory it allocates at its peak
+    if not warm:
+        clear_caches()
+    tracemalloc.start()
+    try:
+        request(url, params)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'requests': iterations,
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 2),
+        'queries': round(statistics.mean(queries), 1),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def run(user, scenarios=None, iterations=50, warm=False):
+    client = Client(raise_request_exception=False)
+    client.force_login(user)
+    data = scenario_data(user)
+    return {name: run_scenario(client, name, data, iterations, warm) for name in scenarios or SCENARIOS}
+
+
+def failures(results):
+    """{scenario: statuses} of the scenarios that got any response other than 2xx."""
+    return {name: result['statuses'] for name, result in results.items()
+            if any(not status.startswith('2') for status in result['statuses'])}
+
+
+COMPARED = ['p50_ms', 'p95_ms', 'queries', 'peak_kib']
+
+
+def compare(baseline, current, threshold=0.1):
+    """
+    Rows of (scenario, metric, before, after, change) for the scenarios in both runs, and the
+    rows whose value grew by more than `threshold`. Scenarios that failed in either run time an
+    error path, so they are left out.
+    """
+    failed = failures(baseline['results']).keys() | failures(current['results']).keys()
+    rows, regressions = [], []
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None or name in failed:
+            continue
+        for metric in COMPARED:
+            change = (result[metric] - before[metric]) / before[metric] if before[metric] else 0.0
+            row = (name, metric, before[metric], result[metric], change)
+            rows.append(row)
+            if change > threshold:
+                regressions.append(row)
+    return rows, regressions
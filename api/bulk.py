@@ -0,0 +1,194 @@
+"""
+Bulk task writes behind the /tasks/bulk-*/ endpoints.
+
+Each operation loads what it needs with one query per model, checks IsAssigneeOrProjectOwner for
+the whole set by comparing ids (api.access), as well as ownership of the target project for tasks
+moved to another one, writes the valid items with one bulk_create/bulk_update inside a single
+transaction and returns one result per item. Bulk writes do not send model signals, so status
+changes are recorded with record_status_changes() and writes published to api.task_feed explicitly.
+"""
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from . import access, task_feed
+from .models import Project, Task, WorkLog
+from .serializers import TaskBulkItemSerializer, TaskSerializer
+from .task_events import record_status_changes
+
+# target status -> the status a task must be in, as for the start-progress and mark-as-done actions
+TRANSITIONS = {'IN_PROGRESS': 'TODO', 'DONE': 'IN_PROGRESS'}
+
+BULK_BATCH_SIZE = 500
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _related_objects(items):
+    project_ids = {_as_int(item.get('project_id')) for item in items} - {None}
+    user_ids = {_as_int(item.get('assignee_id')) for item in items} - {None}
+    return Project.objects.in_bulk(project_ids), User.objects.in_bulk(user_ids)
+
+
+def _locked_tasks(ids):
+    return Task.objects.select_related('project', 'assignee').select_for_update(of=('self',)).in_bulk(
+        {task_id for task_id in ids if task_id is not None}
+    )
+
+
+def _lookup(index, task_id, tasks, seen, request):
+    """The task for one item, or the error result for it."""
+    if task_id is None:
+        return None, {'index': index, 'status': 400, 'errors': {'id': ['A valid integer is required.']}}
+    if task_id in seen:
+        return None, {'index': index, 'id': task_id, 'status': 400, 'errors': {'id': ['Duplicate id.']}}
+    seen.add(task_id)
+    task = tasks.get(task_id)
+    if task is None:
+        return None, {'index': index, 'id': task_id, 'status': 404, 'message': 'Task not found.'}
+    if not access.can_edit_task(request, task):
+        return None, {'index': index, 'id': task_id, 'status': 403,
+                      'message': 'You do not have permission to perform this action.'}
+    return task, None
+
+
+def _serialize(results, request):
+    context = {'request': request}
+    for result in results:
+        if 'task' in result:
+            result['task'] = TaskSerializer(result['task'], context=context).data
+    return results
+
+
+@transaction.atomic
+def bulk_create_tasks(request, items):
+    user = request.user
+    projects, users = _related_objects(items)
+    context = {'request': request, 'projects': projects, 'users': users}
+    results, tasks = [], []
+    for index, item in enumerate(items):
+        serializer = TaskBulkItemSerializer(data=item, context=context)
+        if not serializer.is_valid():
+            results.append({'index': index, 'status': 400, 'errors': serializer.errors})
+            continue
+        task = Task(**serializer.validated_data)
+        task.project = projects[task.project_id]
+        task.assignee = users.get(task.assignee_id)
+        if not access.can_edit_task(request, task):
+            results.append({'index': index, 'status': 403,
+                            'message': 'You do not have permission to perform this action.'})
+            continue
+        task.stamp_completed_at()
+        tasks.append(task)
+        results.append({'index': index, 'status': 201, 'task': task})
+
+    Task.objects.bulk_create(tasks, batch_size=BULK_BATCH_SIZE)
+    record_status_changes([(task, None) for task in tasks], actor=user)
+    task_feed.publish(task_feed.task_event(task_feed.CREATED, task, actor=user) for task in tasks)
+    for result in results:
+        if 'task' in result:
+            result['id'] = result['task'].id
+    return _serialize(results, request)
+
+
+@transaction.atomic
+def bulk_update_tasks(request, items):
+    user = request.user
+    projects, users = _related_objects(items)
+    context = {'request': request, 'projects': projects, 'users': users}
+    tasks = _locked_tasks(_as_int(item.get('id')) for item in items)
+    now = timezone.now()
+    results, changes, moved, fields, seen = [], [], [], {'updated_at', 'completed_at'}, set()
+    previous = {}
+    for index, item in enumerate(items):
+        task, error = _lookup(index, _as_int(item.get('id')), tasks, seen, request)
+        if error:
+            results.append(error)
+            continue
+        serializer = TaskBulkItemSerializer(task, data=item, partial=True, context=context)
+        if not serializer.is_valid():
+            results.append({'index': index, 'id': task.id, 'status': 400, 'errors': serializer.errors})
+            continue
+        if serializer.validated_data.get('project_id', task.project_id) != task.project_id:
+            # moving a task takes edit rights in the project it moves to as well
+            if serializer.validated_data['project_id'] not in access.owned_project_ids(request):
+                results.append({'index': index, 'id': task.id, 'status': 403,
+                                'message': 'You do not have permission to move tasks to this project.'})
+                continue
+            moved.append(task.id)
+        from_status = task.status
+        previous[task.id] = {'status': task.status, 'project_id': task.project_id, 'assignee_id': task.assignee_id}
+        for attr, value in serializer.validated_data.items():
+            setattr(task, attr, value)
+            fields.add(attr.removesuffix('_id'))
+        if 'project_id' in serializer.validated_data:
+            task.project = projects[task.project_id]
+        if 'assignee_id' in serializer.validated_data:
+            task.assignee = users.get(task.assignee_id)
+        task.stamp_completed_at()
+        task.updated_at = now
+        changes.append((task, from_status))
+        results.append({'index': index, 'id': task.id, 'status': 200, 'task': task})
+
+    Task.objects.bulk_update([task for task, _ in changes], sorted(fields), batch_size=BULK_BATCH_SIZE)
+    record_status_changes(changes, actor=user)
+    task_feed.publish(task_feed.task_event(task_feed.UPDATED, task, previous[task.id], actor=user)
+                      for task, _ in changes)
+    if moved:
+        WorkLog.sync_effective_project(moved)
+    return _serialize(results, request)
+
+
+@transaction.atomic
+def bulk_transition_tasks(request, ids, status):
+    user = request.user
+    tasks = _locked_tasks(ids)
+    now = timezone.now()
+    results, changes, seen = [], [], set()
+    for index, task_id in enumerate(ids):
+        task, error = _lookup(index, task_id, tasks, seen, request)
+        if error:
+            results.append(error)
+            continue
+        if task.status != TRANSITIONS[status]:
+            results.append({'index': index, 'id': task.id, 'status': 400,
+                            'message': f'Task cannot be moved to {status} from {task.status}.'})
+            continue
+        changes.append((task, task.status))
+        task.status = status
+        task.stamp_completed_at()
+        task.updated_at = now
+        results.append({'index': index, 'id': task.id, 'status': 200, 'task_status': task.status})
+
+    Task.objects.bulk_update([task for task, _ in changes], ['status', 'completed_at', 'updated_at'],
+                             batch_size=BULK_BATCH_SIZE)
+    record_status_changes(changes, actor=user)
+    task_feed.publish(task_feed.task_event(task_feed.UPDATED, task, {'status': from_status}, actor=user)
+                      for task, from_status in changes)
+    return results
+
+
+@transaction.atomic
+def bulk_reassign_tasks(request, ids, assignee_id):
+    user = request.user
+    tasks = _locked_tasks(ids)
+    now = timezone.now()
+    results, updated, seen = [], [], set()
+    for index, task_id in enumerate(ids):
+        task, error = _lookup(index, task_id, tasks, seen, request)
+        if error:
+            results.append(error)
+            continue
+        updated.append((task, {'assignee_id': task.assignee_id}))
+        task.assignee_id = assignee_id
+        task.updated_at = now
+        results.append({'index': index, 'id': task.id, 'status': 200, 'assignee_id': assignee_id})
+
+    Task.objects.bulk_update([task for task, _ in updated], ['assignee', 'updated_at'], batch_size=BULK_BATCH_SIZE)
+    task_feed.publish(task_feed.task_event(task_feed.UPDATED, task, previous, actor=user) for task, previous in updated)
+    return results
@@ -0,0 +1,158 @@
+import json
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+from .chart_cache import chart_key
+from .chart_renderer import ChartRenderError, render_chart, render_svg
+from .http_client import AsyncHttpClient, HttpClient, httpx
+
+logger = logging.getLogger(__name__)
+
+_quickchart_client_options = dict(
+    connect_timeout=settings.QUICKCHART_CONNECT_TIMEOUT,
+    read_timeout=settings.QUICKCHART_READ_TIMEOUT,
+    retries=settings.QUICKCHART_RETRIES,
+    backoff_factor=settings.QUICKCHART_RETRY_BACKOFF,
+    pool_size=settings.QUICKCHART_POOL_SIZE,
+    failure_threshold=settings.QUICKCHART_CIRCUIT_FAILURES,
+    reset_timeout=settings.QUICKCHART_CIRCUIT_RESET,
+)
+quickchart_client = HttpClient('quickchart', **_quickchart_client_options)
+# shares the breaker so an unhealthy QuickChart is skipped by sync and async views alike
+async_quickchart_client = AsyncHttpClient('quickchart-async', breaker=quickchart_client.breaker,
+                                          **_quickchart_client_options)
+
+CHART_BACKENDS = {
+    'quickchart': 'api.chart_backends.QuickChartBackend',
+    'local': 'api.chart_backends.LocalChartBackend',
+}
+
+
+class BaseChartBackend:
+    """
+    A chart backend turns a chart_templates config into a URL the client can load the image from.
+    Returns None when the chart could not be produced.
+    """
+
+    def get_chart_url(self, chart_config, width=500, height=300, device_pixel_ratio=1.0, format='png',
+                      background_color='transparent'):
+        raise NotImplementedError
+
+    async def aget_chart_url(self, chart_config, **kwargs):
+        return await sync_to_async(self.get_chart_url, thread_sensitive=False)(chart_config, **kwargs)
+
+
+class QuickChartBackend(BaseChartBackend):
+    @staticmethod
+    def params(chart_config, width, height, device_pixel_ratio, format, background_color):
+        return {
+            'chart': json.dumps(chart_config) if isinstance(chart_config, dict) else chart_config,
+            'width': width,
+            'height': height,
+            'bkg': background_color,
+            'format': format,
+            'devicePixelRatio': device_pixel_ratio,
+        }
+
+    def get_chart_url(self, chart_config, width=500, height=300, device_pixel_ratio=1.0, format='png',
+                      background_color='transparent'):
+        params = self.params(chart_config, width, height, device_pixel_ratio, format, background_color)
+        try:
+            response = quickchart_client.post(f"{settings.QUICK_CHART_API_URL}/create", json=params)
+            return response.json().get('url')
+        except requests.RequestException:
+            # already logged by the client
+            return None
+        except ValueError:
+            logger.warning("Error decoding QuickChart API response: %s", response.text)
+            return None
+
+    async def aget_chart_url(self, chart_config, width=500, height=300, device_pixel_ratio=1.0, format='png',
+                             background_color='transparent'):
+        if httpx is None:
+            return await super().aget_chart_url(
+                chart_config, width=width, height=height, device_pixel_ratio=device_pixel_ratio,
+                format=format, background_color=background_color,
+            )
+        params = self.params(chart_config, width, height, device_pixel_ratio, format, background_color)
+        try:
+            response = await async_quickchart_client.post(f"{settings.QUICK_CHART_API_URL}/create", json=params)
+            return response.json().get('url')
+        except requests.RequestException:
+            return None
+        except ValueError:
+            logger.warning("Error decoding QuickChart API response: %s", response.text)
+            return None
+
+
+_render_pool = None
+
+
+def _get_render_pool():
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = ProcessPoolExecutor(max_workers=settings.CHART_RENDER_PROCESSES)
+    return _render_pool
+
+
+class LocalChartBackend(BaseChartBackend):
+    """
+    Renders charts in-process (or in a process pool when CHART_RENDER_PROCESSES > 0) and stores the
+    image under a content hash in CHART_STORAGE_DIR, so identical charts are rendered once and served
+    by ChartImageView.
+    """
+
+    def __init__(self):
+        self.storage = FileSystemStorage(location=settings.CHART_STORAGE_DIR)
+
+    def render(self, chart_config, width, height, format, background_color, device_pixel_ratio):
+        global _render_pool
+        args = (chart_config, width, height, format, background_color, device_pixel_ratio)
+        if not settings.CHART_RENDER_PROCESSES:
+            return render_chart(*args)
+        try:
+            return _get_render_pool().submit(render_chart, *args).result(timeout=settings.CHART_RENDER_TIMEOUT)
+        except BrokenProcessPool as e:
+            # a worker died (e.g. killed for memory); start a new pool next time and render this chart as SVG here
+            logger.warning("Chart render pool is broken, rendering as SVG in-process: %s", e)
+            pool, _render_pool = _render_pool, None
+            if pool is not None:
+                pool.shutdown(wait=False)
+            return render_svg(chart_config, width, height, background_color), 'svg'
+
+    def get_chart_url(self, chart_config, width=500, height=300, device_pixel_ratio=1.0, format='png',
+                      background_color='transparent'):
+        if isinstance(chart_config, str):
+            chart_config = json.loads(chart_config)
+        name = chart_key(chart_config, width, height, device_pixel_ratio, format, background_color)[:32]
+
+        for ext in (format, 'svg'):
+            if self.storage.exists(f'{name}.{ext}'):
+                return reverse('chart-image', args=[f'{name}.{ext}'])
+
+        try:
+            image, ext = self.render(chart_config, width, height, format, background_color, device_pixel_ratio)
+        except (ChartRenderError, TimeoutError) as e:
+            logger.warning("Error rendering chart locally: %s", e)
+            return None
+        self.storage.save(f'{name}.{ext}', ContentFile(image))
+        return reverse('chart-image', args=[f'{name}.{ext}'])
+
+
+@lru_cache(maxsize=None)
+def _load_backend(name):
+    return import_string(CHART_BACKENDS.get(name, name))()
+
+
+def get_chart_backend(name=None):
+    return _load_backend(name or settings.CHART_BACKEND)
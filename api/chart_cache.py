@@ -0,0 +1,117 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+def chart_key(chart_config, width, height, device_pixel_ratio, format, background_color):
+    """Stable content hash of everything that affects the rendered chart."""
+    if isinstance(chart_config, str):
+        chart_config = json.loads(chart_config)
+    payload = json.dumps([chart_config, width, height, device_pixel_ratio, format, background_color],
+                         sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ChartCache:
+    """
+    Two-tier cache of chart URLs keyed by chart_key(): a bounded in-process LRU with a TTL,
+    backed by an optional shared Django cache (CHART_CACHE_ALIAS) so workers reuse each other's charts.
+    """
+
+    def __init__(self, max_entries=1024, ttl=3600, cache_alias=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.cache_alias = cache_alias
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @property
+    def shared(self):
+        return caches[self.cache_alias] if self.cache_alias else None
+
+    def get(self, key):
+        value = self._lookup(key)
+        if value is None and self.shared is not None:
+            value = self._shared_hit(key, self.shared.get(f'chart:{key}'))
+        if value is None:
+            self._miss()
+        return value
+
+    async def aget(self, key):
+        value = self._lookup(key)
+        if value is None and self.shared is not None:
+            value = self._shared_hit(key, await self.shared.aget(f'chart:{key}'))
+        if value is None:
+            self._miss()
+        return value
+
+    def set(self, key, value):
+        self._remember(key, value)
+        if self.shared is not None:
+            self.shared.set(f'chart:{key}', value, self.ttl)
+
+    async def aset(self, key, value):
+        self._remember(key, value)
+        if self.shared is not None:
+            await self.shared.aset(f'chart:{key}', value, self.ttl)
+
+    def _lookup(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+        return None
+
+    def _shared_hit(self, key, value):
+        if value is not None:
+            self._remember(key, value)
+            with self._lock:
+                self.shared_hits += 1
+        return value
+
+    def _miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.shared_hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+            }
+
+
+chart_cache = ChartCache(
+    max_entries=settings.CHART_CACHE_MAX_ENTRIES,
+    ttl=settings.CHART_CACHE_TTL,
+    cache_alias=settings.CHART_CACHE_ALIAS,
+)
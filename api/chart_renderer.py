@@ -0,0 +1,251 @@
+"""
+Renders the Chart.js-style configs from chart_templates locally, without a round-trip to QuickChart.
+
+SVG output is pure Python. PNG output needs matplotlib; when it is not installed the chart is rendered as SVG.
+"""
+import math
+import re
+from xml.sax.saxutils import escape
+
+try:
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib import pyplot as plt
+except ImportError:  # PNG rendering is optional
+    plt = None
+
+SUPPORTED_FORMATS = ('png', 'svg')
+CONTENT_TYPES = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+DEFAULT_COLOR = 'rgba(54, 162, 235, 0.7)'
+TEXT_COLOR = '#444444'
+GRID_COLOR = '#e5e5e5'
+
+_RGBA_RE = re.compile(r'rgba?\(\s*([\d.]+)\s*,\s*([\d.]+)\s*,\s*([\d.]+)\s*(?:,\s*([\d.]+)\s*)?\)')
+
+
+class ChartRenderError(Exception):
+    pass
+
+
+def parse_color(value):
+    """Returns an (r, g, b, alpha) tuple for 'rgba(...)', 'rgb(...)' or '#rrggbb' colors."""
+    value = (value or DEFAULT_COLOR).strip()
+    match = _RGBA_RE.fullmatch(value)
+    if match:
+        r, g, b, a = match.groups()
+        return int(float(r)), int(float(g)), int(float(b)), float(a) if a is not None else 1.0
+    if value.startswith('#') and len(value) == 7:
+        return int(value[1:3], 16), int(value[3:5], 16), int(value[5:7], 16), 1.0
+    if value == 'transparent':
+        return 0, 0, 0, 0.0
+    raise ChartRenderError(f"Unsupported color: {value}")
+
+
+def _svg_color(value):
+    r, g, b, a = parse_color(value)
+    return f'rgb({r},{g},{b})', a
+
+
+def _mpl_color(value):
+    r, g, b, a = parse_color(value)
+    return r / 255, g / 255, b / 255, a
+
+
+def _nice_max(value):
+    if value <= 0:
+        return 1
+    magnitude = 10 ** math.floor(math.log10(value))
+    for step in (1, 2, 2.5, 5, 10):
+        if value <= step * magnitude:
+            return step * magnitude
+    return 10 * magnitude
+
+
+def _dataset_colors(dataset, count):
+    colors = dataset.get('backgroundColor') or DEFAULT_COLOR
+    if isinstance(colors, str):
+        return [colors] * count
+    return [colors[i % len(colors)] for i in range(count)]
+
+
+def _title(config):
+    title = config.get('options', {}).get('plugins', {}).get('title', {})
+    return title.get('text', '') if title.get('display', True) else ''
+
+
+def _values(dataset):
+    return [float(v or 0) for v in dataset.get('data', [])]
+
+
+def render_svg(chart_config, width=500, height=300, background_color='transparent'):
+    chart_type = chart_config.get('type', 'bar')
+    labels = [str(label) for label in chart_config.get('data', {}).get('labels', [])]
+    datasets = chart_config.get('data', {}).get('datasets', [])
+    title = _title(chart_config)
+
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+             f'viewBox="0 0 {width} {height}" font-family="sans-serif">']
+    bg, bg_alpha = _svg_color(background_color)
+    if bg_alpha:
+        parts.append(f'<rect width="100%" height="100%" fill="{bg}" fill-opacity="{bg_alpha}"/>')
+
+    top = 10
+    if title:
+        parts.append(f'<text x="{width / 2}" y="24" text-anchor="middle" font-size="14" '
+                     f'fill="{TEXT_COLOR}">{escape(title)}</text>')
+        top = 40
+
+    if chart_type in ('pie', 'doughnut'):
+        parts.extend(_svg_pie(labels, datasets, width, height, top, doughnut=chart_type == 'doughnut'))
+    elif chart_type in ('bar', 'line'):
+        parts.extend(_svg_axes_chart(chart_type, labels, datasets, width, height, top))
+    else:
+        raise ChartRenderError(f"Unsupported chart type: {chart_type}")
+
+    parts.append('</svg>')
+    return '\n'.join(parts).encode('utf-8')
+
+
+def _svg_pie(labels, datasets, width, height, top, doughnut=False):
+    parts = []
+    dataset = datasets[0] if datasets else {}
+    values = _values(dataset)
+    total = sum(values)
+    colors = _dataset_colors(dataset, len(values))
+
+    legend_width = 120
+    radius = max(min(width - legend_width, height - top) / 2 - 10, 10)
+    cx, cy = (width - legend_width) / 2, top + (height - top) / 2
+
+    angle = -math.pi / 2
+    for value, color in zip(values, colors):
+        if not total or not value:
+            continue
+        fill, alpha = _svg_color(color)
+        sweep = 2 * math.pi * value / total
+        if value == total:
+            parts.append(f'<circle cx="{cx:.2f}" cy="{cy:.2f}" r="{radius:.2f}" fill="{fill}" fill-opacity="{alpha}"/>')
+        else:
+            x1, y1 = cx + radius * math.cos(angle), cy + radius * math.sin(angle)
+            x2, y2 = cx + radius * math.cos(angle + sweep), cy + radius * math.sin(angle + sweep)
+            large = 1 if sweep > math.pi else 0
+            parts.append(f'<path d="M{cx:.2f},{cy:.2f} L{x1:.2f},{y1:.2f} A{radius:.2f},{radius:.2f} 0 {large} 1 '
+                         f'{x2:.2f},{y2:.2f} Z" fill="{fill}" fill-opacity="{alpha}" stroke="white"/>')
+        mid = angle + sweep / 2
+        parts.append(f'<text x="{cx + radius * 0.65 * math.cos(mid):.2f}" y="{cy + radius * 0.65 * math.sin(mid):.2f}" '
+                     f'text-anchor="middle" font-size="10" font-weight="bold" fill="white">{value:g}</text>')
+        angle += sweep
+    if doughnut:
+        parts.append(f'<circle cx="{cx:.2f}" cy="{cy:.2f}" r="{radius / 2:.2f}" fill="white"/>')
+
+    for i, (label, color) in enumerate(zip(labels, colors)):
+        fill, alpha = _svg_color(color)
+        y = top + 10 + i * 18
+        parts.append(f'<rect x="{width - legend_width}" y="{y}" width="12" height="12" fill="{fill}" fill-opacity="{alpha}"/>')
+        parts.append(f'<text x="{width - legend_width + 18}" y="{y + 10}" font-size="10" fill="{TEXT_COLOR}">{escape(label)}</text>')
+    return parts
+
+
+def _svg_axes_chart(chart_type, labels, datasets, width, height, top):
+    parts = []
+    left, right, bottom = 40, 10, 40
+    plot_w, plot_h = width - left - right, height - top - bottom
+    y_max = _nice_max(max([max(_values(ds), default=0) for ds in datasets], default=0))
+
+    for i in range(5):
+        value = y_max * i / 4
+        y = top + plot_h - plot_h * i / 4
+        parts.append(f'<line x1="{left}" y1="{y:.2f}" x2="{width - right}" y2="{y:.2f}" stroke="{GRID_COLOR}"/>')
+        parts.append(f'<text x="{left - 5}" y="{y + 3:.2f}" text-anchor="end" font-size="10" fill="{TEXT_COLOR}">{value:g}</text>')
+
+    slot = plot_w / max(len(labels), 1)
+    for i, label in enumerate(labels):
+        x = left + slot * (i + 0.5)
+        parts.append(f'<text x="{x:.2f}" y="{top + plot_h + 15}" text-anchor="middle" font-size="10" '
+                     f'fill="{TEXT_COLOR}">{escape(label)}</text>')
+
+    for index, dataset in enumerate(datasets):
+        values = _values(dataset)
+        points = [(left + slot * (i + 0.5), top + plot_h - plot_h * v / y_max) for i, v in enumerate(values)]
+        if chart_type == 'bar':
+            bar_w = slot * 0.8 / max(len(datasets), 1)
+            for (x, y), color in zip(points, _dataset_colors(dataset, len(points))):
+                fill, alpha = _svg_color(color)
+                bar_x = x - slot * 0.4 + bar_w * index
+                parts.append(f'<rect x="{bar_x:.2f}" y="{y:.2f}" width="{bar_w:.2f}" height="{top + plot_h - y:.2f}" '
+                             f'fill="{fill}" fill-opacity="{alpha}"/>')
+        elif points:
+            stroke, stroke_alpha = _svg_color(dataset.get('borderColor'))
+            path = ' '.join(f'{x:.2f},{y:.2f}' for x, y in points)
+            if dataset.get('fill'):
+                fill, alpha = _svg_color(dataset.get('backgroundColor'))
+                area = f'{points[0][0]:.2f},{top + plot_h} {path} {points[-1][0]:.2f},{top + plot_h}'
+                parts.append(f'<polygon points="{area}" fill="{fill}" fill-opacity="{alpha}"/>')
+            parts.append(f'<polyline points="{path}" fill="none" stroke="{stroke}" stroke-opacity="{stroke_alpha}" stroke-width="2"/>')
+
+        label = dataset.get('label')
+        if label:
+            fill, alpha = _svg_color(dataset.get('borderColor') or _dataset_colors(dataset, 1)[0])
+            x = left + index * 150
+            parts.append(f'<rect x="{x}" y="{height - 14}" width="12" height="10" fill="{fill}" fill-opacity="{alpha}"/>')
+            parts.append(f'<text x="{x + 16}" y="{height - 5}" font-size="10" fill="{TEXT_COLOR}">{escape(label)}</text>')
+    return parts
+
+
+def render_png(chart_config, width=500, height=300, background_color='transparent', device_pixel_ratio=1.0):
+    if plt is None:
+        raise ChartRenderError("PNG rendering requires matplotlib.")
+    import io
+
+    chart_type = chart_config.get('type', 'bar')
+    labels = [str(label) for label in chart_config.get('data', {}).get('labels', [])]
+    datasets = chart_config.get('data', {}).get('datasets', [])
+
+    figure = plt.figure(figsize=(width / 100, height / 100), dpi=100 * device_pixel_ratio)
+    try:
+        axes = figure.add_subplot()
+        if chart_type in ('pie', 'doughnut'):
+            dataset = datasets[0] if datasets else {}
+            values = _values(dataset)
+            wedgeprops = {'width': 0.5} if chart_type == 'doughnut' else None
+            axes.pie(values, labels=labels, colors=[_mpl_color(c) for c in _dataset_colors(dataset, len(values))],
+                     wedgeprops=wedgeprops)
+            axes.axis('equal')
+        elif chart_type in ('bar', 'line'):
+            for dataset in datasets:
+                values = _values(dataset)
+                if chart_type == 'bar':
+                    axes.bar(labels, values, label=dataset.get('label'),
+                             color=[_mpl_color(c) for c in _dataset_colors(dataset, len(values))])
+                else:
+                    axes.plot(labels, values, label=dataset.get('label'), color=_mpl_color(dataset.get('borderColor')))
+                    if dataset.get('fill'):
+                        axes.fill_between(labels, values, color=_mpl_color(dataset.get('backgroundColor')))
+            axes.set_ylim(bottom=0)
+            if any(ds.get('label') for ds in datasets):
+                axes.legend(fontsize=8)
+            axes.tick_params(labelsize=8)
+        else:
+            raise ChartRenderError(f"Unsupported chart type: {chart_type}")
+
+        title = _title(chart_config)
+        if title:
+            axes.set_title(title, fontsize=11)
+        buffer = io.BytesIO()
+        figure.savefig(buffer, format='png', facecolor=_mpl_color(background_color), transparent=background_color == 'transparent')
+        return buffer.getvalue()
+    finally:
+        plt.close(figure)
+
+
+def render_chart(chart_config, width=500, height=300, format='png', background_color='transparent', device_pixel_ratio=1.0):
+    """
+    Renders the chart and returns (image_bytes, format). The returned format may differ from the
+    requested one when PNG was asked for but matplotlib is not available.
+    """
+    if format not in SUPPORTED_FORMATS:
+        raise ChartRenderError(f"Unsupported chart format: {format}")
+    if format == 'png' and plt is not None:
+        return render_png(chart_config, width, height, background_color, device_pixel_ratio), 'png'
+    return render_svg(chart_config, width, height, background_color), 'svg'
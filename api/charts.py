@@ -0,0 +1,237 @@
+"""
+Aggregations and chart configs behind the chart endpoints.
+
+The aggregation helpers take lists of projects so the batch endpoint can build the data for
+several charts with one grouped query per chart type. Completion statistics are read from the
+CompletionRollup table (see api.rollups), a handful of rows per period, instead of the tasks table.
+Windows start at the beginning of the week/month containing `now - days`. The burndown is computed
+from a range scan over the project's TaskStatusEvent rows.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+from django.conf import settings
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .chart_templates import get_base_bar_chart_config, get_base_line_chart_config, get_base_pie_chart_config
+from .models import CompletionRollup, Task, TaskStatusEvent
+from .quickchart_helper import get_chart_url
+from .rollups import month_start, week_start
+
+VELOCITY = 'velocity'
+TASK_STATUS = 'task_status'
+BUSINESS_STORY_POINTS = 'business_story_points'
+PERSONAL_COMPLETIONS = 'personal_completions'
+BURNDOWN = 'burndown'
+
+CHART_TYPES = [VELOCITY, TASK_STATUS, BUSINESS_STORY_POINTS, PERSONAL_COMPLETIONS]
+PROJECT_CHART_TYPES = [VELOCITY, TASK_STATUS]
+
+DEFAULT_WINDOW_DAYS = {
+    VELOCITY: 90,
+    BUSINESS_STORY_POINTS: 365,
+    PERSONAL_COMPLETIONS: 365,
+    BURNDOWN: 30,
+}
+
+EMPTY_MESSAGES = {
+    VELOCITY: "Not enough data to calculate project velocity.",
+    TASK_STATUS: "No tasks found for this project to generate a chart.",
+    BUSINESS_STORY_POINTS: "No completed tasks with story points found for the last year.",
+    PERSONAL_COMPLETIONS: "You have no completed tasks in the last year.",
+    BURNDOWN: "No open story points in this project for the last 30 days.",
+}
+
+
+def _since(days):
+    return timezone.now() - timezone.timedelta(days=days)
+
+
+def _group_by_project(rows):
+    grouped = defaultdict(list)
+    for row in rows:
+        grouped[row.pop('project_id')].append(row)
+    return grouped
+
+
+def velocity_queryset(project_ids, days=DEFAULT_WINDOW_DAYS[VELOCITY]):
+    return CompletionRollup.objects.filter(
+        period=CompletionRollup.WEEK,
+        project_id__in=project_ids,
+        period_start__gte=week_start(_since(days))
+    ).values('project_id', 'period_start').annotate(
+        total_story_points=Sum('story_points')
+    ).alias(
+        pointed_tasks=Sum('pointed_tasks_completed')
+    ).filter(
+        pointed_tasks__gt=0
+    ).order_by('project_id', 'period_start')
+
+
+def task_status_queryset(project_ids):
+    return Task.objects.filter(
+        project_id__in=project_ids
+    ).values('project_id', 'status').annotate(
+        count=Count('id')
+    ).order_by('project_id', 'status')
+
+
+def business_story_points_queryset(days=DEFAULT_WINDOW_DAYS[BUSINESS_STORY_POINTS]):
+    return CompletionRollup.objects.filter(
+        period=CompletionRollup.MONTH,
+        period_start__gte=month_start(_since(days))
+    ).values(
+        month=F('period_start')
+    ).annotate(
+        total_story_points=Sum('story_points')
+    ).alias(
+        pointed_tasks=Sum('pointed_tasks_completed')
+    ).filter(
+        pointed_tasks__gt=0
+    ).order_by('month')
+
+
+def personal_completions_queryset(user, days=DEFAULT_WINDOW_DAYS[PERSONAL_COMPLETIONS]):
+    return CompletionRollup.objects.filter(
+        period=CompletionRollup.MONTH,
+        assignee=user,
+        period_start__gte=month_start(_since(days))
+    ).values(
+        month=F('period_start')
+    ).annotate(
+        tasks_count=Sum('tasks_completed')
+    ).filter(
+        tasks_count__gt=0
+    ).order_by('month')
+
+
+def burndown_by_day(project_id, days=DEFAULT_WINDOW_DAYS[BURNDOWN]):
+    """
+    Open story points at the end of each of the last `days` days. Starts from the current total and
+    walks back through the day's transitions: a new open task or a reopened one added points, a
+    completion removed them. Story point edits are not transitions and are not replayed.
+    """
+    today = timezone.localdate()
+    first_day = today - timedelta(days=days - 1)
+    remaining = Task.objects.filter(project_id=project_id).exclude(status='DONE').aggregate(
+        total=Coalesce(Sum('story_points'), 0)
+    )['total']
+    opened = (Q(from_status__isnull=True) & ~Q(to_status='DONE')) | Q(from_status='DONE')
+    closed = Q(from_status__isnull=False, to_status='DONE')
+    changes = {
+        row['day']: row['opened'] - row['closed']
+        for row in TaskStatusEvent.objects.filter(
+            project_id=project_id,
+            created_at__gte=timezone.make_aware(datetime.combine(first_day, time.min))
+        ).annotate(day=TruncDate('created_at')).values('day').annotate(
+            opened=Coalesce(Sum('story_points', filter=opened), 0),
+            closed=Coalesce(Sum('story_points', filter=closed), 0),
+        ).order_by()
+    }
+    burndown = []
+    for offset in range(days):
+        day = today - timedelta(days=offset)
+        burndown.append({'day': day, 'remaining_story_points': remaining})
+        remaining -= changes.get(day, 0)
+    return burndown[::-1]
+
+
+def velocity_by_project(project_ids, days=DEFAULT_WINDOW_DAYS[VELOCITY]):
+    return _group_by_project(velocity_queryset(project_ids, days))
+
+
+def task_status_by_project(project_ids):
+    return _group_by_project(task_status_queryset(project_ids))
+
+
+def business_story_points_monthly(days=DEFAULT_WINDOW_DAYS[BUSINESS_STORY_POINTS]):
+    return list(business_story_points_queryset(days))
+
+
+def personal_completions_monthly(user, days=DEFAULT_WINDOW_DAYS[PERSONAL_COMPLETIONS]):
+    return list(personal_completions_queryset(user, days))
+
+
+# Async versions for the ASGI views
+
+async def avelocity_by_project(project_ids, days=DEFAULT_WINDOW_DAYS[VELOCITY]):
+    return _group_by_project([row async for row in velocity_queryset(project_ids, days)])
+
+
+async def atask_status_by_project(project_ids):
+    return _group_by_project([row async for row in task_status_queryset(project_ids)])
+
+
+async def abusiness_story_points_monthly(days=DEFAULT_WINDOW_DAYS[BUSINESS_STORY_POINTS]):
+    return [row async for row in business_story_points_queryset(days)]
+
+
+async def apersonal_completions_monthly(user, days=DEFAULT_WINDOW_DAYS[PERSONAL_COMPLETIONS]):
+    return [row async for row in personal_completions_queryset(user, days)]
+
+
+def velocity_chart_config(project, velocity_data):
+    chart_config = get_base_line_chart_config()
+    chart_config['data']['labels'] = [item['period_start'].strftime('%Y-W%W') for item in velocity_data]
+    chart_config['data']['datasets'][0]['label'] = 'Project Velocity (Story Points per Week)'
+    chart_config['data']['datasets'][0]['data'] = [item['total_story_points'] for item in velocity_data]
+    chart_config['options']['plugins']['title']['text'] = f'Velocity for Project: {project.name}'
+    return chart_config
+
+
+def task_status_chart_config(project, task_statuses):
+    chart_config = get_base_pie_chart_config()
+    chart_config['data']['labels'] = [item['status'] for item in task_statuses]
+    chart_config['data']['datasets'][0]['data'] = [item['count'] for item in task_statuses]
+    chart_config['options']['plugins']['title']['text'] = f'Task Status Distribution for {project.name}'
+    # Can customize color
+    # default_colors = chart_config['data']['datasets'][0]['backgroundColor']
+    # chart_config['data']['datasets'][0]['backgroundColor'] = [default_colors[i % len(default_colors)] for i in range(len(labels))]
+    return chart_config
+
+
+def burndown_chart_config(project, burndown_data):
+    chart_config = get_base_line_chart_config()
+    chart_config['data']['labels'] = [item['day'].strftime('%Y-%m-%d') for item in burndown_data]
+    chart_config['data']['datasets'][0]['label'] = 'Open Story Points'
+    chart_config['data']['datasets'][0]['data'] = [item['remaining_story_points'] for item in burndown_data]
+    chart_config['options']['plugins']['title']['text'] = f'Burndown for Project: {project.name}'
+    return chart_config
+
+
+def business_story_points_chart_config(completed_tasks_monthly):
+    chart_config = get_base_bar_chart_config()
+    chart_config['data']['labels'] = [item['month'].strftime('%Y-%m') for item in completed_tasks_monthly]
+    chart_config['data']['datasets'][0]['label'] = 'Completed Story Points'
+    chart_config['data']['datasets'][0]['data'] = [item['total_story_points'] for item in completed_tasks_monthly]
+    chart_config['options']['plugins']['title']['text'] = 'Monthly Completed Story Points (Last Year)'
+    # Can customize color
+    # chart_config['data']['datasets'][0]['backgroundColor'] = 'rgba(54, 162, 235, 0.7)'
+    # chart_config['data']['datasets'][0]['borderColor'] = 'rgba(54, 162, 235, 1)'
+    return chart_config
+
+
+def personal_completions_chart_config(completed_tasks_monthly):
+    chart_config = get_base_line_chart_config()
+    chart_config['data']['labels'] = [item['month'].strftime('%Y-%m') for item in completed_tasks_monthly]
+    chart_config['data']['datasets'][0]['label'] = 'My Completed Tasks'
+    chart_config['data']['datasets'][0]['data'] = [item['tasks_count'] for item in completed_tasks_monthly]
+    chart_config['options']['plugins']['title']['text'] = 'My Monthly Task Completions (Last Year)'
+    # Can customize color
+    # chart_config['data']['datasets'][0]['borderColor'] = 'rgba(255, 99, 132, 0.9)'
+    # chart_config['data']['datasets'][0]['backgroundColor'] = 'rgba(255, 99, 132, 0.2)'
+    return chart_config
+
+
+def get_chart_urls(chart_configs):
+    """Generates the URLs for several chart configs concurrently, preserving order."""
+    if len(chart_configs) <= 1:
+        return [get_chart_url(config) for config in chart_configs]
+    with ThreadPoolExecutor(max_workers=min(settings.CHART_BATCH_WORKERS, len(chart_configs))) as executor:
+        # each call runs in a copy of this context, so its time counts towards the request (api.metrics)
+        futures = [executor.submit(copy_context().run, get_chart_url, config) for config in chart_configs]
+        return [future.result() for future in futures]
@@ -0,0 +1,27 @@
+from django.db.models import Count, Q
+
+from .models import Project
+
+ACTIVE_STATUSES = ['TODO', 'IN_PROGRESS']
+
+
+def owned_projects_with_task_counts(owner):
+    """Owned projects annotated with their task counts per status, in a single grouped query."""
+    return Project.objects.filter(owner=owner).annotate(
+        tasks_count=Count('tasks'),
+        tasks_todo=Count('tasks', filter=Q(tasks__status='TODO')),
+        tasks_inprogress=Count('tasks', filter=Q(tasks__status='IN_PROGRESS')),
+        tasks_done=Count('tasks', filter=Q(tasks__status='DONE')),
+    ).order_by('-updated_at')
+
+
+def owner_summary_stats(projects):
+    """Summary stats for the owner dashboard, added up from owned_projects_with_task_counts() rows."""
+    return {
+        'total_projects': len(projects),
+        'active_projects': sum(1 for p in projects if p.tasks_todo or p.tasks_inprogress),
+        'total_tasks': sum(p.tasks_count for p in projects),
+        'tasks_todo': sum(p.tasks_todo for p in projects),
+        'tasks_inprogress': sum(p.tasks_inprogress for p in projects),
+        'tasks_done': sum(p.tasks_done for p in projects),
+    }
@@ -0,0 +1,55 @@
+"""
+Routing of reads to a replica database.
+
+When DATABASE_READ_ALIAS names a configured database, reads made while serving GET/HEAD/OPTIONS
+requests go to it (see api.middleware.ReadReplicaMiddleware), as do reads inside replica_reads(),
+which read-only POST endpoints such as the chart batch use for their aggregations. Everything else
+reads from and writes to 'default': writes, reads in unsafe requests, reads inside a transaction,
+management commands and signals. After a write the client is pinned to 'default' for
+REPLICA_PIN_SECONDS, so it reads its own writes despite replication lag.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+reading_from_replica = ContextVar('reading_from_replica', default=False)
+
+
+def read_alias():
+    alias = settings.DATABASE_READ_ALIAS
+    return alias if alias and alias in settings.DATABASES else None
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    token = reading_from_replica.set(enabled)
+    try:
+        yield
+    finally:
+        reading_from_replica.reset(token)
+
+
+def replica_in_use():
+    """Whether reads made now go to the replica."""
+    return ReadReplicaRouter().db_for_read(None) is not None
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = read_alias()
+        if alias is None or not reading_from_replica.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replica holds the same rows as default
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # the replica gets its schema from default (replication, or manage.py sync_replica)
+        return db != read_alias()
@@ -0,0 +1,82 @@
+"""
+Streaming CSV / NDJSON exports of tasks and work logs.
+
+Rows are read with values_list(...).iterator(chunk_size=...) (a server-side cursor where the database
+supports one) and written to a StreamingHttpResponse as they arrive, so memory use does not grow with
+the number of rows.
+"""
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+CSV = 'csv'
+NDJSON = 'ndjson'
+FORMATS = [CSV, NDJSON]
+CONTENT_TYPES = {
+    CSV: 'text/csv; charset=utf-8',
+    NDJSON: 'application/x-ndjson',
+}
+
+EXPORT_CHUNK_SIZE = 2000
+
+# (column, lookup)
+TASK_COLUMNS = [
+    ('id', 'id'),
+    ('name', 'name'),
+    ('status', 'status'),
+    ('story_points', 'story_points'),
+    ('estimation_hours', 'estimation_hours'),
+    ('deadline', 'deadline'),
+    ('project_id', 'project_id'),
+    ('project_name', 'project__name'),
+    ('assignee_id', 'assignee_id'),
+    ('assignee_username', 'assignee__username'),
+    ('completed_at', 'completed_at'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+]
+
+WORK_LOG_COLUMNS = [
+    ('id', 'id'),
+    ('user_id', 'user_id'),
+    ('username', 'user__username'),
+    ('date', 'date'),
+    ('hours_spent', 'hours_spent'),
+    ('task_id', 'task_id'),
+    ('task_name', 'task__name'),
+    ('project_id', 'project_id'),
+    ('effective_project_id', 'effective_project_id'),
+    ('effective_project_name', 'effective_project__name'),
+    ('description', 'description'),
+    ('created_at', 'created_at'),
+]
+
+
+class _Echo:
+    """File-like object whose write() returns the value, so csv.writer can feed a generator."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(header, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(header, rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(header, row))) + '\n'
+
+
+def export_response(queryset, columns, export_format, filename):
+    header = [column for column, _ in columns]
+    rows = queryset.values_list(*[lookup for _, lookup in columns]).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    lines = csv_lines(header, rows) if export_format == CSV else ndjson_lines(header, rows)
+    response = StreamingHttpResponse(lines, content_type=CONTENT_TYPES[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
@@ -1,12 +1,22 @@
 import django_filters
-from .models import Task
+from rest_framework.filters import OrderingFilter, SearchFilter
+
+from .models import Task, WorkLog
+from .search import get_task_search_backend
+
 
 class TaskFilter(django_filters.FilterSet):
     # Allow filtering by date range for deadline
     deadline_after = django_filters.DateFilter(field_name='deadline', lookup_expr='gte')
     deadline_before = django_filters.DateFilter(field_name='deadline', lookup_expr='lte')
-    # Allow filtering by project name
-    project_name = django_filters.CharFilter(field_name='project__name', lookup_expr='icontains')
+    # Tasks created in a period, e.g. for exports
+    created_after = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='gte')
+    created_before = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='lt')
+    # Allow filtering by project name / task name; words match by prefix through the full-text index
+    project_name = django_filters.CharFilter(method='filter_full_text')
+    name = django_filters.CharFilter(method='filter_full_text')
+    # kept for old clients: a plain substring match, so 'ask' still finds 'Task'
+    name__icontains = django_filters.CharFilter(field_name='name', lookup_expr='icontains')
 
 
     class Meta:
@@ -15,5 +25,40 @@ class TaskFilter(django_filters.FilterSet):
             'project_id': ['exact'],
             'status': ['exact', 'in'], # e.g. status=DONE or status__in=TODO,IN_PROGRESS
             'assignee_id': ['exact', 'isnull'],
-            'name': ['icontains'], # case-insensitive contains for task name
         }
+
+    def filter_full_text(self, queryset, name, value):
+        field = 'project_name' if name == 'project_name' else 'name'
+        return get_task_search_backend().search(queryset, value, fields=[field], rank=False)
+
+
+class WorkLogFilter(django_filters.FilterSet):
+    date_after = django_filters.DateFilter(field_name='date', lookup_expr='gte')
+    date_before = django_filters.DateFilter(field_name='date', lookup_expr='lte')
+
+    class Meta:
+        model = WorkLog
+        fields = {
+            'user_id': ['exact'],
+            'task_id': ['exact'],
+            'project_id': ['exact'],
+            'effective_project_id': ['exact'],  # logged on the project or on one of its tasks
+        }
+
+
+class TaskSearchFilter(SearchFilter):
+    """?search= over name, description and project name through the full-text index, ranked by relevance."""
+
+    def filter_queryset(self, request, queryset, view):
+        return get_task_search_backend().search(queryset, request.query_params.get(self.search_param, ''))
+
+
+class TaskOrderingFilter(OrderingFilter):
+    """Orders search results by relevance unless the client asks for another ?ordering=."""
+
+    def get_default_ordering(self, view):
+        request = getattr(view, 'request', None)
+        backend = get_task_search_backend()
+        if request is not None and backend.rank_ordering and request.query_params.get(TaskSearchFilter.search_param):
+            return [backend.rank_ordering, '-id']
+        return super().get_default_ordering(view)
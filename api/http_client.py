@@ -0,0 +1,261 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+
+import requests
+from django.core.exceptions import ImproperlyConfigured
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from . import metrics
+
+try:
+    import httpx
+except ImportError:  # only needed by AsyncHttpClient
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(requests.RequestException):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for `reset_timeout` seconds.
+    After that a single trial call is let through (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """Ends a trial call that neither succeeded nor failed (e.g. it was cancelled), so another may start."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class BaseHttpClient:
+    """
+    Circuit breaker, logging and latency metrics shared by the sync and async clients.
+    Every call is logged and its latency recorded; see stats().
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    # Read errors and retryable statuses are only retried for idempotent methods: a POST such as a
+    # QuickChart create may have been processed before its response was lost. Connection errors,
+    # where nothing was sent, are retried for every method.
+    RETRY_METHODS = frozenset(['HEAD', 'GET', 'PUT', 'DELETE', 'OPTIONS', 'TRACE'])
+
+    def __init__(self, name, connect_timeout=3.0, read_timeout=10.0, retries=2, backoff_factor=0.3,
+                 pool_size=10, failure_threshold=5, reset_timeout=30, latency_samples=1000, breaker=None):
+        self.name = name
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.pool_size = pool_size
+        self.breaker = breaker or CircuitBreaker(failure_threshold, reset_timeout)
+
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=latency_samples)
+        self.requests_count = 0
+        self.errors_count = 0
+        self.rejected_count = 0
+
+    def _check_circuit(self, method, url):
+        if not self.breaker.allow():
+            with self._lock:
+                self.rejected_count += 1
+            logger.warning("http_request client=%s method=%s url=%s outcome=circuit_open", self.name, method, url)
+            raise CircuitOpenError(f"Circuit for {self.name} is open; not calling {url}")
+
+    def _on_success(self, method, url, status, started):
+        self.breaker.record_success()
+        self._record(started)
+        metrics.record('http', time.perf_counter() - started)
+        logger.info("http_request client=%s method=%s url=%s status=%s duration_ms=%.1f outcome=ok",
+                    self.name, method, url, status, self._elapsed_ms(started))
+
+    def _on_error(self, method, url, status, started, error):
+        self.breaker.record_failure()
+        self._record(started, error=True)
+        metrics.record('http', time.perf_counter() - started)
+        logger.warning("http_request client=%s method=%s url=%s status=%s duration_ms=%.1f outcome=error error=%r",
+                       self.name, method, url, status, self._elapsed_ms(started), error)
+
+    @staticmethod
+    def _elapsed_ms(started):
+        return (time.perf_counter() - started) * 1000
+
+    def _record(self, started, error=False):
+        with self._lock:
+            self.requests_count += 1
+            self.errors_count += int(error)
+            self._latencies.append(self._elapsed_ms(started))
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                'requests': self.requests_count,
+                'errors': self.errors_count,
+                'rejected': self.rejected_count,
+                'circuit': self.breaker.state,
+            }
+        for p in (50, 95, 99):
+            stats[f'p{p}_ms'] = latencies[min(len(latencies) - 1, len(latencies) * p // 100)] if latencies else None
+        return stats
+
+
+class HttpClient(BaseHttpClient):
+    """
+    A shared requests.Session with a keep-alive connection pool, connect/read timeouts,
+    retries with exponential backoff for connection errors and, for idempotent methods, read errors
+    and 5xx/429 responses, and a circuit breaker.
+    """
+
+    def __init__(self, name, **kwargs):
+        super().__init__(name, **kwargs)
+        self.session = requests.Session()
+        retry = Retry(
+            total=self.retries, connect=self.retries, read=self.retries, status=self.retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=self.RETRY_STATUSES,
+            allowed_methods=self.RETRY_METHODS,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def request(self, method, url, **kwargs):
+        self._check_circuit(method, url)
+        kwargs.setdefault('timeout', (self.connect_timeout, self.read_timeout))
+        started = time.perf_counter()
+        status = None
+        try:
+            response = self.session.request(method, url, **kwargs)
+            status = response.status_code
+            response.raise_for_status()
+        except requests.RequestException as e:
+            self._on_error(method, url, status, started, e)
+            raise
+        except BaseException:
+            self.breaker.release_trial()
+            raise
+        self._on_success(method, url, status, started)
+        return response
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+
+class AsyncHttpClient(BaseHttpClient):
+    """
+    The asyncio counterpart of HttpClient, built on httpx.AsyncClient (optional dependency).
+    Pass the sync client's breaker to trip both clients together.
+    """
+
+    def __init__(self, name, **kwargs):
+        super().__init__(name, **kwargs)
+        # event loop -> (httpx.AsyncClient, the task that closes it)
+        self._clients = {}
+
+    @property
+    def client(self):
+        # httpx clients are bound to the event loop they were created on, so each loop gets its own
+        loop = asyncio.get_running_loop()
+        entry = self._clients.get(loop)
+        if entry is None:
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(max_connections=self.pool_size * 10, max_keepalive_connections=self.pool_size),
+                transport=httpx.AsyncHTTPTransport(retries=self.retries),
+            )
+            entry = self._clients[loop] = (client, loop.create_task(self._close_with_loop(loop, client)))
+        return entry[0]
+
+    async def _close_with_loop(self, loop, client):
+        # asyncio.run() (and so async_to_sync and ASGI servers) cancels the tasks left when it
+        # finishes, while the loop can still close the client's connections
+        try:
+            await loop.create_future()
+        finally:
+            del self._clients[loop]
+            await client.aclose()
+
+    async def request(self, method, url, **kwargs):
+        if httpx is None:
+            raise ImproperlyConfigured("AsyncHttpClient requires httpx to be installed.")
+        self._check_circuit(method, url)
+        started = time.perf_counter()
+        status = None
+        # the transport retries failed connections; retryable statuses are retried here with backoff
+        try:
+            for attempt in range(self.retries + 1):
+                response = await self.client.request(method, url, **kwargs)
+                status = response.status_code
+                if status in self.RETRY_STATUSES and method.upper() in self.RETRY_METHODS and attempt < self.retries:
+                    await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+                    continue
+                response.raise_for_status()
+                break
+        except httpx.HTTPError as e:
+            self._on_error(method, url, status, started, e)
+            raise requests.RequestException(str(e)) from e
+        except BaseException:
+            # cancelled, e.g. because the client disconnected: no verdict on the service, but a
+            # half-open trial must not stay in flight forever
+            self.breaker.release_trial()
+            raise
+        self._on_success(method, url, status, started)
+        return response
+
+    async def post(self, url, **kwargs):
+        return await self.request('POST', url, **kwargs)
+
+    async def get(self, url, **kwargs):
+        return await self.request('GET', url, **kwargs)
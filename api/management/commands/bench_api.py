@@ -0,0 +1,110 @@
+import json
+import logging
+import threading
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from api import benchmarks
+
+
+class Command(BaseCommand):
+    help = ("Times the API hot paths (task list, search, projects, dashboards, statistics, work log create) "
+            "and reports latency percentiles, queries per request and peak memory. Runs against a fresh test "
+            "database filled by generate_data unless --existing-user is given. Charts go to a local QuickChart stub.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', nargs='*', choices=list(benchmarks.SCENARIOS), help="Default: all.")
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warm', action='store_true', help="Keep the response and chart caches between requests.")
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--projects', type=int, default=10)
+        parser.add_argument('--tasks', type=int, default=1000)
+        parser.add_argument('--worklogs', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--existing-user', help="Run as this user against the configured database instead.")
+        parser.add_argument('--chart-delay', type=float, default=0.0, help="QuickChart stub latency in seconds.")
+        parser.add_argument('--output', help="Write the results to this JSON file.")
+        parser.add_argument('--compare', help="A JSON file from an earlier run to compare with.")
+        parser.add_argument('--threshold', type=float, default=0.1, help="Growth reported as a regression.")
+
+    def handle(self, *args, **options):
+        benchmarks.FakeQuickChartHandler.delay = options['chart_delay']
+        server = benchmarks.FakeQuickChartServer(('127.0.0.1', 0), benchmarks.FakeQuickChartHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{server.server_port}/chart'
+
+        setup_test_environment()
+        old_name = None
+        try:
+            if options['existing_user']:
+                user = User.objects.filter(username=options['existing_user']).first()
+                if user is None:
+                    raise CommandError(f"No user named {options['existing_user']}.")
+            else:
+                old_name = connection.settings_dict['NAME']
+                connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+                self.stdout.write("Generating data...")
+                user = benchmarks.generate(options['users'], options['projects'], options['tasks'],
+                                           options['worklogs'], seed=options['seed'])[0]
+            # failed requests show in the statuses column rather than as a traceback each
+            request_logger = logging.getLogger('django.request')
+            level, request_logger.level = request_logger.level, logging.CRITICAL
+            try:
+                with override_settings(CHART_BACKEND='quickchart', QUICK_CHART_API_URL=url):
+                    results = benchmarks.run(user, options['scenarios'], options['iterations'], options['warm'])
+            finally:
+                request_logger.level = level
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            server.shutdown()
+
+        run = {
+            'created_at': timezone.now().isoformat(),
+            'options': {key: options[key] for key in
+                        ['iterations', 'warm', 'users', 'projects', 'tasks', 'worklogs', 'seed', 'existing_user']},
+            'results': results,
+        }
+        self.report(results)
+        failed = benchmarks.failures(results)
+        if failed:
+            # their timings are those of an error path, not worth keeping or comparing
+            raise CommandError("Scenarios got responses other than 2xx: " + ', '.join(
+                f"{name} ({' '.join(f'{status}x{count}' for status, count in statuses.items())})"
+                for name, statuses in failed.items()
+            ))
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(run, f, indent=2)
+        if options['compare']:
+            with open(options['compare']) as f:
+                self.report_comparison(json.load(f), run, options['threshold'])
+
+    def report(self, results):
+        self.stdout.write(f"{'scenario':<22}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}{'peak KiB':>10}  statuses")
+        for name, result in results.items():
+            statuses = ' '.join(f'{status}x{count}' for status, count in result['statuses'].items())
+            self.stdout.write(
+                f"{name:<22}{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}{result['p99_ms']:>9.1f}"
+                f"{result['queries']:>9.1f}{result['peak_kib']:>10.1f}  {statuses}"
+            )
+
+    def report_comparison(self, baseline, run, threshold):
+        rows, regressions = benchmarks.compare(baseline, run, threshold)
+        self.stdout.write(f"\nCompared with the run of {baseline['created_at']}:")
+        self.stdout.write(f"{'scenario':<22}{'metric':<10}{'before':>10}{'after':>10}{'change':>9}")
+        for name, metric, before, after, change in rows:
+            self.stdout.write(f"{name:<22}{metric:<10}{before:>10.1f}{after:>10.1f}{change:>+9.0%}")
+        if regressions:
+            self.stdout.write(self.style.WARNING(
+                f"{len(regressions)} metrics grew by more than {threshold:.0%}: "
+                + ', '.join(f'{name} {metric}' for name, metric, *_ in regressions)
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"No metric grew by more than {threshold:.0%}."))
@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from api.benchmarks import FakeQuickChartHandler, FakeQuickChartServer, percentile
+from api.chart_cache import chart_cache
+from api.chart_templates import get_base_bar_chart_config
+from api.quickchart_helper import aget_chart_url, get_chart_url
+
+
+class Command(BaseCommand):
+    help = ("Compares chart generation throughput of the sync path (a fixed pool of worker threads, like sync "
+            "WSGI workers) with the async path (one event loop) against a local fake QuickChart server.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--workers', type=int, default=8, help="Threads for the sync run.")
+        parser.add_argument('--concurrency', type=int, default=100, help="In-flight requests for the async run.")
+        parser.add_argument('--delay', type=float, default=0.2, help="Fake chart server latency in seconds.")
+
+    def handle(self, *args, **options):
+        FakeQuickChartHandler.delay = options['delay']
+        server = FakeQuickChartServer(('127.0.0.1', 0), FakeQuickChartHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{server.server_port}/chart'
+
+        try:
+            with override_settings(CHART_BACKEND='quickchart', QUICK_CHART_API_URL=url):
+                results = [
+                    self.run_sync(options['requests'], options['workers']),
+                    self.run_async(options['requests'], options['concurrency']),
+                ]
+        finally:
+            server.shutdown()
+
+        self.stdout.write(f"{'mode':<8}{'requests':>10}{'parallel':>10}{'seconds':>10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}")
+        for mode, parallel, elapsed, latencies in results:
+            self.stdout.write(
+                f"{mode:<8}{len(latencies):>10}{parallel:>10}{elapsed:>10.2f}{len(latencies) / elapsed:>10.1f}"
+                f"{percentile(latencies, 50):>10.1f}{percentile(latencies, 95):>10.1f}"
+            )
+        sync_rate = len(results[0][3]) / results[0][2]
+        async_rate = len(results[1][3]) / results[1][2]
+        self.stdout.write(self.style.SUCCESS(f"async/sync throughput: {async_rate / sync_rate:.1f}x"))
+
+    @staticmethod
+    def chart_configs(count):
+        # distinct configs so every call misses the chart cache
+        configs = []
+        for i in range(count):
+            config = get_base_bar_chart_config()
+            config['data']['labels'] = ['a', 'b']
+            config['data']['datasets'][0]['data'] = [i, time.time()]
+            configs.append(config)
+        return configs
+
+    def run_sync(self, count, workers):
+        chart_cache.clear()
+        configs = self.chart_configs(count)
+
+        def timed(config):
+            started = time.perf_counter()
+            get_chart_url(config)
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            latencies = list(executor.map(timed, configs))
+        return 'sync', workers, time.perf_counter() - started, latencies
+
+    def run_async(self, count, concurrency):
+        chart_cache.clear()
+        configs = self.chart_configs(count)
+
+        async def run():
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def timed(config):
+                async with semaphore:
+                    started = time.perf_counter()
+                    await aget_chart_url(config)
+                    return time.perf_counter() - started
+
+            return await asyncio.gather(*(timed(config) for config in configs))
+
+        started = time.perf_counter()
+        latencies = asyncio.run(run())
+        return 'async', concurrency, time.perf_counter() - started, latencies
@@ -0,0 +1,159 @@
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from api.models import Project, Task, WorkLog
+
+
+def _percentile(latencies, p):
+    if not latencies:
+        return 0.0
+    latencies = sorted(latencies)
+    return latencies[min(len(latencies) - 1, len(latencies) * p // 100)] * 1000
+
+
+class Command(BaseCommand):
+    help = ("Runs task reads and WorkLog writes from concurrent threads against copies of the default SQLite "
+            "database, once with the default connection settings and once with SQLITE_TUNED_OPTIONS, "
+            "and compares throughput and 'database is locked' errors.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--write-ratio', type=float, default=0.2, help="Share of operations that write.")
+        parser.add_argument('--tasks', type=int, default=500, help="Tasks to create when the copy has none.")
+
+    def handle(self, *args, **options):
+        source = connections[DEFAULT_DB_ALIAS]
+        if source.vendor != 'sqlite':
+            raise CommandError("The default database is not SQLite.")
+        if 'api_worklog' not in source.introspection.table_names():
+            raise CommandError("The default database has no tables; run migrate first.")
+
+        directory = Path(tempfile.mkdtemp(prefix='bench-sqlite-'))
+        try:
+            results = [
+                self.run_mode('default', {}, directory, options),
+                self.run_mode('tuned', settings.SQLITE_TUNED_OPTIONS, directory, options),
+            ]
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+        self.stdout.write(f"{'mode':<8}{'ops':>8}{'ops/s':>10}{'reads':>8}{'writes':>8}{'locked':>8}"
+                          f"{'read p95':>10}{'write p95':>11}")
+        for mode, elapsed, stats in results:
+            ops = len(stats['read']) + len(stats['write'])
+            self.stdout.write(
+                f"{mode:<8}{ops:>8}{ops / elapsed:>10.1f}{len(stats['read']):>8}{len(stats['write']):>8}"
+                f"{stats['locked']:>8}{_percentile(stats['read'], 95):>10.1f}{_percentile(stats['write'], 95):>11.1f}"
+            )
+        default_ops = len(results[0][2]['read']) + len(results[0][2]['write'])
+        tuned_ops = len(results[1][2]['read']) + len(results[1][2]['write'])
+        self.stdout.write(self.style.SUCCESS(f"tuned/default throughput: {tuned_ops / max(default_ops, 1):.1f}x"))
+
+    def run_mode(self, mode, db_options, directory, options):
+        alias = f'bench_{mode}'
+        path = directory / f'{mode}.sqlite3'
+        self.copy_default(path)
+        connections.settings[alias] = {
+            **connections.settings[DEFAULT_DB_ALIAS], 'NAME': str(path), 'OPTIONS': dict(db_options), 'CONN_MAX_AGE': 0,
+        }
+        try:
+            tasks, user_ids = self.sample(alias, options['tasks'])
+            stats = {'read': [], 'write': [], 'locked': 0}
+            lock = threading.Lock()
+            deadline = time.monotonic() + options['seconds']
+
+            def worker(seed):
+                rng = random.Random(seed)
+                local = {'read': [], 'write': [], 'locked': 0}
+                try:
+                    while time.monotonic() < deadline:
+                        kind = 'write' if rng.random() < options['write_ratio'] else 'read'
+                        task_id, project_id = rng.choice(tasks)
+                        started = time.perf_counter()
+                        try:
+                            if kind == 'write':
+                                self.write(alias, task_id, project_id, rng.choice(user_ids))
+                            else:
+                                self.read(alias, project_id)
+                        except OperationalError as e:
+                            if 'locked' not in str(e):
+                                raise
+                            local['locked'] += 1
+                            continue
+                        local[kind].append(time.perf_counter() - started)
+                finally:
+                    connections[alias].close()
+                with lock:
+                    stats['read'] += local['read']
+                    stats['write'] += local['write']
+                    stats['locked'] += local['locked']
+
+            started = time.perf_counter()
+            threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(options['threads'])]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            return mode, time.perf_counter() - started, stats
+        finally:
+            connections[alias].close()
+            del connections.settings[alias]
+
+    @staticmethod
+    def copy_default(path):
+        source = connections[DEFAULT_DB_ALIAS]
+        source.ensure_connection()
+        target = sqlite3.connect(path)
+        try:
+            source.connection.backup(target)
+        finally:
+            target.close()
+
+    @staticmethod
+    def sample(alias, task_count):
+        """(task id, project id) pairs and user ids to work on; creates some when the copy has none."""
+        tasks = list(Task.objects.using(alias).values_list('id', 'project_id')[:1000])
+        user_ids = list(User.objects.using(alias).values_list('id', flat=True)[:100])
+        if not user_ids:
+            user_ids = [User.objects.db_manager(alias).create_user('bench').id]
+        if not tasks:
+            projects = Project.objects.using(alias).bulk_create(
+                Project(name=f'Bench {i}', owner_id=user_ids[0]) for i in range(10)
+            )
+            created = Task.objects.using(alias).bulk_create(
+                Task(project=projects[i % len(projects)], name=f'Bench task {i}', assignee_id=user_ids[0])
+                for i in range(task_count)
+            )
+            tasks = [(task.id, task.project_id) for task in created]
+        return tasks, user_ids
+
+    @staticmethod
+    def read(alias, project_id):
+        # a task list page and a time total, like the list and report endpoints
+        list(Task.objects.using(alias).select_related('project', 'assignee')
+             .filter(project_id=project_id).order_by('-created_at')[:50])
+        WorkLog.objects.using(alias).filter(effective_project_id=project_id).aggregate(total=Sum('hours_spent'))
+
+    @staticmethod
+    def write(alias, task_id, project_id, user_id):
+        # validate, then insert in one transaction, like the WorkLog create endpoint
+        with transaction.atomic(using=alias):
+            Task.objects.using(alias).filter(pk=task_id).exists()
+            WorkLog.objects.using(alias).create(
+                user_id=user_id, task_id=task_id, project_id=project_id, date=timezone.localdate(),
+                hours_spent=Decimal('1.50'),
+            )
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.benchmarks import generate
+
+
+class Command(BaseCommand):
+    help = "Creates a reproducible data set of users, projects, tasks and work logs, e.g. for bench_api."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--projects', type=int, default=10)
+        parser.add_argument('--tasks', type=int, default=1000)
+        parser.add_argument('--worklogs', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='bench', help="Prefix of the created usernames and names.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            users = generate(options['users'], options['projects'], options['tasks'], options['worklogs'],
+                             seed=options['seed'], prefix=options['prefix'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(users)} users, {options['projects']} projects, {options['tasks']} tasks and "
+            f"{options['worklogs']} work logs."
+        ))
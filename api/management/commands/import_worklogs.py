@@ -0,0 +1,39 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from api import worklog_import
+
+
+class Command(BaseCommand):
+    help = "Imports work logs from a CSV or JSON Lines file ('-' for stdin), streaming it in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--user', required=True, help="Username the rows are logged for unless they set user_id.")
+        parser.add_argument('--format', dest='import_format', choices=worklog_import.FORMATS)
+        parser.add_argument('--chunk-size', type=int, default=worklog_import.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['user']}' does not exist.")
+        path = options['path']
+        import_format = options['import_format'] or worklog_import.guess_format(filename=path)
+        if import_format is None:
+            raise CommandError("Cannot tell the format from the file name; pass --format.")
+
+        importer = worklog_import.WorkLogImport(user, allow_other_users=True, chunk_size=options['chunk_size'])
+        if path == '-':
+            report = importer.run(sys.stdin.buffer, import_format)
+        else:
+            with open(path, 'rb') as f:
+                report = importer.run(f, import_format)
+
+        for error in report['errors']:
+            self.stderr.write(f"line {error['line']}: {error['errors']}")
+        if report['errors_truncated']:
+            self.stderr.write(f"... {report['failed'] - len(report['errors'])} more rows failed")
+        self.stdout.write(self.style.SUCCESS(f"Imported {report['created']} work logs, {report['failed']} rows failed."))
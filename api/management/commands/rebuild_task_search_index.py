@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from api.search import get_task_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the full-text search index of tasks from the api_task and api_project tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        backend = get_task_search_backend(connection)
+        if backend.vendor is None:
+            self.stdout.write(f"No full-text index for the {connection.vendor} backend; nothing to rebuild.")
+            return
+        with transaction.atomic(using=options['database']), connection.cursor() as cursor:
+            backend.rebuild(cursor)
+        self.stdout.write(self.style.SUCCESS("Task search index rebuilt."))
@@ -0,0 +1,28 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from api.db_routers import read_alias
+
+
+class Command(BaseCommand):
+    help = ("Copies the default SQLite database to the replica database file (DB_REPLICA_NAME), "
+            "standing in for replication when running with a local read replica.")
+
+    def handle(self, *args, **options):
+        alias = read_alias()
+        if alias is None:
+            raise CommandError("No replica database is configured; set DB_REPLICA_NAME.")
+        source, target = connections[DEFAULT_DB_ALIAS], connections[alias]
+        if source.vendor != 'sqlite' or target.vendor != 'sqlite':
+            raise CommandError("Only SQLite databases are copied; other replicas are kept by the database server.")
+
+        source.ensure_connection()
+        target.close()
+        replica = sqlite3.connect(target.settings_dict['NAME'])
+        try:
+            source.connection.backup(replica)
+        finally:
+            replica.close()
+        self.stdout.write(self.style.SUCCESS(f"Copied {source.settings_dict['NAME']} to {target.settings_dict['NAME']}."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.models import WorkLog
+
+
+class Command(BaseCommand):
+    help = "Re-derives WorkLog.effective_project from each log's project or task, e.g. after raw SQL updates."
+
+    def handle(self, *args, **options):
+        updated = WorkLog.sync_effective_project()
+        self.stdout.write(self.style.SUCCESS(f"Updated {updated} work logs."))
@@ -0,0 +1,103 @@
+"""
+Per-request timings: database queries, serialization and outbound HTTP calls.
+
+RequestMetricsMiddleware (api.middleware) keeps a RequestMetrics in a ContextVar for the duration
+of each request. Queries are counted by record_query(), an execute wrapper installed on every
+database connection as it is opened, in whichever thread opens it; serializers time their
+to_representation() with timed('serialize') and the HTTP clients add their calls with record().
+Threads that run for the request in a copy of its context (sync_to_async() under ASGI, or
+charts.get_chart_urls) record into the same object.
+"""
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+current_metrics = ContextVar('request_metrics', default=None)
+
+# name -> Server-Timing description
+TIMINGS = {'db': 'Database', 'serialize': 'Serialization', 'http': 'External HTTP'}
+
+
+class RequestMetrics:
+    def __init__(self, capture_queries=False):
+        self.started = time.perf_counter()
+        self.duration = None
+        self.seconds = defaultdict(float)
+        self.counts = defaultdict(int)
+        # (sql, duration in seconds) of each query, when capturing
+        self.queries = [] if capture_queries else None
+        self._active = set()
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, count=1):
+        with self._lock:
+            self.seconds[name] += seconds
+            self.counts[name] += count
+
+    def record_query(self, execute, sql, params, many, context):
+        """Runs and times a query, as an execute wrapper."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.record('db', elapsed)
+            if self.queries is not None:
+                self.queries.append((sql, elapsed))
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started
+        return self
+
+    def ms(self, name):
+        return self.seconds[name] * 1000
+
+    def server_timing(self):
+        entries = [
+            f'{name};dur={self.ms(name):.1f};desc="{description} ({self.counts[name]})"'
+            for name, description in TIMINGS.items() if self.counts[name]
+        ]
+        entries.append(f'total;dur={self.duration * 1000:.1f}')
+        return ', '.join(entries)
+
+
+@contextmanager
+def timed(name):
+    """Adds the time spent in the block to the current request's `name` timing; nested blocks count once."""
+    metrics = current_metrics.get()
+    if metrics is None or name in metrics._active:
+        yield
+        return
+    metrics._active.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics._active.discard(name)
+        metrics.record(name, time.perf_counter() - started)
+
+
+def record(name, seconds):
+    metrics = current_metrics.get()
+    if metrics is not None:
+        metrics.record(name, seconds)
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper of every connection: times the query for the request running it, if any."""
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics.record_query(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    # sent again when a closed connection reopens; its wrappers stay
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
@@ -0,0 +1,141 @@
+import cProfile
+import io
+import logging
+import pstats
+import random
+import time
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .db_routers import read_alias, replica_reads
+from .metrics import RequestMetrics, current_metrics
+
+logger = logging.getLogger('api.metrics')
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_COOKIE = 'db_pin'
+
+
+def pinned_to_default(request):
+    """Whether the client wrote recently enough that it must read from default."""
+    return PIN_COOKIE in request.COOKIES
+
+
+class ReadReplicaMiddleware:
+    """
+    Lets the reads of safe requests go to the replica (api.db_routers), unless the client wrote
+    within REPLICA_PIN_SECONDS: writes set a cookie that pins its next requests to 'default'.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def use_replica(request):
+        return request.method in SAFE_METHODS and not pinned_to_default(request) and read_alias() is not None
+
+    @staticmethod
+    def pin(request, response):
+        if request.method not in SAFE_METHODS and read_alias() is not None:
+            response.set_cookie(PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax')
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with replica_reads(self.use_replica(request)):
+            response = self.get_response(request)
+        return self.pin(request, response)
+
+    async def __acall__(self, request):
+        with replica_reads(self.use_replica(request)):
+            response = await self.get_response(request)
+        return self.pin(request, response)
+
+
+class RequestMetricsMiddleware:
+    """
+    Measures each request (api.metrics): adds a Server-Timing header with database, serialization
+    and external HTTP time when REQUEST_METRICS is on, and logs a line per request on the
+    api.metrics logger, at WARNING for requests slower than REQUEST_SLOW_MS. A REQUEST_PROFILE_RATE
+    share of sync requests runs under cProfile with its queries captured; the slow ones are logged
+    with their slowest queries and functions, and their profile saved to REQUEST_PROFILE_DIR if set.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def sampled():
+        return settings.REQUEST_PROFILE_RATE > 0 and random.random() < settings.REQUEST_PROFILE_RATE
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profiler = cProfile.Profile() if self.sampled() else None
+        metrics = RequestMetrics(capture_queries=profiler is not None)
+        token = current_metrics.set(metrics)
+        try:
+            if profiler is not None:
+                profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+        finally:
+            current_metrics.reset(token)
+        return self.report(request, response, metrics.finish(), profiler)
+
+    async def __acall__(self, request):
+        # no profiling: other requests run on the same thread in between
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            # queries run in sync_to_async() threads, which record into `metrics` through the context
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.report(request, response, metrics.finish())
+
+    def report(self, request, response, metrics, profiler=None):
+        if settings.REQUEST_METRICS:
+            response['Server-Timing'] = metrics.server_timing()
+        duration_ms = metrics.duration * 1000
+        slow = duration_ms >= settings.REQUEST_SLOW_MS
+        logger.log(
+            logging.WARNING if slow else logging.INFO,
+            "request method=%s path=%s status=%s duration_ms=%.1f db_queries=%d db_ms=%.1f serialize_ms=%.1f "
+            "http_calls=%d http_ms=%.1f slow=%s",
+            request.method, request.path, response.status_code, duration_ms, metrics.counts['db'], metrics.ms('db'),
+            metrics.ms('serialize'), metrics.counts['http'], metrics.ms('http'), slow,
+        )
+        if slow and profiler is not None:
+            self.log_profile(request, metrics, profiler)
+        return response
+
+    @staticmethod
+    def log_profile(request, metrics, profiler):
+        slowest = sorted(metrics.queries, key=lambda query: query[1], reverse=True)[:10]
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(25)
+        logger.warning(
+            "slow_request method=%s path=%s queries=%d\nslowest queries:\n%s\nprofile:\n%s",
+            request.method, request.path, len(metrics.queries),
+            '\n'.join(f'{elapsed * 1000:8.1f} ms  {sql}' for sql, elapsed in slowest), output.getvalue(),
+        )
+        if settings.REQUEST_PROFILE_DIR:
+            directory = Path(settings.REQUEST_PROFILE_DIR)
+            directory.mkdir(parents=True, exist_ok=True)
+            name = f"{time.strftime('%Y%m%d-%H%M%S')}-{request.method}-{request.path.strip('/').replace('/', '_')}.prof"
+            profiler.dump_stats(directory / name)
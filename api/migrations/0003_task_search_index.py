@@ -0,0 +1,89 @@
+from django.db import migrations
+
+# The full-text index as api.search set it up when this migration was written: an FTS5 table kept
+# by triggers on SQLite, a weighted tsvector column kept by triggers on PostgreSQL. Other backends
+# have no index.
+SQLITE_SETUP = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS api_task_fts USING fts5(name, description, project_name)",
+    """CREATE TRIGGER IF NOT EXISTS api_task_fts_insert AFTER INSERT ON api_task BEGIN
+        INSERT INTO api_task_fts(rowid, name, description, project_name)
+        VALUES (new.id, new.name, coalesce(new.description, ''),
+                (SELECT name FROM api_project WHERE id = new.project_id));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS api_task_fts_update AFTER UPDATE OF name, description, project_id ON api_task BEGIN
+        DELETE FROM api_task_fts WHERE rowid = old.id;
+        INSERT INTO api_task_fts(rowid, name, description, project_name)
+        VALUES (new.id, new.name, coalesce(new.description, ''),
+                (SELECT name FROM api_project WHERE id = new.project_id));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS api_task_fts_delete AFTER DELETE ON api_task BEGIN
+        DELETE FROM api_task_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS api_project_fts_update AFTER UPDATE OF name ON api_project BEGIN
+        UPDATE api_task_fts SET project_name = new.name
+        WHERE rowid IN (SELECT id FROM api_task WHERE project_id = new.id);
+    END""",
+    "DELETE FROM api_task_fts",
+    """INSERT INTO api_task_fts(rowid, name, description, project_name)
+       SELECT t.id, t.name, coalesce(t.description, ''), p.name
+       FROM api_task t JOIN api_project p ON p.id = t.project_id""",
+]
+SQLITE_TEARDOWN = [
+    "DROP TRIGGER IF EXISTS api_project_fts_update",
+    "DROP TRIGGER IF EXISTS api_task_fts_delete",
+    "DROP TRIGGER IF EXISTS api_task_fts_update",
+    "DROP TRIGGER IF EXISTS api_task_fts_insert",
+    "DROP TABLE IF EXISTS api_task_fts",
+]
+
+POSTGRES_SETUP = [
+    "ALTER TABLE api_task ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    """CREATE OR REPLACE FUNCTION api_task_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce((SELECT name FROM api_project WHERE id = NEW.project_id), '')), 'C');
+        RETURN NEW;
+    END $$ LANGUAGE plpgsql""",
+    """CREATE OR REPLACE TRIGGER api_task_search_vector BEFORE INSERT OR UPDATE OF name, description, project_id
+        ON api_task FOR EACH ROW EXECUTE FUNCTION api_task_search_vector()""",
+    """CREATE OR REPLACE FUNCTION api_project_search_vector() RETURNS trigger AS $$
+    BEGIN
+        UPDATE api_task SET name = name WHERE project_id = NEW.id;
+        RETURN NEW;
+    END $$ LANGUAGE plpgsql""",
+    """CREATE OR REPLACE TRIGGER api_project_search_vector AFTER UPDATE OF name ON api_project
+        FOR EACH ROW EXECUTE FUNCTION api_project_search_vector()""",
+    "CREATE INDEX IF NOT EXISTS api_task_search_vector_idx ON api_task USING GIN (search_vector)",
+    "UPDATE api_task SET name = name",
+]
+POSTGRES_TEARDOWN = [
+    "DROP TRIGGER IF EXISTS api_project_search_vector ON api_project",
+    "DROP FUNCTION IF EXISTS api_project_search_vector()",
+    "DROP TRIGGER IF EXISTS api_task_search_vector ON api_task",
+    "DROP FUNCTION IF EXISTS api_task_search_vector()",
+    "ALTER TABLE api_task DROP COLUMN IF EXISTS search_vector",
+]
+
+SETUP = {'sqlite': SQLITE_SETUP, 'postgresql': POSTGRES_SETUP}
+TEARDOWN = {'sqlite': SQLITE_TEARDOWN, 'postgresql': POSTGRES_TEARDOWN}
+
+
+def run(statements):
+    def run_statements(apps, schema_editor):
+        with schema_editor.connection.cursor() as cursor:
+            for sql in statements.get(schema_editor.connection.vendor, []):
+                cursor.execute(sql)
+    return run_statements
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_task_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(SETUP), run(TEARDOWN)),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, DateField, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncMonth, TruncWeek
+
+
+def backfill_rollups(apps, schema_editor):
+    Task = apps.get_model('api', 'Task')
+    CompletionRollup = apps.get_model('api', 'CompletionRollup')
+    # the best completion time we have for tasks finished before completed_at existed
+    Task.objects.filter(status='DONE', completed_at__isnull=True).update(completed_at=F('updated_at'))
+
+    # rollups from the tasks table; 0005 rebuilds them from the status event log
+    done_tasks = Task.objects.filter(status='DONE')
+    rows = []
+    for period, trunc in (('WEEK', TruncWeek), ('MONTH', TruncMonth)):
+        grouped = done_tasks.annotate(period_start=trunc('completed_at', output_field=DateField())).values(
+            'period_start', 'project_id', 'assignee_id'
+        ).annotate(
+            tasks_completed=Count('id'),
+            pointed_tasks_completed=Count('id', filter=Q(story_points__isnull=False)),
+            story_points=Coalesce(Sum('story_points'), 0),
+        ).order_by()
+        rows += [CompletionRollup(period=period, **row) for row in grouped]
+    CompletionRollup.objects.all().delete()
+    CompletionRollup.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_task_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='CompletionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('WEEK', 'Week'), ('MONTH', 'Month')], max_length=5)),
+                ('period_start', models.DateField()),
+                ('tasks_completed', models.IntegerField(default=0)),
+                ('pointed_tasks_completed', models.IntegerField(default=0)),
+                ('story_points', models.IntegerField(default=0)),
+                ('assignee', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='completion_rollups', to=settings.AUTH_USER_MODEL)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='completion_rollups', to='api.project')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['period', 'period_start'], name='rollup_period_idx'), models.Index(fields=['period', 'project', 'period_start'], name='rollup_project_idx'), models.Index(fields=['period', 'assignee', 'period_start'], name='rollup_assignee_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:54
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, DateField, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth, TruncWeek
+
+
+def backfill_events(apps, schema_editor):
+    """One event per existing task: its creation, or its completion for tasks that are already DONE."""
+    Task = apps.get_model('api', 'Task')
+    TaskStatusEvent = apps.get_model('api', 'TaskStatusEvent')
+    TaskStatusEvent.objects.bulk_create((
+        TaskStatusEvent(
+            task_id=task.id,
+            project_id=task.project_id,
+            assignee_id=task.assignee_id,
+            to_status=task.status,
+            story_points=task.story_points,
+            created_at=task.completed_at if task.status == 'DONE' and task.completed_at else task.created_at,
+        )
+        for task in Task.objects.iterator(chunk_size=2000)
+    ), batch_size=1000)
+    rebuild_rollups_from_events(apps)
+
+
+def rebuild_rollups_from_events(apps):
+    """The rollups as api.rollups.rebuild_rollups() computed them when this migration was written."""
+    TaskStatusEvent = apps.get_model('api', 'TaskStatusEvent')
+    CompletionRollup = apps.get_model('api', 'CompletionRollup')
+    completed, reopened = Q(to_status='DONE'), Q(from_status='DONE')
+    pointed = Q(story_points__isnull=False)
+    events = TaskStatusEvent.objects.filter(completed | reopened)
+    rows = []
+    for period, trunc in (('WEEK', TruncWeek), ('MONTH', TruncMonth)):
+        grouped = events.annotate(period_start=trunc('created_at', output_field=DateField())).values(
+            'period_start', 'project_id', 'assignee_id'
+        ).annotate(
+            tasks_completed=Count('id', filter=completed) - Count('id', filter=reopened),
+            pointed_tasks_completed=Count('id', filter=completed & pointed) - Count('id', filter=reopened & pointed),
+            story_points=Coalesce(Sum('story_points', filter=completed), Value(0))
+            - Coalesce(Sum('story_points', filter=reopened), Value(0)),
+        ).order_by()
+        rows += [CompletionRollup(period=period, **row) for row in grouped]
+    CompletionRollup.objects.all().delete()
+    CompletionRollup.objects.bulk_create(rows, batch_size=1000)
+
+
+def remove_events(apps, schema_editor):
+    apps.get_model('api', 'CompletionRollup').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_completion_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskStatusEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, choices=[('TODO', 'To Do'), ('IN_PROGRESS', 'In Progress'), ('DONE', 'Done')], max_length=20, null=True)),
+                ('to_status', models.CharField(choices=[('TODO', 'To Do'), ('IN_PROGRESS', 'In Progress'), ('DONE', 'Done')], max_length=20)),
+                ('story_points', models.IntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('assignee', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='task_status_events', to=settings.AUTH_USER_MODEL)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_status_events', to='api.project')),
+                ('task', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='status_events', to='api.task')),
+            ],
+            options={
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['created_at'], name='task_event_created_idx'), models.Index(fields=['project', 'created_at'], name='task_event_project_idx'), models.Index(fields=['assignee', 'created_at'], name='task_event_assignee_idx'), models.Index(fields=['task', 'created_at'], name='task_event_task_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_events, remove_events),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_effective_project(apps, schema_editor):
+    Task = apps.get_model('api', 'Task')
+    WorkLog = apps.get_model('api', 'WorkLog')
+    WorkLog.objects.filter(task__isnull=True).update(effective_project_id=models.F('project_id'))
+    WorkLog.objects.filter(task__isnull=False).update(
+        effective_project_id=models.Subquery(Task.objects.filter(pk=models.OuterRef('task_id')).values('project_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_worklog_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='worklog',
+            name='effective_project',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='effective_work_logs', to='api.project'),
+        ),
+        migrations.AddIndex(
+            model_name='worklog',
+            index=models.Index(fields=['effective_project', 'date'], name='worklog_eff_project_date_idx'),
+        ),
+        migrations.RunPython(backfill_effective_project, migrations.RunPython.noop),
+    ]
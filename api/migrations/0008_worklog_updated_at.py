@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_worklog_effective_project'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='worklog',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -3,6 +3,60 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+from . import response_cache
+
+
+class InvalidatingQuerySet(models.QuerySet):
+    """
+    Bumps the response cache versions of the rows written by update() (and so bulk_update()) and
+    bulk_create(), which send no model signals. update() also sets updated_at, which Django only
+    sets on save(): ETags and the timesheet cache are derived from it.
+    """
+
+    def dependency_values(self, assigned):
+        """
+        {field: values} of the dependency fields of these rows, before and after update(**assigned),
+        read with one query for their distinct combinations however many rows there are.
+        """
+        fields = response_cache.DEPENDENCY_FIELDS[self.model._meta.model_name]
+        new_values, constants = {}, {}
+        for name, value in assigned.items():
+            field = self.model._meta.get_field(name).attname
+            if field not in fields:
+                continue
+            if hasattr(value, 'resolve_expression'):
+                # e.g. the Case() of bulk_update(), evaluated per row
+                new_values[f'new_{field}'] = value
+            else:
+                constants[field] = value.pk if isinstance(value, models.Model) else value
+        values = {field: set() for field in fields}
+        for row in self.order_by().values(*fields, **new_values).distinct():
+            for key, value in row.items():
+                values[key.removeprefix('new_')].add(value)
+        for field, value in constants.items():
+            values[field].add(value)
+        return values
+
+    def update(self, **kwargs):
+        if 'updated_at' not in kwargs and any(field.name == 'updated_at' for field in self.model._meta.concrete_fields):
+            kwargs['updated_at'] = timezone.now()
+        model_name = self.model._meta.model_name
+        if model_name not in response_cache.DEPENDENCY_FIELDS:
+            return super().update(**kwargs)
+        values = self.dependency_values(kwargs)
+        rows = super().update(**kwargs)
+        response_cache.invalidate(model_name, values)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        model_name = self.model._meta.model_name
+        if model_name in response_cache.DEPENDENCY_FIELDS:
+            response_cache.invalidate(model_name, {
+                field: {getattr(obj, field) for obj in objs} for field in response_cache.DEPENDENCY_FIELDS[model_name]
+            })
+        return objs
+
 
 class Project(models.Model):
     name = models.CharField(max_length=255)
@@ -11,6 +65,8 @@ class Project(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = InvalidatingQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
@@ -29,12 +85,94 @@ class Task(models.Model):
     story_points = models.IntegerField(null=True, blank=True) # Also mentioned as part of task management
     deadline = models.DateField(null=True, blank=True) # Mentioned in task creation
     estimation_hours = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True) # set when the task moves to DONE, see signals
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = InvalidatingQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.name} (Project: {self.project.name})"
 
+    def stamp_completed_at(self):
+        if self.status == 'DONE' and self.completed_at is None:
+            self.completed_at = timezone.now()
+        elif self.status != 'DONE':
+            self.completed_at = None
+
+    def save(self, *args, **kwargs):
+        self.stamp_completed_at()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'status' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'completed_at'}
+        super().save(*args, **kwargs)
+
+    class Meta:
+        # match the TaskFilter lookups and the keyset pagination of TaskViewSet
+        indexes = [
+            models.Index(fields=['project', 'status'], name='task_project_status_idx'),
+            models.Index(fields=['project', 'created_at'], name='task_project_created_idx'),
+            models.Index(fields=['assignee', 'status'], name='task_assignee_status_idx'),
+            models.Index(fields=['status', 'updated_at'], name='task_status_updated_idx'),
+            models.Index(fields=['deadline'], name='task_deadline_idx'),
+            models.Index(fields=['created_at', 'id'], name='task_created_id_idx'),
+        ]
+
+
+class TaskStatusEvent(models.Model):
+    """
+    Append-only log of task status transitions, written by api.task_events. from_status is empty for
+    the event recorded when a task is created. Rows are never updated, so past periods do not change.
+    """
+    task = models.ForeignKey(Task, related_name='status_events', on_delete=models.SET_NULL, null=True, blank=True)
+    project = models.ForeignKey(Project, related_name='task_status_events', on_delete=models.CASCADE)
+    assignee = models.ForeignKey(User, related_name='task_status_events', on_delete=models.SET_NULL, null=True, blank=True)
+    actor = models.ForeignKey(User, related_name='+', on_delete=models.SET_NULL, null=True, blank=True)
+    from_status = models.CharField(max_length=20, choices=Task.STATUS_CHOICES, null=True, blank=True)
+    to_status = models.CharField(max_length=20, choices=Task.STATUS_CHOICES)
+    story_points = models.IntegerField(null=True, blank=True) # at the time of the transition
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['created_at'], name='task_event_created_idx'),
+            models.Index(fields=['project', 'created_at'], name='task_event_project_idx'),
+            models.Index(fields=['assignee', 'created_at'], name='task_event_assignee_idx'),
+            models.Index(fields=['task', 'created_at'], name='task_event_task_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task_id}: {self.from_status or '-'} -> {self.to_status} at {self.created_at}"
+
+
+class CompletionRollup(models.Model):
+    """
+    Net completed tasks and story points per project, assignee and week/month, aggregated from
+    TaskStatusEvent by api.rollups. Rebuild with `manage.py rebuild_rollups`.
+    """
+    WEEK = 'WEEK'
+    MONTH = 'MONTH'
+    PERIOD_CHOICES = [
+        (WEEK, 'Week'),
+        (MONTH, 'Month'),
+    ]
+
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    project = models.ForeignKey(Project, related_name='completion_rollups', on_delete=models.CASCADE)
+    assignee = models.ForeignKey(User, related_name='completion_rollups', on_delete=models.SET_NULL, null=True, blank=True)
+    tasks_completed = models.IntegerField(default=0)
+    pointed_tasks_completed = models.IntegerField(default=0) # tasks with story points set
+    story_points = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['period', 'period_start'], name='rollup_period_idx'),
+            models.Index(fields=['period', 'project', 'period_start'], name='rollup_project_idx'),
+            models.Index(fields=['period', 'assignee', 'period_start'], name='rollup_assignee_idx'),
+        ]
+
 
 class WorkLog(models.Model):
     user = models.ForeignKey(User, related_name='work_logs', on_delete=models.CASCADE)
@@ -43,10 +181,44 @@ class WorkLog(models.Model):
     date = models.DateField(default=timezone.now)
     hours_spent = models.DecimalField(max_digits=4, decimal_places=2)
     description = models.TextField(blank=True, null=True)
+    # project, or the task's project: what per-project time totals filter on. Kept in sync by save(),
+    # sync_effective_project() and the task signals; only empty for logs with neither task nor project
+    effective_project = models.ForeignKey(Project, related_name='effective_work_logs', on_delete=models.CASCADE,
+                                          null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = InvalidatingQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.user.username} - {self.hours_spent}h on {self.date}"
 
+    def save(self, *args, **kwargs):
+        self.effective_project_id = self.project_id or (self.task.project_id if self.task_id else None)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'task', 'project'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'effective_project'}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def sync_effective_project(cls, task_ids=None):
+        """Re-derives effective_project in SQL, for all logs or for the logs of the given tasks."""
+        task_logs = cls.objects.filter(task__isnull=False)
+        if task_ids is not None:
+            task_logs = task_logs.filter(task_id__in=task_ids)
+        updated = task_logs.update(
+            effective_project_id=models.Subquery(Task.objects.filter(pk=models.OuterRef('task_id')).values('project_id')[:1])
+        )
+        if task_ids is None:
+            updated += cls.objects.filter(task__isnull=True).update(effective_project_id=models.F('project_id'))
+        return updated
+
     class Meta:
-        ordering = ['-date', '-created_at']
\ No newline at end of file
+        ordering = ['-date', '-created_at']
+        indexes = [
+            # timesheet reports and exports filter by date per user or per project
+            models.Index(fields=['user', 'date'], name='worklog_user_date_idx'),
+            models.Index(fields=['project', 'date'], name='worklog_project_date_idx'),
+            models.Index(fields=['task', 'date'], name='worklog_task_date_idx'),
+            models.Index(fields=['effective_project', 'date'], name='worklog_eff_project_date_idx'),
+        ]
\ No newline at end of file
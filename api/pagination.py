@@ -0,0 +1,92 @@
+from datetime import datetime
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Default pagination for all viewsets: newest first, with opaque ?cursor= links instead of page numbers,
+    so deep pages cost the same as the first one. A viewset's OrderingFilter still takes precedence.
+    """
+    ordering = '-created_at'
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class WorkLogCursorPagination(CreatedAtCursorPagination):
+    """Work logs page newest date first, as WorkLog.Meta.ordering lists them, rather than newest entry first."""
+    ordering = ('-date', '-created_at', '-id')
+
+
+class KeysetCursorPagination(CreatedAtCursorPagination):
+    """
+    Keyset pagination on (created_at, id). The cursor holds the created_at and id of the last row served
+    and the next page is selected with a WHERE on those values, so every page is an index range scan on
+    (created_at, id) no matter how deep it is. Other orderings fall back to CreatedAtCursorPagination.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = self.get_ordering(request, queryset, view)
+        self.keyset = ordering[0].lstrip('-') == 'created_at'
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor.reverse if self.cursor else False
+        self.descending = ordering[0].startswith('-')
+
+        # walking backwards (for the previous page) flips the ordering
+        descending = self.descending != reverse
+        queryset = queryset.order_by(*(('-created_at', '-id') if descending else ('created_at', 'id')))
+        if self.cursor and self.cursor.position:
+            queryset = self.after_position(queryset, *self.parse_position(self.cursor.position), descending)
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+        return self.page
+
+    @staticmethod
+    def after_position(queryset, created_at, pk, descending=True):
+        """
+        Rows after (created_at, pk) in the given direction. Written as a range on created_at minus the
+        already-served ties, rather than an OR, so the database can seek the (created_at, id) index.
+        """
+        if descending:
+            return queryset.filter(created_at__lte=created_at).exclude(created_at=created_at, id__gte=pk)
+        return queryset.filter(created_at__gte=created_at).exclude(created_at=created_at, id__lte=pk)
+
+    def parse_position(self, position):
+        try:
+            created_at, pk = position.rsplit('|', 1)
+            return datetime.fromisoformat(created_at), int(pk)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def position(item):
+        return f'{item.created_at.isoformat()}|{item.pk}'
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.position(self.page[-1])))
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.position(self.page[0])))
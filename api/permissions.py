@@ -1,22 +1,28 @@
 from rest_framework import permissions
 
+from . import access
+
+
+# Object checks compare ids only, against api.access for what is not on the object itself, so
+# they load no related objects.
+
 class IsProjectOwner(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:
             return True
-        return obj.owner == request.user
+        return obj.owner_id == request.user.id
 
 class IsAssigneeOrProjectOwner(permissions.BasePermission):
     def has_object_permission(self, request, view, obj): # obj here is a Task
         if request.method in permissions.SAFE_METHODS:
-            return obj.project.owner == request.user or obj.assignee == request.user or request.user.is_staff
-        return obj.project.owner == request.user or obj.assignee == request.user
+            return access.can_edit_task(request, obj) or request.user.is_staff
+        return access.can_edit_task(request, obj)
 
 class IsTaskAssignee(permissions.BasePermission):
     def has_object_permission(self, request, view, obj): # obj here is a Task
-        return obj.assignee == request.user
+        return obj.assignee_id == request.user.id
 
 
 class IsWorkLogOwner(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
-        return obj.user == request.user
\ No newline at end of file
+        return obj.user_id == request.user.id
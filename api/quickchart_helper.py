@@ -1,29 +1,43 @@
-import os
+from django.conf import settings
 
-import requests
-import json
+from .chart_backends import get_chart_backend
+from .chart_cache import chart_cache, chart_key
+
+
+def _cache_key(*args):
+    return f'{settings.CHART_BACKEND}:{chart_key(*args)}'
 
-QUICK_CHART_API_URL = os.environ.get("QUICK_CHART_API_URL","https://quickchart.io/chart")
 
 def get_chart_url(chart_config, width=500, height=300, device_pixel_ratio=1.0, format='png', background_color='transparent'):
     """
-    Generates a QuickChart URL for the given chart configuration.
+    Generates a chart URL for the given chart configuration using the configured CHART_BACKEND
+    ('quickchart' posts to the QuickChart API, 'local' renders the image on our side).
+    The URL may be relative to this site; use request.build_absolute_uri() before returning it.
+
+    URLs are cached by a hash of the chart config and render options, so an unchanged chart
+    does not hit the backend again until the cache entry expires.
     """
-    params = {
-        'chart': json.dumps(chart_config) if isinstance(chart_config, dict) else chart_config,
-        'width': width,
-        'height': height,
-        'bkg': background_color,
-        'format': format,
-        'devicePixelRatio': device_pixel_ratio,
-    }
-    try:
-        response = requests.post(f"{QUICK_CHART_API_URL}/create", json=params)
-        response.raise_for_status()
-        return response.json().get('url')
-    except requests.RequestException as e:
-        print(f"Error calling QuickChart API: {e}")
-        return None
-    except json.JSONDecodeError:
-        print(f"Error decoding QuickChart API response: {response.text}")
-        return None
+    key = _cache_key(chart_config, width, height, device_pixel_ratio, format, background_color)
+    chart_url = chart_cache.get(key)
+    if chart_url is None:
+        chart_url = get_chart_backend().get_chart_url(
+            chart_config, width=width, height=height, device_pixel_ratio=device_pixel_ratio,
+            format=format, background_color=background_color,
+        )
+        if chart_url:
+            chart_cache.set(key, chart_url)
+    return chart_url
+
+
+async def aget_chart_url(chart_config, width=500, height=300, device_pixel_ratio=1.0, format='png', background_color='transparent'):
+    """Async version of get_chart_url for ASGI views; uses httpx for the QuickChart backend when it is installed."""
+    key = _cache_key(chart_config, width, height, device_pixel_ratio, format, background_color)
+    chart_url = await chart_cache.aget(key)
+    if chart_url is None:
+        chart_url = await get_chart_backend().aget_chart_url(
+            chart_config, width=width, height=height, device_pixel_ratio=device_pixel_ratio,
+            format=format, background_color=background_color,
+        )
+        if chart_url:
+            await chart_cache.aset(key, chart_url)
+    return chart_url
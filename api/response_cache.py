@@ -0,0 +1,164 @@
+"""
+Versioned cache of API responses.
+
+A cached response is keyed by the requesting user, the URL and the current version token of every
+dependency it was built from, e.g. ('project', 5) or ('table', 'task'). Writes replace the tokens of
+the tables and the projects and users they touch: api.signals does it for save() and delete(), and
+InvalidatingQuerySet (api.models) for update(), bulk_update() and bulk_create(). Stale entries are
+never read again and simply expire. Responses are only cached when RESPONSE_CACHE_ALIAS names a cache
+shared by all workers (see settings); otherwise every request builds its response. Responses built
+from replica reads are served but not cached: a lagging replica would store what it read before a
+write under the versions that write set.
+
+Views may also pass validators, max(updated_at) and a row count of what the response shows, read with
+one aggregate query. The ETag and Last-Modified come from the validators only, never from the version
+tokens, so they survive a cache flush and agree between processes. A matching If-None-Match (or,
+without one, a fresh If-Modified-Since) gets a 304 without the response being built or loaded; a
+stale If-Match on a write gets a 412.
+"""
+import hashlib
+import json
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Max
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from .db_routers import replica_in_use
+
+# model name -> {field: dependency kind}: the responses a row appears in. A task's own row is
+# covered by the validators of the responses that show it.
+DEPENDENCY_FIELDS = {
+    'project': {'id': 'project', 'owner_id': 'user'},
+    'task': {'project_id': 'project', 'assignee_id': 'user'},
+}
+
+
+def enabled():
+    return settings.RESPONSE_CACHE_ALIAS is not None
+
+
+def cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def table(model_name):
+    return ('table', model_name)
+
+
+def version_key(dependency):
+    return 'version:{}:{}'.format(*dependency)
+
+
+def versions(dependencies):
+    keys = [version_key(dependency) for dependency in dependencies]
+    found = cache().get_many(keys)
+    missing = [key for key in keys if key not in found]
+    for key in missing:
+        # add() rather than set(): a concurrent bump must win
+        cache().add(key, uuid.uuid4().hex, None)
+    if missing:
+        found.update(cache().get_many(missing))
+    return [found.get(key) for key in keys]
+
+
+def bump(dependencies):
+    if enabled():
+        cache().set_many({version_key(dependency): uuid.uuid4().hex for dependency in set(dependencies)}, None)
+
+
+def invalidate(model_name, values):
+    """Bumps the table of `model_name` and the dependencies of `values`, {field: values written}."""
+    fields = DEPENDENCY_FIELDS[model_name]
+    bump([table(model_name)] + [(fields[field], value) for field, field_values in values.items()
+                                for value in field_values if value is not None])
+
+
+def queryset_validators(queryset, related=()):
+    """max(updated_at) of the rows and of the `related` (foreign key) rows they render, and the row count."""
+    validators = queryset.order_by().aggregate(
+        count=Count('pk'), modified=Max('updated_at'),
+        **{f'modified_{name}': Max(f'{name}__updated_at') for name in related}
+    )
+    count = validators.pop('count')
+    modified = [value for value in validators.values() if value is not None]
+    return {'modified': max(modified) if modified else None, 'count': count}
+
+
+def combine_validators(*validators):
+    modified = [v['modified'] for v in validators if v['modified'] is not None]
+    return {'modified': max(modified) if modified else None, 'count': tuple(v['count'] for v in validators)}
+
+
+def etag(request, name, validators):
+    """Identifies the state of the resource for this user, whichever representation is asked for."""
+    user = request.user
+    # the join date tells apart users that got the same id after a delete
+    material = [name, user.pk, getattr(user, 'date_joined', None), validators]
+    return '"{}"'.format(hashlib.sha256(json.dumps(material, default=str).encode('utf-8')).hexdigest()[:40])
+
+
+def not_modified(request, tag, validators):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return if_none_match.strip() == '*' or tag in parse_etags(if_none_match)
+    since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    modified = validators and validators['modified']
+    return since is not None and modified is not None and int(modified.timestamp()) <= since
+
+
+class PreconditionFailed(APIException):
+    status_code = 412
+    default_detail = 'The resource has been modified since it was fetched.'
+    default_code = 'precondition_failed'
+
+
+def check_if_match(request, name, validators):
+    """Raises PreconditionFailed unless the request's If-Match, if any, names the current ETag."""
+    if_match = request.headers.get('If-Match')
+    if if_match is None or if_match.strip() == '*':
+        return
+    if etag(request, name, validators) not in parse_etags(if_match):
+        raise PreconditionFailed()
+
+
+def cached_response(request, name, dependencies, build, validators=None):
+    """
+    The response of `build()` for this user and URL, served from the cache while none of
+    `dependencies` changed. Only 200 responses are cached. Without `validators` the response
+    gets no ETag and no 304.
+    """
+    headers = {'Cache-Control': 'private, no-cache'}
+    tag = None
+    if validators is not None:
+        tag = headers['ETag'] = etag(request, name, validators)
+        if validators['modified'] is not None:
+            headers['Last-Modified'] = http_date(validators['modified'].timestamp())
+        if not_modified(request, tag, validators):
+            return Response(status=304, headers=headers)
+
+    if not enabled():
+        response = build()
+        if response.status_code == 200:
+            for header, value in headers.items():
+                response[header] = value
+        return response
+
+    user = request.user
+    key = 'response:' + hashlib.sha256(json.dumps(
+        [name, user.pk, getattr(user, 'date_joined', None), versions(dependencies), tag,
+         request.get_host(), request.get_full_path(), getattr(request, 'accepted_media_type', None)],
+        default=str,
+    ).encode('utf-8')).hexdigest()
+    data = cache().get(key)
+    if data is None:
+        response = build()
+        if response.status_code != 200:
+            return response
+        data = response.data
+        if not replica_in_use():
+            cache().set(key, data, settings.RESPONSE_CACHE_TTL)
+    return Response(data, headers=headers)
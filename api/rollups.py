@@ -0,0 +1,89 @@
+"""
+Maintenance of CompletionRollup from the TaskStatusEvent log.
+
+An event moving a task into DONE adds one completed task and its story points to the week and month
+of the event, for the task's project and assignee at that moment; an event moving it out of DONE
+subtracts them again. Events are immutable, so rows for past periods stop changing once the period
+is over. Rows may be duplicated by concurrent writers; readers always Sum() over them.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, DateField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import CompletionRollup, TaskStatusEvent
+
+
+def week_start(value):
+    day = timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    return day - timedelta(days=day.weekday())
+
+
+def month_start(value):
+    day = timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    return day.replace(day=1)
+
+
+def event_sign(event):
+    if event.to_status == 'DONE':
+        return 1
+    if event.from_status == 'DONE':
+        return -1
+    return 0
+
+
+def apply_events(events):
+    """Adds the contribution of newly recorded events to the rollups."""
+    deltas = {}
+    for event in events:
+        sign = event_sign(event)
+        if not sign:
+            continue
+        for period, start in ((CompletionRollup.WEEK, week_start(event.created_at)),
+                              (CompletionRollup.MONTH, month_start(event.created_at))):
+            key = (period, start, event.project_id, event.assignee_id)
+            tasks, pointed, points = deltas.get(key, (0, 0, 0))
+            deltas[key] = (
+                tasks + sign,
+                pointed + sign * int(event.story_points is not None),
+                points + sign * (event.story_points or 0),
+            )
+
+    with transaction.atomic():
+        for (period, start, project_id, assignee_id), (tasks, pointed, points) in deltas.items():
+            keys = dict(period=period, period_start=start, project_id=project_id, assignee_id=assignee_id)
+            updated = CompletionRollup.objects.filter(
+                pk=CompletionRollup.objects.filter(**keys).order_by('pk').values('pk')[:1]
+            ).update(
+                tasks_completed=F('tasks_completed') + tasks,
+                pointed_tasks_completed=F('pointed_tasks_completed') + pointed,
+                story_points=F('story_points') + points,
+            )
+            if not updated:
+                CompletionRollup.objects.create(
+                    **keys, tasks_completed=tasks, pointed_tasks_completed=pointed, story_points=points
+                )
+
+
+def rebuild_rollups(event_model=TaskStatusEvent, rollup_model=CompletionRollup):
+    """Recomputes every rollup row from the event log."""
+    completed, reopened = Q(to_status='DONE'), Q(from_status='DONE')
+    pointed = Q(story_points__isnull=False)
+    events = event_model.objects.filter(completed | reopened)
+    rows = []
+    for period, trunc in ((CompletionRollup.WEEK, TruncWeek), (CompletionRollup.MONTH, TruncMonth)):
+        grouped = events.annotate(period_start=trunc('created_at', output_field=DateField())).values(
+            'period_start', 'project_id', 'assignee_id'
+        ).annotate(
+            tasks_completed=Count('id', filter=completed) - Count('id', filter=reopened),
+            pointed_tasks_completed=Count('id', filter=completed & pointed) - Count('id', filter=reopened & pointed),
+            story_points=Coalesce(Sum('story_points', filter=completed), Value(0))
+            - Coalesce(Sum('story_points', filter=reopened), Value(0)),
+        ).order_by()
+        rows += [rollup_model(period=period, **row) for row in grouped]
+    with transaction.atomic():
+        rollup_model.objects.all().delete()
+        rollup_model.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
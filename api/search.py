@@ -0,0 +1,208 @@
+"""
+Full-text search over tasks (name, description and project name).
+
+The index is kept by the database itself, so it stays in sync with every write path, including
+bulk_create/update and queryset.update():
+- SQLite: an FTS5 table api_task_fts maintained by triggers on api_task and api_project.
+- PostgreSQL: a weighted tsvector column api_task.search_vector with a GIN index, maintained by triggers.
+Other backends fall back to icontains lookups. The index is created by migration 0003 and can be
+rebuilt with `manage.py rebuild_task_search_index`.
+"""
+import re
+from functools import reduce
+from operator import and_, or_
+
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+SEARCH_FIELDS = {'name': 'name', 'description': 'description', 'project_name': 'project__name'}
+
+SQLITE_SETUP = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS api_task_fts USING fts5(name, description, project_name)",
+    """CREATE TRIGGER IF NOT EXISTS api_task_fts_insert AFTER INSERT ON api_task BEGIN
+        INSERT INTO api_task_fts(rowid, name, description, project_name)
+        VALUES (new.id, new.name, coalesce(new.description, ''),
+                (SELECT name FROM api_project WHERE id = new.project_id));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS api_task_fts_update AFTER UPDATE OF name, description, project_id ON api_task BEGIN
+        DELETE FROM api_task_fts WHERE rowid = old.id;
+        INSERT INTO api_task_fts(rowid, name, description, project_name)
+        VALUES (new.id, new.name, coalesce(new.description, ''),
+                (SELECT name FROM api_project WHERE id = new.project_id));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS api_task_fts_delete AFTER DELETE ON api_task BEGIN
+        DELETE FROM api_task_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS api_project_fts_update AFTER UPDATE OF name ON api_project BEGIN
+        UPDATE api_task_fts SET project_name = new.name
+        WHERE rowid IN (SELECT id FROM api_task WHERE project_id = new.id);
+    END""",
+]
+SQLITE_REBUILD = [
+    "DELETE FROM api_task_fts",
+    """INSERT INTO api_task_fts(rowid, name, description, project_name)
+       SELECT t.id, t.name, coalesce(t.description, ''), p.name
+       FROM api_task t JOIN api_project p ON p.id = t.project_id""",
+]
+SQLITE_TEARDOWN = [
+    "DROP TRIGGER IF EXISTS api_project_fts_update",
+    "DROP TRIGGER IF EXISTS api_task_fts_delete",
+    "DROP TRIGGER IF EXISTS api_task_fts_update",
+    "DROP TRIGGER IF EXISTS api_task_fts_insert",
+    "DROP TABLE IF EXISTS api_task_fts",
+]
+
+POSTGRES_SETUP = [
+    "ALTER TABLE api_task ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    """CREATE OR REPLACE FUNCTION api_task_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce((SELECT name FROM api_project WHERE id = NEW.project_id), '')), 'C');
+        RETURN NEW;
+    END $$ LANGUAGE plpgsql""",
+    """CREATE OR REPLACE TRIGGER api_task_search_vector BEFORE INSERT OR UPDATE OF name, description, project_id
+        ON api_task FOR EACH ROW EXECUTE FUNCTION api_task_search_vector()""",
+    """CREATE OR REPLACE FUNCTION api_project_search_vector() RETURNS trigger AS $$
+    BEGIN
+        UPDATE api_task SET name = name WHERE project_id = NEW.id;
+        RETURN NEW;
+    END $$ LANGUAGE plpgsql""",
+    """CREATE OR REPLACE TRIGGER api_project_search_vector AFTER UPDATE OF name ON api_project
+        FOR EACH ROW EXECUTE FUNCTION api_project_search_vector()""",
+    "CREATE INDEX IF NOT EXISTS api_task_search_vector_idx ON api_task USING GIN (search_vector)",
+]
+POSTGRES_REBUILD = [
+    "UPDATE api_task SET name = name",
+]
+POSTGRES_TEARDOWN = [
+    "DROP TRIGGER IF EXISTS api_project_search_vector ON api_project",
+    "DROP FUNCTION IF EXISTS api_project_search_vector()",
+    "DROP TRIGGER IF EXISTS api_task_search_vector ON api_task",
+    "DROP FUNCTION IF EXISTS api_task_search_vector()",
+    "ALTER TABLE api_task DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def search_terms(text):
+    return re.findall(r'\w+', text or '')
+
+
+class IContainsSearchBackend:
+    """Unindexed fallback: every term must appear in one of the fields (same as SearchFilter)."""
+    vendor = None
+    rank_ordering = None
+
+    def setup(self, cursor):
+        pass
+
+    def teardown(self, cursor):
+        pass
+
+    def rebuild(self, cursor):
+        pass
+
+    def search(self, queryset, text, fields=None, rank=True):
+        """
+        Tasks matching every term of `text` as a word prefix, in `fields` (all SEARCH_FIELDS by default).
+        With rank=True the results are annotated with search_rank; order them by rank_ordering.
+        """
+        terms = search_terms(text)
+        if not terms:
+            return queryset
+        lookups = [SEARCH_FIELDS[field] for field in fields or SEARCH_FIELDS]
+        return queryset.filter(reduce(and_, (
+            reduce(or_, (Q(**{f'{lookup}__icontains': term}) for lookup in lookups)) for term in terms
+        )))
+
+
+class SQLiteFTSSearchBackend(IContainsSearchBackend):
+    """FTS5 prefix matching ranked by bm25 (lower is better)."""
+    vendor = 'sqlite'
+    rank_ordering = 'search_rank'
+
+    def setup(self, cursor):
+        for sql in SQLITE_SETUP:
+            cursor.execute(sql)
+        self.rebuild(cursor)
+
+    def teardown(self, cursor):
+        for sql in SQLITE_TEARDOWN:
+            cursor.execute(sql)
+
+    def rebuild(self, cursor):
+        for sql in SQLITE_REBUILD:
+            cursor.execute(sql)
+
+    @staticmethod
+    def match_expression(terms, fields=None):
+        query = ' '.join(f'"{term}"*' for term in terms)
+        if fields:
+            return f'{{{" ".join(fields)}}} : ({query})'
+        return query
+
+    def search(self, queryset, text, fields=None, rank=True):
+        terms = search_terms(text)
+        if not terms:
+            return queryset
+        match = self.match_expression(terms, fields)
+        if not rank:
+            return queryset.filter(
+                id__in=RawSQL("SELECT rowid FROM api_task_fts WHERE api_task_fts MATCH %s", (match,))
+            )
+        # joined once, so that MATCH runs a single time and bm25() reads the rank of the current match.
+        # The rank is an annotation rather than an extra() select so that cursor pagination can filter on it.
+        return queryset.extra(
+            tables=['api_task_fts'],
+            where=['api_task_fts.rowid = api_task.id', 'api_task_fts MATCH %s'],
+            params=[match],
+        ).annotate(search_rank=RawSQL('bm25(api_task_fts, 10.0, 1.0, 5.0)', (), output_field=FloatField()))
+
+
+class PostgresSearchBackend(IContainsSearchBackend):
+    """tsvector prefix matching ranked by ts_rank (higher is better)."""
+    vendor = 'postgresql'
+    rank_ordering = '-search_rank'
+
+    def setup(self, cursor):
+        for sql in POSTGRES_SETUP:
+            cursor.execute(sql)
+        self.rebuild(cursor)
+
+    def teardown(self, cursor):
+        for sql in POSTGRES_TEARDOWN:
+            cursor.execute(sql)
+
+    def rebuild(self, cursor):
+        for sql in POSTGRES_REBUILD:
+            cursor.execute(sql)
+
+    def search(self, queryset, text, fields=None, rank=True):
+        terms = search_terms(text)
+        if not terms:
+            return queryset
+        if fields:
+            # the tsvector does not keep columns apart beyond their weights
+            weights = ''.join({'name': 'A', 'description': 'B', 'project_name': 'C'}[field] for field in fields)
+            tsquery = ' & '.join(f'{term}:*{weights}' for term in terms)
+        else:
+            tsquery = ' & '.join(f'{term}:*' for term in terms)
+        queryset = queryset.filter(
+            id__in=RawSQL(
+                "SELECT id FROM api_task WHERE search_vector @@ to_tsquery('simple', %s)", (tsquery,)
+            )
+        )
+        if not rank:
+            return queryset
+        return queryset.annotate(search_rank=RawSQL(
+            "ts_rank(api_task.search_vector, to_tsquery('simple', %s))", (tsquery,), output_field=FloatField()
+        ))
+
+
+SEARCH_BACKENDS = {backend.vendor: backend for backend in [SQLiteFTSSearchBackend(), PostgresSearchBackend()]}
+
+
+def get_task_search_backend(conn=None):
+    return SEARCH_BACKENDS.get((conn or connection).vendor, IContainsSearchBackend())
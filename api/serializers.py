@@ -1,20 +1,66 @@
 # api/serializers.py
+from django.db.models import Count, Prefetch
 from rest_framework import serializers
-from .models import Project, Task, WorkLog
+from .models import Project, Task, TaskStatusEvent, WorkLog
+from . import access, charts, metrics
 from django.contrib.auth.models import User
 
-class UserSimpleSerializer(serializers.ModelSerializer):
+BULK_MAX_ITEMS = 500
+
+
+def query_param_set(request, name):
+    """Comma-separated query parameter as a set, e.g. ?expand=tasks,owner."""
+    if request is None:
+        return set()
+    params = getattr(request, 'query_params', request.GET)
+    return {value.strip() for value in params.get(name, '').split(',') if value.strip()}
+
+
+class TimedRepresentationMixin:
+    """Counts to_representation() towards the request's serialization time (api.metrics)."""
+
+    def to_representation(self, instance):
+        with metrics.timed('serialize'):
+            return super().to_representation(instance)
+
+
+class SparseFieldsMixin:
+    """
+    ?fields=id,name limits the output to the listed fields (write-only fields are kept).
+    Fields listed in Meta.expandable_fields are left out, and not loaded, unless asked for
+    with ?expand=<field> or named in ?fields=.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        requested = query_param_set(request, 'fields')
+        expanded = query_param_set(request, 'expand') | requested
+        for name in list(self.fields):
+            if name in getattr(self.Meta, 'expandable_fields', ()) and name not in expanded:
+                self.fields.pop(name)
+            elif requested and name not in requested and not self.fields[name].write_only:
+                self.fields.pop(name)
+
+
+class UserSimpleSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email']
 
-class TaskSimpleSerializer(serializers.ModelSerializer):
+class TaskSimpleSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     assignee = UserSimpleSerializer(read_only=True, required=False)
     class Meta:
         model = Task
         fields = ['id', 'name', 'status', 'assignee', 'deadline']
 
-class ProjectSerializer(serializers.ModelSerializer):
+class TaskStatusEventSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
+    actor = UserSimpleSerializer(read_only=True)
+    class Meta:
+        model = TaskStatusEvent
+        fields = ['id', 'from_status', 'to_status', 'story_points', 'assignee_id', 'actor', 'created_at']
+
+class ProjectSerializer(TimedRepresentationMixin, SparseFieldsMixin, serializers.ModelSerializer):
     owner = UserSimpleSerializer(read_only=True)
     owner_id = serializers.PrimaryKeyRelatedField(
         queryset=User.objects.all(), source='owner', write_only=True
@@ -31,12 +77,48 @@ class ProjectSerializer(serializers.ModelSerializer):
             'tasks'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'owner']
+        # use ?expand=tasks; large projects can page through /projects/{id}/tasks/ instead
+        expandable_fields = ['tasks']
+
+    @staticmethod
+    def setup_eager_loading(queryset, request=None):
+        """
+        Loads everything the serializer reads in a fixed number of queries, however many projects there are.
+        Tasks are only prefetched when the request expands them, and only those the user may see.
+        """
+        queryset = queryset.select_related('owner').annotate(tasks_count=Count('tasks', distinct=True))
+        if 'tasks' in query_param_set(request, 'expand') | query_param_set(request, 'fields'):
+            tasks = access.visible_tasks_lazily(request.user, Task.objects.select_related('assignee'))
+            queryset = queryset.prefetch_related(Prefetch('tasks', queryset=tasks))
+        return queryset
 
     def get_tasks_count(self, obj):
+        # annotated by setup_eager_loading(); fall back to prefetched tasks, then to a COUNT query
+        if hasattr(obj, 'tasks_count'):
+            return obj.tasks_count
+        if 'tasks' in getattr(obj, '_prefetched_objects_cache', {}):
+            return len(obj.tasks.all())
         return obj.tasks.count()
 
 
-class TaskSerializer(serializers.ModelSerializer):
+class ProjectSummarySerializer(TimedRepresentationMixin, serializers.ModelSerializer):
+    """Project without its tasks; expects the counts annotated by dashboards.owned_projects_with_task_counts()."""
+    tasks_count = serializers.IntegerField(read_only=True)
+    tasks_todo = serializers.IntegerField(read_only=True)
+    tasks_inprogress = serializers.IntegerField(read_only=True)
+    tasks_done = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Project
+        fields = [
+            'id', 'name', 'description', 'owner_id',
+            'created_at', 'updated_at',
+            'tasks_count', 'tasks_todo', 'tasks_inprogress', 'tasks_done',
+        ]
+        read_only_fields = fields
+
+
+class TaskSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     assignee = UserSimpleSerializer(read_only=True, required=False)
     project_name = serializers.CharField(source='project.name', read_only=True)
 
@@ -53,9 +135,9 @@ class TaskSerializer(serializers.ModelSerializer):
             'id', 'name', 'description', 'status', 'story_points', 'deadline', 'estimation_hours',
             'project_id', 'project_name',
             'assignee_id', 'assignee',
-            'created_at', 'updated_at'
+            'completed_at', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'project_name', 'assignee']
+        read_only_fields = ['id', 'completed_at', 'created_at', 'updated_at', 'project_name', 'assignee']
 
     def validate_project_id(self, value):
         if not Project.objects.filter(pk=value.id).exists():
@@ -67,7 +149,53 @@ class TaskSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Assignee (User) does not exist.")
         return value
 
-class WorkLogSerializer(serializers.ModelSerializer):
+class TaskBulkItemSerializer(TaskSerializer):
+    """
+    One task of a bulk request. Projects and users are looked up in the `projects` and `users` dicts
+    of the context, loaded once for the whole request, instead of one query per item.
+    """
+    project_id = serializers.IntegerField(write_only=True)
+    assignee_id = serializers.IntegerField(write_only=True, allow_null=True, required=False)
+
+    def validate_project_id(self, value):
+        if value not in self.context['projects']:
+            raise serializers.ValidationError("Project does not exist.")
+        return value
+
+    def validate_assignee_id(self, value):
+        if value is not None and value not in self.context['users']:
+            raise serializers.ValidationError("Assignee (User) does not exist.")
+        return value
+
+
+class TaskBulkSerializer(serializers.Serializer):
+    tasks = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=BULK_MAX_ITEMS)
+
+
+class TaskBulkTransitionSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=BULK_MAX_ITEMS)
+    status = serializers.ChoiceField(choices=['IN_PROGRESS', 'DONE'])
+
+
+class TaskBulkReassignSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=BULK_MAX_ITEMS)
+    assignee_id = serializers.IntegerField(allow_null=True)
+
+    def validate_assignee_id(self, value):
+        if value is not None and not User.objects.filter(pk=value).exists():
+            raise serializers.ValidationError("Assignee (User) does not exist.")
+        return value
+
+
+def validate_work_log_target(task, project):
+    if not task and not project:
+        raise serializers.ValidationError("Work log must be associated with a task or a project.")
+    if task and project:
+        raise serializers.ValidationError(
+            "Work log cannot be associated with both a task and a project simultaneously.")
+
+
+class WorkLogSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     user = UserSimpleSerializer(read_only=True)
     user_id = serializers.PrimaryKeyRelatedField(
         queryset=User.objects.all(), source='user', write_only=True, default=serializers.CurrentUserDefault()
@@ -81,15 +209,63 @@ class WorkLogSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = WorkLog
-        fields = ['id', 'user', 'user_id', 'task', 'task_id', 'project', 'project_id', 'date', 'hours_spent',
-                  'description', 'created_at']
+        fields = ['id', 'user', 'user_id', 'task', 'task_id', 'project', 'project_id', 'effective_project_id', 'date',
+                  'hours_spent', 'description', 'created_at']
         read_only_fields = ['id', 'user', 'created_at', 'task',
-                            'project']
+                            'project', 'effective_project_id']
 
     def validate(self, data):
-        if not data.get('task') and not data.get('project'):
-            raise serializers.ValidationError("Work log must be associated with a task or a project.")
-        if data.get('task') and data.get('project'):
-            raise serializers.ValidationError(
-                "Work log cannot be associated with both a task and a project simultaneously.")
+        validate_work_log_target(data.get('task'), data.get('project'))
         return data
+
+
+class WorkLogImportRowSerializer(serializers.Serializer):
+    """
+    One row of a work log import. References are plain ids, checked in batches by api.worklog_import
+    rather than one query per row. user_id defaults to the importing user.
+    """
+    user_id = serializers.IntegerField(required=False)
+    task_id = serializers.IntegerField(required=False, allow_null=True)
+    project_id = serializers.IntegerField(required=False, allow_null=True)
+    date = serializers.DateField(required=False)
+    hours_spent = serializers.DecimalField(max_digits=4, decimal_places=2)
+    description = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+    def validate(self, data):
+        validate_work_log_target(data.get('task_id'), data.get('project_id'))
+        return data
+
+
+class ReportParamsSerializer(serializers.Serializer):
+    """Query parameters of the timesheet and estimate reports."""
+    group_by = serializers.CharField(required=False, default='user')
+    period = serializers.ChoiceField(choices=['day', 'week', 'month'], required=False)
+    date_after = serializers.DateField(required=False)
+    date_before = serializers.DateField(required=False)
+    user_id = serializers.IntegerField(required=False)
+    project_id = serializers.IntegerField(required=False)
+    task_id = serializers.IntegerField(required=False)
+
+    def validate_group_by(self, value):
+        group_by = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in group_by if name not in ('user', 'project', 'task')]
+        if unknown or not group_by:
+            raise serializers.ValidationError("Group by a comma-separated list of user, project and task.")
+        return list(dict.fromkeys(group_by))
+
+
+class ChartSpecSerializer(serializers.Serializer):
+    type = serializers.ChoiceField(choices=charts.CHART_TYPES)
+    project_id = serializers.IntegerField(required=False)
+    days = serializers.IntegerField(required=False, min_value=1, max_value=3650)
+
+    def validate(self, data):
+        if data['type'] in charts.PROJECT_CHART_TYPES and data.get('project_id') is None:
+            raise serializers.ValidationError(f"project_id is required for '{data['type']}' charts.")
+        data.setdefault('project_id', None)
+        data.setdefault('days', charts.DEFAULT_WINDOW_DAYS.get(data['type']))
+        return data
+
+
+class ChartBatchSerializer(serializers.Serializer):
+    charts = ChartSpecSerializer(many=True, allow_empty=False, max_length=20)
@@ -0,0 +1,76 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import response_cache, task_feed
+from .models import Project, Task, WorkLog
+from .task_events import record_status_changes
+
+NOT_LOADED = object()
+
+
+@receiver(post_init, sender=Task)
+def remember_status(sender, instance, **kwargs):
+    # read from __dict__ so deferred fields are not loaded
+    instance._saved_status = instance.__dict__.get('status', NOT_LOADED) if instance.pk else None
+    instance._saved_project_id = instance.__dict__.get('project_id', NOT_LOADED) if instance.pk else None
+
+
+def _previous_values(instance):
+    previous = {field: value for field, value in (instance._saved_refs or {}).items()
+                if field != 'id' and value is not None}
+    if instance._saved_status not in (None, NOT_LOADED):
+        previous['status'] = instance._saved_status
+    return previous
+
+
+# connected before the receivers below, which move the saved values on
+@receiver(post_save, sender=Task)
+def publish_task_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    event_type = task_feed.CREATED if created else task_feed.UPDATED
+    task_feed.publish([task_feed.task_event(event_type, instance, _previous_values(instance))])
+
+
+@receiver(post_delete, sender=Task)
+def publish_task_delete(sender, instance, **kwargs):
+    task_feed.publish([task_feed.task_event(task_feed.DELETED, instance)])
+
+
+@receiver(post_save, sender=Task)
+def move_work_logs(sender, instance, created, raw=False, **kwargs):
+    if created or raw or instance._saved_project_id in (NOT_LOADED, instance.project_id):
+        return
+    WorkLog.sync_effective_project([instance.pk])
+    instance._saved_project_id = instance.project_id
+
+
+@receiver(post_save, sender=Task)
+def record_status_event(sender, instance, created, raw=False, **kwargs):
+    from_status = None if created else instance._saved_status
+    if raw or from_status is NOT_LOADED:
+        return
+    record_status_changes([(instance, from_status)])
+    instance._saved_status = instance.status
+
+
+def _dependency_refs(instance):
+    fields = response_cache.DEPENDENCY_FIELDS[instance._meta.model_name]
+    return {field: instance.__dict__.get(field) for field in fields}
+
+
+@receiver(post_init, sender=Project)
+@receiver(post_init, sender=Task)
+def remember_dependency_refs(sender, instance, **kwargs):
+    instance._saved_refs = _dependency_refs(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Task)
+def invalidate_responses(sender, instance, **kwargs):
+    refs, saved = _dependency_refs(instance), instance._saved_refs or {}
+    response_cache.invalidate(instance._meta.model_name,
+                              {field: {value, saved.get(field)} for field, value in refs.items()})
+    instance._saved_refs = refs
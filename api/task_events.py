@@ -0,0 +1,50 @@
+"""
+Recording of TaskStatusEvent rows.
+
+Task saves are recorded by the signals in api.signals; code that writes tasks in bulk calls
+record_status_changes() itself. The acting user is taken from acting_as(), which the views and the
+admin wrap around their writes.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.utils import timezone
+
+from . import rollups
+from .models import TaskStatusEvent
+
+current_actor = ContextVar('task_event_actor', default=None)
+
+
+@contextmanager
+def acting_as(user):
+    token = current_actor.set(user if user is not None and user.is_authenticated else None)
+    try:
+        yield
+    finally:
+        current_actor.reset(token)
+
+
+def status_event(task, from_status, actor=None):
+    """The event for `task` having moved from `from_status` (None for a new task) to its current status."""
+    if actor is None:
+        actor = current_actor.get()
+    return TaskStatusEvent(
+        task_id=task.pk,
+        project_id=task.project_id,
+        assignee_id=task.assignee_id,
+        actor=actor,
+        from_status=from_status,
+        to_status=task.status,
+        story_points=task.story_points,
+        created_at=task.completed_at if task.status == 'DONE' and task.completed_at else timezone.now(),
+    )
+
+
+def record_status_changes(changes, actor=None):
+    """Records (task, from_status) pairs whose status changed, and updates the rollups."""
+    events = [status_event(task, from_status, actor) for task, from_status in changes if task.status != from_status]
+    if events:
+        TaskStatusEvent.objects.bulk_create(events)
+        rollups.apply_events(events)
+    return events
@@ -0,0 +1,212 @@
+"""
+Live feed of task changes, streamed as Server-Sent Events from /api/v1/async/tasks/events/.
+
+Task writes publish an event once their transaction commits: api.signals for save() and delete(),
+api.bulk for the bulk endpoints. The backend (TASK_FEED_BACKEND) carries events to the broker of
+every process: 'memory' delivers them in-process only, 'redis' goes through a Redis channel so
+all workers see every write. The broker hands each event to the subscriptions whose projects or
+assignees it touches. Events are not stored; a client that reconnects, or that falls more than
+TASK_FEED_QUEUE_SIZE events behind and gets a 'reset' event, should refetch what it shows.
+"""
+import asyncio
+import json
+import logging
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .task_events import current_actor
+
+try:
+    import redis
+except ImportError:  # only needed by RedisFeedBackend
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+CREATED = 'task.created'
+UPDATED = 'task.updated'
+DELETED = 'task.deleted'
+RESET = 'reset'
+
+TASK_FIELDS = ['id', 'name', 'status', 'project_id', 'assignee_id', 'story_points', 'deadline',
+               'completed_at', 'updated_at']
+
+FEED_BACKENDS = {
+    'memory': 'api.task_feed.InProcessFeedBackend',
+    'redis': 'api.task_feed.RedisFeedBackend',
+}
+
+
+def task_event(event_type, task, previous=None, actor=None):
+    """
+    The event for a write to `task`. `previous` holds the status, project_id and assignee_id the
+    task had before; changed ones are included so subscribers of the old scope hear about it too.
+    """
+    if actor is None:
+        actor = current_actor.get()
+    event = {
+        'type': event_type,
+        'task': {field: task.__dict__.get(field) for field in TASK_FIELDS},
+        'actor_id': actor.pk if actor is not None else None,
+    }
+    for field, value in (previous or {}).items():
+        if event_type == UPDATED and value != event['task'][field]:
+            event[f'previous_{field}'] = value
+    return event
+
+
+class Subscription:
+    """Events for the given projects or assignees, queued on the event loop that subscribed."""
+
+    def __init__(self, project_ids=(), assignee_ids=(), max_queued=1000):
+        self.project_ids = set(project_ids)
+        self.assignee_ids = set(assignee_ids)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_queued)
+
+    def matches(self, event):
+        task = event['task']
+        return (
+            bool(self.project_ids & {task['project_id'], event.get('previous_project_id')}) or
+            bool(self.assignee_ids & {task['assignee_id'], event.get('previous_assignee_id')})
+        )
+
+    def put(self, event):
+        # called from any thread
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        if self.queue.full():
+            # the client is too slow; drop what it has not read and tell it to refetch
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = {'type': RESET}
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class Broker:
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, project_ids=(), assignee_ids=()):
+        subscription = Subscription(project_ids, assignee_ids, settings.TASK_FEED_QUEUE_SIZE)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        get_feed_backend().listen(self)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def dispatch(self, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if subscription.matches(event):
+                try:
+                    subscription.put(event)
+                except RuntimeError:
+                    # its event loop is closed
+                    self.unsubscribe(subscription)
+
+
+broker = Broker()
+
+
+class BaseFeedBackend:
+    """Carries published events to the broker of every process."""
+
+    def publish(self, event):
+        raise NotImplementedError
+
+    def listen(self, broker):
+        """Starts delivering events to `broker`; called on every subscribe."""
+
+
+class InProcessFeedBackend(BaseFeedBackend):
+    def publish(self, event):
+        broker.dispatch(event)
+
+
+class RedisFeedBackend(BaseFeedBackend):
+    def __init__(self, url=None, channel=None):
+        if redis is None:
+            raise ImproperlyConfigured("RedisFeedBackend requires redis to be installed.")
+        self.client = redis.Redis.from_url(url or settings.TASK_FEED_REDIS_URL)
+        self.channel = channel or settings.TASK_FEED_CHANNEL
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def publish(self, event):
+        try:
+            self.client.publish(self.channel, json.dumps(event, cls=DjangoJSONEncoder))
+        except redis.RedisError as e:
+            logger.warning("Could not publish task event: %s", e)
+
+    def listen(self, broker):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._run, args=(broker,), daemon=True,
+                                                  name='task-feed-listener')
+                self._listener.start()
+
+    def _run(self, broker):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        for message in pubsub.listen():
+            broker.dispatch(json.loads(message['data']))
+
+
+@lru_cache(maxsize=None)
+def _load_backend(name):
+    return import_string(FEED_BACKENDS.get(name, name))()
+
+
+def get_feed_backend(name=None):
+    return _load_backend(name or settings.TASK_FEED_BACKEND)
+
+
+def publish(events):
+    """Publishes `events` once the current transaction commits."""
+    events = list(events)
+    if not events:
+        return
+
+    def send():
+        backend = get_feed_backend()
+        for event in events:
+            backend.publish(event)
+
+    transaction.on_commit(send)
+
+
+def sse_message(event):
+    return f"event: {event['type']}\ndata: {json.dumps(event, cls=DjangoJSONEncoder)}\n\n"
+
+
+async def stream(project_ids=(), assignee_ids=()):
+    """The SSE stream of one client; the subscription ends when the client disconnects."""
+    subscription = broker.subscribe(project_ids, assignee_ids)
+    try:
+        yield f'retry: {settings.TASK_FEED_RETRY_MS}\n\n'
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), settings.TASK_FEED_HEARTBEAT)
+            except asyncio.TimeoutError:
+                # keeps proxies from closing an idle connection
+                yield ': keep-alive\n\n'
+                continue
+            yield sse_message(event)
+    finally:
+        broker.unsubscribe(subscription)
@@ -1,3 +1,1382 @@
-from django.test import TestCase
+import asyncio
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler
+from unittest import mock
 
-# Create your tests here.
+import requests
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.db import transaction
+from django.db.utils import load_backend
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from requests.adapters import BaseAdapter
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APITestCase
+
+from . import access, benchmarks, chart_backends, charts, response_cache, task_feed
+from .chart_cache import ChartCache, chart_cache
+from .chart_renderer import render_chart
+from .db_routers import ReadReplicaRouter
+from .filters import TaskFilter
+from .http_client import AsyncHttpClient, CircuitBreaker, CircuitOpenError, HttpClient
+from .metrics import RequestMetrics, current_metrics
+from .middleware import PIN_COOKIE, ReadReplicaMiddleware
+from .permissions import IsAssigneeOrProjectOwner
+from .models import CompletionRollup, Project, Task, TaskStatusEvent, WorkLog
+from .pagination import KeysetCursorPagination
+from .rollups import rebuild_rollups, week_start
+from .views import OwnerDashboardView
+
+
+class StubRenderPool:
+    """Stands in for the ProcessPoolExecutor: submit() returns `future`."""
+
+    def __init__(self, future):
+        self.future = future
+
+    def submit(self, fn, *args):
+        return self.future
+
+    def shutdown(self, wait=True):
+        pass
+
+
+class LocalChartsMixin:
+    """Renders charts with the local backend, into a temporary directory."""
+
+    def setUp(self):
+        super().setUp()
+        self.chart_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.chart_dir)
+        chart_settings = override_settings(CHART_BACKEND='local', CHART_STORAGE_DIR=self.chart_dir)
+        chart_settings.enable()
+        self.addCleanup(chart_settings.disable)
+        # backends and chart URLs from other tests point to their own directories
+        chart_backends._load_backend.cache_clear()
+        self.addCleanup(chart_backends._load_backend.cache_clear)
+        chart_cache.clear()
+
+
+class LocalChartBackendTests(LocalChartsMixin, TestCase):
+    config = {
+        'type': 'bar',
+        'data': {'labels': ['Jan', 'Feb'], 'datasets': [{'label': 'Points', 'data': [3, 5]}]},
+        'options': {'plugins': {'title': {'display': True, 'text': 'Velocity & more'}}},
+    }
+
+    def setUp(self):
+        super().setUp()
+        self.backend = chart_backends.LocalChartBackend()
+
+    def test_svg(self):
+        image, ext = render_chart(self.config, format='svg')
+        self.assertEqual(ext, 'svg')
+        self.assertTrue(image.startswith(b'<svg'))
+        self.assertIn(b'Velocity &amp; more', image)
+        self.assertEqual(image.count(b'<rect'), 3)
+        image, _ = render_chart({'type': 'pie', 'data': {'labels': ['A', 'B'], 'datasets': [{'data': [1, 1]}]}},
+                                format='svg')
+        self.assertEqual(image.count(b'<path'), 2)
+
+    def test_charts_are_stored_by_content_hash(self):
+        url = self.backend.get_chart_url(self.config, format='svg')
+        self.assertEqual(self.backend.get_chart_url(json.dumps(self.config), format='svg'), url)
+        self.assertNotEqual(self.backend.get_chart_url(self.config, width=600, format='svg'), url)
+        self.assertEqual(len(os.listdir(self.chart_dir)), 2)
+        with self.assertLogs('api.chart_backends', 'WARNING'):
+            self.assertIsNone(self.backend.get_chart_url({'type': 'radar'}))
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'<svg'))
+        response.close()
+        self.assertEqual(self.client.get(reverse('chart-image', args=['0' * 32 + '.svg'])).status_code, 404)
+
+    @override_settings(CHART_RENDER_PROCESSES=1, CHART_RENDER_TIMEOUT=0.01)
+    def test_render_pool_timeout(self):
+        with mock.patch.object(chart_backends, '_render_pool', StubRenderPool(Future())), \
+                self.assertLogs('api.chart_backends', 'WARNING'):
+            self.assertIsNone(self.backend.get_chart_url(self.config, format='svg'))
+        self.assertEqual(os.listdir(self.chart_dir), [])
+
+    @override_settings(CHART_RENDER_PROCESSES=1)
+    def test_broken_render_pool_falls_back_to_svg(self):
+        future = Future()
+        future.set_exception(BrokenProcessPool('worker died'))
+        with mock.patch.object(chart_backends, '_render_pool', StubRenderPool(future)), \
+                self.assertLogs('api.chart_backends', 'WARNING'):
+            url = self.backend.get_chart_url(self.config, format='png')
+            self.assertTrue(url.endswith('.svg'))
+            # the next chart gets a new pool
+            self.assertIsNone(chart_backends._render_pool)
+
+
+class ChartCacheTests(TestCase):
+    def test_lru_eviction(self):
+        chart_urls = ChartCache(max_entries=2)
+        chart_urls.set('a', 'url-a')
+        chart_urls.set('b', 'url-b')
+        self.assertEqual(chart_urls.get('a'), 'url-a')
+        # 'b' is now the least recently used
+        chart_urls.set('c', 'url-c')
+        self.assertEqual([chart_urls.get(key) for key in 'abc'], ['url-a', None, 'url-c'])
+        self.assertEqual(chart_urls.stats(), {'size': 2, 'max_entries': 2, 'hits': 3, 'shared_hits': 0, 'misses': 1})
+
+    def test_ttl(self):
+        chart_urls = ChartCache(ttl=0)
+        chart_urls.set('a', 'url-a')
+        self.assertIsNone(chart_urls.get('a'))
+        self.assertEqual((chart_urls.stats()['size'], chart_urls.misses), (0, 1))
+
+    def test_shared_tier(self):
+        cache.clear()
+        ChartCache(cache_alias='default').set('a', 'url-a')
+        # another worker: empty in-process tier, same shared cache
+        chart_urls = ChartCache(cache_alias='default')
+        self.assertEqual(chart_urls.get('a'), 'url-a')
+        self.assertEqual(chart_urls.get('a'), 'url-a')
+        self.assertEqual(async_to_sync(chart_urls.aget)('b'), None)
+        self.assertEqual((chart_urls.shared_hits, chart_urls.hits, chart_urls.misses), (1, 1, 1))
+        chart_urls.clear()
+        self.assertEqual(chart_urls.stats()['size'], 0)
+
+
+class StubAdapter(BaseAdapter):
+    """A requests transport answering with the given statuses, in order."""
+
+    def __init__(self, *statuses):
+        super().__init__()
+        self.statuses = list(statuses)
+        self.calls = 0
+
+    def send(self, request, **kwargs):
+        self.calls += 1
+        response = requests.Response()
+        response.status_code = self.statuses.pop(0)
+        response.request, response.url, response._content = request, request.url, b'{}'
+        return response
+
+    def close(self):
+        pass
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """Answers 503 to the first `failures` requests, then 200."""
+    failures = 1
+    requests_seen = 0
+
+    def respond(self):
+        type(self).requests_seen += 1
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(503 if self.requests_seen <= self.failures else 200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    do_GET = do_POST = respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+class HttpClientTests(TestCase):
+    def client_with(self, *statuses, **kwargs):
+        client = HttpClient('test', retries=0, failure_threshold=2, reset_timeout=30, **kwargs)
+        adapter = StubAdapter(*statuses)
+        client.session.mount('http://', adapter)
+        return client, adapter
+
+    def test_circuit_breaker(self):
+        client, adapter = self.client_with(500, 500, 200, 200, 500)
+        with self.assertLogs('api.http_client', 'WARNING'):
+            for _ in range(2):
+                with self.assertRaises(requests.HTTPError):
+                    client.post('http://quickchart.test/create')
+            self.assertEqual(client.breaker.state, 'open')
+            with self.assertRaises(CircuitOpenError):
+                client.post('http://quickchart.test/create')
+        self.assertEqual((adapter.calls, client.stats()['rejected']), (2, 1))
+
+        # after reset_timeout a trial call is let through, and its success closes the circuit
+        client.breaker.opened_at -= 30
+        self.assertEqual(client.breaker.state, 'half-open')
+        client.post('http://quickchart.test/create')
+        self.assertEqual(client.breaker.state, 'closed')
+        client.post('http://quickchart.test/create')
+
+        # a failing trial opens it again, however few failures came before
+        client.breaker.opened_at = time.monotonic() - 30
+        with self.assertLogs('api.http_client', 'WARNING'), self.assertRaises(requests.HTTPError):
+            client.post('http://quickchart.test/create')
+        self.assertEqual((client.breaker.failures, client.breaker.state), (1, 'open'))
+
+    def test_half_open_lets_one_trial_through(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+        breaker.opened_at -= 30
+        self.assertEqual([breaker.allow(), breaker.allow()], [True, False])
+        breaker.record_success()
+        self.assertEqual((breaker.state, breaker.allow()), ('closed', True))
+
+    def test_only_idempotent_methods_are_retried(self):
+        server = benchmarks.FakeQuickChartServer(('127.0.0.1', 0), FlakyHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.shutdown)
+        client = HttpClient('test', retries=2, backoff_factor=0)
+        url = f'http://127.0.0.1:{server.server_port}/chart'
+
+        FlakyHandler.requests_seen = 0
+        self.assertEqual(client.get(url).status_code, 200)
+        self.assertEqual(FlakyHandler.requests_seen, 2)
+
+        FlakyHandler.requests_seen = 0
+        with self.assertLogs('api.http_client', 'WARNING'), self.assertRaises(requests.HTTPError):
+            client.post(url, json={})
+        self.assertEqual(FlakyHandler.requests_seen, 1)
+
+
+class ChartBatchTests(LocalChartsMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('employee')
+        self.client.force_authenticate(self.user)
+        self.mine = Project.objects.create(name='Mine', owner=self.user)
+        self.foreign = Project.objects.create(name='Foreign', owner=User.objects.create_user('owner'))
+        Task.objects.create(project=self.mine, name='Done', status='DONE', story_points=3, assignee=self.user)
+        Task.objects.create(project=self.foreign, name='Open', status='TODO')
+
+    def batch(self, specs):
+        return self.client.post(reverse('chart-batch'), {'charts': specs}, format='json')
+
+    def test_mixed_results(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.batch([
+                {'type': 'velocity', 'project_id': self.mine.id},
+                # charts of projects the user does not own, as the GET chart endpoints serve them
+                {'type': 'task_status', 'project_id': self.foreign.id},
+                {'type': 'velocity', 'project_id': self.foreign.id},
+                {'type': 'task_status', 'project_id': 0},
+                {'type': 'personal_completions'},
+            ])
+        self.assertEqual(response.status_code, 200)
+        results = response.data['charts']
+        self.assertEqual([result['status'] for result in results], [200, 200, 404, 404, 200])
+        self.assertEqual(results[2]['message'], charts.EMPTY_MESSAGES[charts.VELOCITY])
+        self.assertEqual(results[3]['message'], 'Project not found.')
+        self.assertTrue(results[1]['chart_url'].startswith('http://testserver/api/v1/charts/'))
+        # the projects, then one query per chart type whatever the number of projects
+        self.assertEqual(len(queries), 4)
+
+        response = self.client.get(reverse('project-task-status-chart', args=[self.foreign.id]))
+        self.assertEqual(response.data['chart_url'], results[1]['chart_url'])
+
+    def test_limit(self):
+        specs = [{'type': 'task_status', 'project_id': self.mine.id}] * 20
+        self.assertEqual(self.batch(specs).status_code, 200)
+        self.assertEqual(self.batch(specs + specs[:1]).status_code, 400)
+        self.assertEqual(self.batch([]).status_code, 400)
+        response = self.batch([{'type': 'velocity'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('project_id is required', str(response.data))
+
+
+class AsyncViewTests(LocalChartsMixin, APITestCase):
+    """The async views answer as their sync counterparts do."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('employee')
+        self.client.force_authenticate(self.user)
+        self.mine = Project.objects.create(name='Mine', owner=self.user)
+        self.foreign = Project.objects.create(name='Foreign', owner=User.objects.create_user('owner'))
+        Task.objects.create(project=self.mine, name='Done', status='DONE', story_points=3, assignee=self.user)
+        Task.objects.create(project=self.foreign, name='Open', status='TODO', assignee=self.user)
+
+    def get_async(self, url, user=None):
+        async def get():
+            client = AsyncClient()
+            if user is not None:
+                await client.aforce_login(user)
+            return await client.get(url)
+        return async_to_sync(get)()
+
+    def test_charts_match_sync_views(self):
+        for name, args in [
+            ('project-velocity-chart', [self.mine.id]),
+            ('project-velocity-chart', [self.foreign.id]),
+            ('project-task-status-chart', [self.foreign.id]),
+            ('project-task-status-chart', [0]),
+            ('business-stats-story-points', []),
+            ('user-personal-task-stats', []),
+        ]:
+            with self.subTest(name=name, args=args):
+                sync_name = 'project-project-velocity-chart' if name == 'project-velocity-chart' else name
+                expected = self.client.get(reverse(sync_name, args=args))
+                response = self.get_async(reverse(f'async-{name}', args=args), self.user)
+                self.assertEqual((response.status_code, response.json()), (expected.status_code, expected.json()))
+
+    def test_employee_dashboard_matches_sync_view(self):
+        expected = self.client.get(reverse('employee-dashboard')).json()
+        response = self.get_async(reverse('async-employee-dashboard'), self.user)
+        self.assertEqual(response.json(), expected)
+        self.assertEqual([task['name'] for task in expected['my_current_tasks']], ['Open'])
+
+    def test_requires_authentication(self):
+        response = self.get_async(reverse('async-business-stats-story-points'))
+        self.assertEqual(response.status_code, 403)
+
+
+class SlowHandler(benchmarks.FakeQuickChartHandler):
+    delay = 0.5
+
+
+class AsyncHttpClientTests(TestCase):
+    def serve(self, handler):
+        server = benchmarks.FakeQuickChartServer(('127.0.0.1', 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.shutdown)
+        return f'http://127.0.0.1:{server.server_port}/chart'
+
+    def test_clients_are_closed_with_their_loop(self):
+        url = self.serve(benchmarks.FakeQuickChartHandler)
+        client = AsyncHttpClient('test')
+
+        async def post():
+            response = await client.post(url, json={})
+            return response.json()['success'], client.client
+
+        success, first = async_to_sync(post)()
+        self.assertTrue(success)
+        self.assertTrue(first.is_closed)
+        _, second = async_to_sync(post)()
+        self.assertIsNot(second, first)
+        self.assertEqual(client._clients, {})
+
+    def test_cancelled_trial_is_released(self):
+        url = self.serve(SlowHandler)
+        client = AsyncHttpClient('test', failure_threshold=1, reset_timeout=30)
+        client.breaker.record_failure()
+        client.breaker.opened_at -= 30
+
+        async def cancel_trial():
+            request = asyncio.ensure_future(client.post(url, json={}))
+            await asyncio.sleep(0.1)
+            request.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await request
+
+        async_to_sync(cancel_trial)()
+        self.assertEqual(client.breaker.state, 'half-open')
+        self.assertTrue(client.breaker.allow())
+
+
+class OwnerDashboardTests(APITestCase):
+    def test_counts_come_from_one_query(self):
+        owner = User.objects.create_user('owner')
+        other = User.objects.create_user('other')
+        active = Project.objects.create(name='Active', owner=owner)
+        finished = Project.objects.create(name='Finished', owner=owner)
+        Project.objects.create(name='Empty', owner=owner)
+        for status in ['TODO', 'TODO', 'IN_PROGRESS', 'DONE']:
+            Task.objects.create(project=active, name=status, status=status)
+        Task.objects.create(project=finished, name='Done', status='DONE')
+        Task.objects.create(project=Project.objects.create(name='Not mine', owner=other), name='Other')
+
+        # build() directly: get() checks user.profile, which has no model in this project yet
+        request = Request(RequestFactory().get(reverse('owner-dashboard')))
+        request.user = owner
+        with CaptureQueriesContext(connection) as queries:
+            data = OwnerDashboardView().build(request).data
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(data['summary_stats'], {
+            'total_projects': 3, 'active_projects': 1, 'total_tasks': 5,
+            'tasks_todo': 2, 'tasks_inprogress': 1, 'tasks_done': 2,
+        })
+        counts = {project['name']: (project['tasks_count'], project['tasks_todo'], project['tasks_inprogress'],
+                                    project['tasks_done']) for project in data['projects_list']}
+        self.assertEqual(counts, {'Active': (4, 2, 1, 1), 'Finished': (1, 0, 0, 1), 'Empty': (0, 0, 0, 0)})
+
+
+class ListQueryCountTests(APITestCase):
+    """List endpoints must run the same number of queries however many rows they return."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('employee')
+        self.client.force_authenticate(self.user)
+
+    def create_rows(self, count):
+        start = Project.objects.count()
+        for i in range(start, start + count):
+            owner = User.objects.create_user(f'owner-{i}')
+            project = Project.objects.create(name=f'Project {i}', owner=owner)
+            for status in ['TODO', 'IN_PROGRESS', 'DONE']:
+                assignee = User.objects.create_user(f'user-{project.id}-{status}')
+                Task.objects.create(project=project, name=f'{status} task', status=status, assignee=assignee)
+            Task.objects.create(project=project, name='My task', status='TODO', assignee=self.user)
+            WorkLog.objects.create(user=self.user, project=project, hours_spent=1)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assertConstantQueries(self, url):
+        self.create_rows(2)
+        few = self.count_queries(url)
+        self.create_rows(5)
+        many = self.count_queries(url)
+        self.assertEqual(few, many, f"{url} ran {few} queries for 2 rows but {many} for 7")
+
+    def test_project_list(self):
+        self.assertConstantQueries(reverse('project-list'))
+
+    def test_project_list_with_tasks(self):
+        self.assertConstantQueries(reverse('project-list') + '?expand=tasks')
+
+    def test_task_list(self):
+        self.assertConstantQueries(reverse('task-list'))
+
+    def test_worklog_list(self):
+        self.assertConstantQueries(reverse('worklog-list'))
+
+    def test_employee_dashboard(self):
+        self.assertConstantQueries(reverse('employee-dashboard'))
+
+    def test_project_tasks_count(self):
+        self.create_rows(1)
+        response = self.client.get(reverse('project-list'))
+        self.assertEqual(response.data['results'][0]['tasks_count'], 4)
+        self.assertNotIn('tasks', response.data['results'][0])
+
+        response = self.client.get(reverse('project-list') + '?expand=tasks')
+        self.assertEqual(len(response.data['results'][0]['tasks']), 4)
+
+
+class PaginationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner')
+        self.client.force_authenticate(self.user)
+        self.project = Project.objects.create(name='Big project', owner=self.user)
+        Task.objects.bulk_create(Task(project=self.project, name=f'Task {i}') for i in range(5))
+
+    def test_project_tasks_sub_resource(self):
+        url = reverse('project-tasks', args=[self.project.id]) + '?page_size=2'
+        names = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 2)
+            names += [task['name'] for task in response.data['results']]
+            url = response.data['next']
+        self.assertCountEqual(names, [f'Task {i}' for i in range(5)])
+
+    def test_work_logs_page_by_date(self):
+        for date in ['2025-03-02', '2025-03-03', '2025-03-01']:
+            WorkLog.objects.create(user=self.user, project=self.project, hours_spent=1, date=date)
+        url = reverse('worklog-list') + '?page_size=2'
+        dates = []
+        while url:
+            response = self.client.get(url)
+            dates += [log['date'] for log in response.data['results']]
+            url = response.data['next']
+        # the back-dated log comes last even though it was written last
+        self.assertEqual(dates, ['2025-03-03', '2025-03-02', '2025-03-01'])
+
+    def test_sparse_fields(self):
+        response = self.client.get(reverse('project-list') + '?fields=id,name')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name'})
+
+
+class TaskKeysetPaginationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner')
+        self.client.force_authenticate(self.user)
+        project = Project.objects.create(name='Project', owner=self.user)
+        # identical created_at values must not be skipped or repeated across pages
+        Task.objects.bulk_create(Task(project=project, name=f'Task {i}') for i in range(7))
+        Task.objects.filter(id__lte=Task.objects.order_by('id')[3].id).update(created_at=timezone.now())
+
+    def walk(self, url):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            url = response.data['next']
+        return pages
+
+    def test_walks_every_task_once(self):
+        pages = self.walk(reverse('task-list') + '?page_size=3')
+        ids = [task['id'] for page in pages for task in page['results']]
+        expected = list(Task.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_previous_link(self):
+        pages = self.walk(reverse('task-list') + '?page_size=3')
+        response = self.client.get(pages[1]['previous'])
+        self.assertEqual(response.data['results'], pages[0]['results'])
+
+
+class TaskIndexTests(TestCase):
+    """The TaskFilter access patterns must be served by an index, not a full scan of api_task."""
+
+    def assertUsesIndex(self, queryset):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # tiny test tables are cheaper to scan; only a missing index should make the planner do it
+                cursor.execute('SET enable_seqscan = off')
+        plan = queryset.explain()
+        # SQLite reports index range lookups as SEARCH; SCAN walks the whole table or a whole index
+        full_scans = [line for line in plan.splitlines() if 'SCAN api_task' in line or 'Seq Scan on api_task' in line]
+        self.assertFalse(full_scans, f"Full scan in query plan:\n{plan}")
+        return plan
+
+    def filtered(self, **params):
+        filterset = TaskFilter(params, queryset=Task.objects.all())
+        self.assertTrue(filterset.is_valid(), filterset.errors)
+        return filterset.qs.order_by()
+
+    def test_filters_use_indexes(self):
+        user = User.objects.create_user('owner')
+        project = Project.objects.create(name='Project', owner=user)
+        for params in [
+            {'project_id': project.id},
+            {'project_id': project.id, 'status': 'DONE'},
+            {'status': 'DONE'},
+            {'status__in': 'TODO,IN_PROGRESS'},
+            {'assignee_id': user.id},
+            {'assignee_id': user.id, 'status': 'IN_PROGRESS'},
+            {'deadline_after': '2025-01-01', 'deadline_before': '2025-12-31'},
+        ]:
+            with self.subTest(params=params):
+                self.assertUsesIndex(self.filtered(**params))
+
+    def test_keyset_page_uses_index(self):
+        queryset = KeysetCursorPagination.after_position(Task.objects.all(), timezone.now(), 100)
+        plan = self.assertUsesIndex(queryset.order_by('-created_at', '-id')[:51])
+        self.assertIn('task_created_id_idx', plan)
+
+
+class TaskSearchTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner')
+        self.client.force_authenticate(self.user)
+        self.project = Project.objects.create(name='Payroll', owner=self.user)
+        self.invoice = Task.objects.create(project=self.project, name='Invoice export', description='CSV for accounting')
+        self.report = Task.objects.create(project=self.project, name='Monthly report', description='Includes invoices')
+
+    def search(self, **params):
+        response = self.client.get(reverse('task-list'), params)
+        self.assertEqual(response.status_code, 200)
+        return [task['id'] for task in response.data['results']]
+
+    def test_prefix_search_is_ranked(self):
+        # a name match ranks above a description match
+        self.assertEqual(self.search(search='invoi'), [self.invoice.id, self.report.id])
+        self.assertEqual(self.search(search='invoice csv'), [self.invoice.id])
+
+    def test_rank_matches_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.search(search='invoice')
+        [page] = [query['sql'] for query in queries if 'bm25' in query['sql']]
+        self.assertEqual(page.count('MATCH'), 1)
+
+    def test_ranked_results_page_both_ways(self):
+        Task.objects.bulk_create([
+            Task(project=self.project, name=f'Invoice {i}', description='invoice ' * (i % 3)) for i in range(7)
+        ])
+        url = reverse('task-list') + '?search=invoice&page_size=3'
+        expected = self.search(search='invoice', page_size=100)
+        self.assertEqual(len(expected), 9)
+
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            url = response.data['next']
+        self.assertEqual([task['id'] for page in pages for task in page['results']], expected)
+
+        backwards = []
+        url = pages[-1]['previous']
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            backwards.insert(0, [task['id'] for task in response.data['results']])
+            url = response.data['previous']
+        self.assertEqual(backwards, [[task['id'] for task in page['results']] for page in pages[:-1]])
+
+    def test_legacy_icontains_matches_substrings(self):
+        self.assertCountEqual(self.search(name__icontains='PORT'), [self.invoice.id, self.report.id])
+        self.assertEqual(self.search(name='port'), [])
+
+    def test_index_follows_writes(self):
+        self.project.name = 'Billing'
+        self.project.save()
+        self.assertCountEqual(self.search(project_name='bill'), [self.invoice.id, self.report.id])
+        self.assertEqual(self.search(project_name='payroll'), [])
+
+        Task.objects.filter(id=self.report.id).update(name='Quarterly summary')
+        self.assertEqual(self.search(name='quarter'), [self.report.id])
+        self.invoice.delete()
+        self.assertEqual(self.search(search='invoice'), [self.report.id])
+
+
+class CompletionRollupTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner')
+        self.client.force_authenticate(self.user)
+        self.project = Project.objects.create(name='Project', owner=self.user)
+
+    def rollup_rows(self):
+        return list(CompletionRollup.objects.filter(tasks_completed__gt=0).order_by('period', 'assignee_id').values_list(
+            'period', 'assignee_id', 'tasks_completed', 'pointed_tasks_completed', 'story_points'
+        ))
+
+    def test_rollups_follow_status_events(self):
+        task = Task.objects.create(project=self.project, name='Task', assignee=self.user, story_points=3)
+        other = Task.objects.create(project=self.project, name='Other', status='DONE')
+        self.assertIsNotNone(other.completed_at)
+        task.status = 'DONE'
+        task.save()
+        # neither later edits nor deletes rewrite the period the task was completed in
+        task.story_points = 5
+        task.save()
+        other.delete()
+        self.assertEqual(self.rollup_rows(), [
+            ('MONTH', None, 1, 0, 0), ('MONTH', self.user.id, 1, 1, 3),
+            ('WEEK', None, 1, 0, 0), ('WEEK', self.user.id, 1, 1, 3),
+        ])
+        incremental = self.rollup_rows()
+        rebuild_rollups()
+        self.assertEqual(self.rollup_rows(), incremental)
+
+        task.status = 'IN_PROGRESS'
+        task.save()
+        self.assertIsNone(task.completed_at)
+        self.assertEqual([row[1] for row in self.rollup_rows()], [None, None])
+
+    def test_statistics_sum_duplicate_and_negative_rows(self):
+        this_week, last_week = week_start(timezone.now()), week_start(timezone.now()) - timezone.timedelta(days=7)
+        for start, tasks, pointed, points in [
+            # completed, then reopened: nothing left
+            (last_week, 1, 1, 3), (last_week, -1, -1, -3),
+            # two completions, one reopened
+            (this_week, 2, 2, 5), (this_week, -1, -1, -2),
+        ]:
+            CompletionRollup.objects.create(
+                period=CompletionRollup.WEEK, period_start=start, project=self.project, assignee=self.user,
+                tasks_completed=tasks, pointed_tasks_completed=pointed, story_points=points,
+            )
+        velocity = charts.velocity_by_project([self.project.id])[self.project.id]
+        self.assertEqual([(row['period_start'], row['total_story_points']) for row in velocity], [(this_week, 3)])
+
+    def test_statistics_read_rollups(self):
+        Task.objects.create(project=self.project, name='Task', assignee=self.user, story_points=2, status='DONE')
+        with CaptureQueriesContext(connection) as queries:
+            data = charts.personal_completions_monthly(self.user)
+        self.assertEqual([row['tasks_count'] for row in data], [1])
+        self.assertNotIn('api_task', queries[0]['sql'])
+        self.assertEqual([row['total_story_points'] for row in charts.business_story_points_monthly()], [2])
+        self.assertEqual([row['total_story_points'] for row in charts.velocity_by_project([self.project.id])[self.project.id]], [2])
+
+
+class TaskStatusEventTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner')
+        self.client.force_authenticate(self.user)
+        self.project = Project.objects.create(name='Project', owner=self.user)
+        self.task = Task.objects.create(project=self.project, name='Task', assignee=self.user, story_points=8)
+
+    def test_transitions_are_logged(self):
+        self.client.post(reverse('task-start-progress', args=[self.task.id]))
+        self.client.post(reverse('task-mark-as-done', args=[self.task.id]))
+        self.client.patch(reverse('task-detail', args=[self.task.id]), {'story_points': 13})
+
+        response = self.client.get(reverse('task-history', args=[self.task.id]))
+        self.assertEqual(
+            [(event['from_status'], event['to_status'], event['story_points']) for event in response.data],
+            [(None, 'TODO', 8), ('TODO', 'IN_PROGRESS', 8), ('IN_PROGRESS', 'DONE', 8)]
+        )
+        self.assertEqual(response.data[-1]['actor']['id'], self.user.id)
+        self.task.refresh_from_db()
+        self.assertEqual(TaskStatusEvent.objects.get(to_status='DONE').created_at, self.task.completed_at)
+
+    def test_burndown(self):
+        Task.objects.create(project=self.project, name='Done', story_points=2, status='DONE')
+        self.task.status = 'DONE'
+        self.task.save()
+        burndown = charts.burndown_by_day(self.project.id, days=3)
+        self.assertEqual([item['remaining_story_points'] for item in burndown], [0, 0, 0])
+        TaskStatusEvent.objects.filter(to_status='TODO').update(created_at=timezone.now() - timezone.timedelta(days=1))
+        burndown = charts.burndown_by_day(self.project.id, days=3)
+        self.assertEqual([item['remaining_story_points'] for item in burndown], [0, 8, 0])
+
+
+class TaskBulkTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner')
+        self.other = User.objects.create_user('other')
+        self.client.force_authenticate(self.user)
+        self.project = Project.objects.create(name='Project', owner=self.user)
+        self.foreign_project = Project.objects.create(name='Foreign', owner=self.other)
+
+    def post(self, name, data, method='post'):
+        response = getattr(self.client, method)(reverse(f'task-{name}'), data, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return [(result['status'], result.get('id')) for result in response.data['results']]
+
+    def test_bulk_create_and_transition(self):
+        with CaptureQueriesContext(connection) as queries:
+            results = self.post('bulk-create', {'tasks': [
+                {'project_id': self.project.id, 'name': f'Task {i}', 'story_points': 2} for i in range(10)
+            ] + [
+                {'project_id': self.foreign_project.id, 'name': 'Not mine'},
+                {'project_id': self.project.id},
+            ]})
+        self.assertEqual([status for status, _ in results], [201] * 10 + [403, 400])
+        created = [task_id for _, task_id in results[:10]]
+        self.assertEqual(Task.objects.count(), 10)
+        self.assertEqual(TaskStatusEvent.objects.filter(from_status__isnull=True).count(), 10)
+        self.assertLess(len(queries), 15)
+
+        results = self.post('bulk-transition', {'ids': created + [0], 'status': 'DONE'})
+        self.assertEqual({status for status, _ in results}, {400, 404})
+        self.post('bulk-transition', {'ids': created, 'status': 'IN_PROGRESS'})
+        with CaptureQueriesContext(connection) as queries:
+            results = self.post('bulk-transition', {'ids': created, 'status': 'DONE'})
+        self.assertEqual({status for status, _ in results}, {200})
+        self.assertLess(len(queries), 15)
+        self.assertFalse(Task.objects.filter(completed_at__isnull=True).exists())
+        self.assertEqual(charts.business_story_points_monthly()[0]['total_story_points'], 20)
+
+    def test_bulk_update_and_reassign(self):
+        mine = Task.objects.create(project=self.project, name='Mine')
+        foreign = Task.objects.create(project=self.foreign_project, name='Foreign')
+        results = self.post('bulk-update', {'tasks': [
+            {'id': mine.id, 'name': 'Renamed', 'status': 'DONE'},
+            {'id': foreign.id, 'name': 'Renamed'},
+            {'id': mine.id, 'name': 'Twice'},
+            {'id': 'x'},
+        ]}, method='patch')
+        self.assertEqual(results, [(200, mine.id), (403, foreign.id), (400, mine.id), (400, None)])
+        mine.refresh_from_db()
+        self.assertEqual((mine.name, mine.status), ('Renamed', 'DONE'))
+        self.assertIsNotNone(mine.completed_at)
+
+        # an assignee may edit a task, but only moves it to a project they own
+        assigned = Task.objects.create(project=self.foreign_project, name='Assigned', assignee=self.user)
+        other_project = Project.objects.create(name='Other', owner=self.user)
+        results = self.post('bulk-update', {'tasks': [
+            {'id': assigned.id, 'project_id': self.project.id},
+            {'id': mine.id, 'project_id': self.foreign_project.id},
+            {'id': mine.id, 'name': 'Moved'},
+        ]}, method='patch')
+        self.assertEqual([status for status, _ in results], [200, 403, 400])
+        results = self.post('bulk-update', {'tasks': [{'id': mine.id, 'project_id': other_project.id}]}, method='patch')
+        self.assertEqual(results, [(200, mine.id)])
+        self.assertEqual(dict(Task.objects.filter(id__in=[mine.id, assigned.id]).values_list('id', 'project_id')),
+                         {mine.id: other_project.id, assigned.id: self.project.id})
+
+        results = self.post('bulk-reassign', {'ids': [mine.id, foreign.id], 'assignee_id': self.other.id})
+        self.assertEqual(results, [(200, mine.id), (403, foreign.id)])
+        self.assertEqual(Task.objects.get(id=mine.id).assignee_id, self.other.id)
+
+
+class WorkLogImportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('employee')
+        self.client.force_authenticate(self.user)
+        self.project = Project.objects.create(name='Project', owner=self.user)
+        self.task = Task.objects.create(project=self.project, name='Task')
+
+    def test_csv_import(self):
+        body = 'task_id,project_id,date,hours_spent,description\n' + (
+            f'{self.task.id},,2025-03-03,2.5,Review\n'
+            f',{self.project.id},2025-03-04,1,"Planning,\nnotes"\n'
+            f'{self.task.id},{self.project.id},2025-03-05,1,Both\n'
+            f'999,,2025-03-06,1,Missing task\n'
+        ) * 3
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('worklog-import-work-logs'), body, content_type='text/csv')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created'], response.data['failed']), (6, 6))
+        self.assertEqual([error['line'] for error in response.data['errors'][:2]], [5, 6])
+        self.assertIn('task_id', response.data['errors'][1]['errors'])
+        self.assertLess(len(queries), 10)
+        self.assertEqual(WorkLog.objects.filter(user=self.user, description='Planning,\nnotes').count(), 3)
+
+    def test_jsonl_import(self):
+        other = User.objects.create_user('other')
+        body = '\n'.join([
+            json.dumps({'project_id': self.project.id, 'hours_spent': '3'}),
+            'not json',
+            json.dumps({'project_id': self.project.id, 'hours_spent': '3', 'user_id': other.id}),
+        ])
+        response = self.client.post(reverse('worklog-import-work-logs') + '?import_format=jsonl', body,
+                                    content_type='application/octet-stream')
+        self.assertEqual((response.data['created'], response.data['failed']), (1, 2))
+        self.assertEqual(response.data['errors'][1]['errors']['user_id'][0], 'You can only import your own work logs.')
+
+
+class ExportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner')
+        self.client.force_authenticate(self.user)
+        self.project = Project.objects.create(name='Project', owner=self.user)
+        Task.objects.bulk_create(Task(project=self.project, name=f'Task, {i}', status='DONE' if i % 2 else 'TODO')
+                                 for i in range(5))
+        WorkLog.objects.create(user=self.user, project=self.project, hours_spent=2, date='2025-03-01')
+        WorkLog.objects.create(user=self.user, project=self.project, hours_spent=3, date='2025-04-01')
+
+    def export(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_task_csv_export_uses_filters(self):
+        content = self.export(reverse('task-export') + '?status=DONE')
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(sorted(row['name'] for row in rows), ['Task, 1', 'Task, 3'])
+        self.assertEqual(rows[0]['project_name'], 'Project')
+
+    def test_worklog_ndjson_export(self):
+        content = self.export(reverse('worklog-export') + '?export_format=ndjson&date_after=2025-03-15')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([(row['date'], row['hours_spent']) for row in rows], [('2025-04-01', '3.00')])
+
+
+class TimesheetReportTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('owner')
+        self.employee = User.objects.create_user('employee')
+        self.client.force_authenticate(self.user)
+        self.project = Project.objects.create(name='Project', owner=self.user)
+        self.task = Task.objects.create(project=self.project, name='Task', estimation_hours=4)
+        WorkLog.objects.create(user=self.user, project=self.project, hours_spent=2, date='2025-03-03')
+        WorkLog.objects.create(user=self.employee, task=self.task, hours_spent=3, date='2025-03-04')
+        WorkLog.objects.create(user=self.employee, task=self.task, hours_spent='2.5', date='2025-04-01')
+
+    def report(self, **params):
+        response = self.client.get(reverse('timesheet-report'), params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_grouping(self):
+        data = self.report(group_by='project,user', period='month')
+        self.assertEqual(
+            [(str(row['period_start']), row['project_id'], row['user_id'], row['hours']) for row in data['results']],
+            [('2025-03-01', self.project.id, self.user.id, Decimal('2')),
+             ('2025-03-01', self.project.id, self.employee.id, Decimal('3')),
+             ('2025-04-01', self.project.id, self.employee.id, Decimal('2.5'))]
+        )
+        self.assertEqual(data['totals'], {'hours': Decimal('7.5'), 'entries': 3})
+
+    def test_closed_periods_are_cached_until_their_work_logs_change(self):
+        params = {'group_by': 'user', 'date_after': '2025-03-01', 'date_before': '2025-03-31'}
+        self.assertEqual(self.report(**params)['totals']['hours'], Decimal('5'))
+        # only the validators and the names are read: max(updated_at) and a count, then the usernames
+        with CaptureQueriesContext(connection) as queries:
+            self.report(**params)
+        self.assertEqual(len(queries), 2)
+        self.employee.username = 'renamed'
+        self.employee.save()
+        self.assertEqual([row['username'] for row in self.report(**params)['results']], ['owner', 'renamed'])
+
+        work_log = WorkLog.objects.create(user=self.user, project=self.project, hours_spent=1, date='2025-03-10')
+        self.assertEqual(self.report(**params)['totals']['hours'], Decimal('6'))
+        # update() sends no signals, and other workers' caches get none either way
+        WorkLog.objects.filter(id=work_log.id).update(hours_spent=4)
+        self.assertEqual(self.report(**params)['totals']['hours'], Decimal('9'))
+        WorkLog.objects.filter(id=work_log.id).delete()
+        self.assertEqual(self.report(**params)['totals']['hours'], Decimal('5'))
+
+    def test_estimates(self):
+        response = self.client.get(reverse('estimate-report'), {'date_before': '2025-03-31'})
+        row, = response.data['results']
+        self.assertEqual((row['estimation_hours'], row['logged_hours'], row['variance_hours']),
+                         (Decimal('4'), Decimal('3'), Decimal('-1')))
+
+    def test_report_filters_use_indexes(self):
+        for work_logs in [WorkLog.objects.filter(user=self.user, date__gte='2025-03-01'),
+                          WorkLog.objects.filter(project=self.project, date__gte='2025-03-01')]:
+            plan = work_logs.order_by().explain()
+            self.assertNotIn('SCAN api_worklog', plan)
+
+
+class WorkLogEffectiveProjectTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner')
+        self.client.force_authenticate(self.user)
+        self.project = Project.objects.create(name='Project', owner=self.user)
+        self.other_project = Project.objects.create(name='Other', owner=self.user)
+        self.task = Task.objects.create(project=self.project, name='Task')
+
+    def test_follows_task_and_project(self):
+        on_task = WorkLog.objects.create(user=self.user, task=self.task, hours_spent=2)
+        on_project = WorkLog.objects.create(user=self.user, project=self.other_project, hours_spent=1)
+        self.assertEqual((on_task.effective_project_id, on_project.effective_project_id),
+                         (self.project.id, self.other_project.id))
+
+        self.task.project = self.other_project
+        self.task.save()
+        on_task.refresh_from_db()
+        self.assertEqual(on_task.effective_project_id, self.other_project.id)
+
+        response = self.client.get(reverse('project-time-totals', args=[self.other_project.id]))
+        self.assertEqual(response.data['totals']['hours'], Decimal('3'))
+        response = self.client.get(reverse('worklog-list'), {'effective_project_id': self.project.id})
+        self.assertEqual(response.data['results'], [])
+
+    def test_project_totals_of_other_users_are_hidden(self):
+        employee = User.objects.create_user('employee')
+        WorkLog.objects.create(user=self.user, project=self.project, hours_spent=2)
+        WorkLog.objects.create(user=employee, task=self.task, hours_spent=1)
+        url = reverse('project-time-totals', args=[self.project.id])
+        self.assertEqual(self.client.get(url).data['totals']['hours'], Decimal('3'))
+
+        self.client.force_authenticate(employee)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['user_id'] for row in response.data['results']], [employee.id])
+        self.assertEqual(response.data['totals']['hours'], Decimal('1'))
+        self.client.force_authenticate(User.objects.create_user('stranger'))
+        self.assertEqual(self.client.get(url).data['totals'], {'hours': None, 'entries': 0})
+
+    def test_project_totals_use_index(self):
+        plan = WorkLog.objects.filter(effective_project=self.project, date__gte='2025-01-01').order_by().explain()
+        self.assertIn('worklog_eff_project_date_idx', plan)
+
+
+# a LocMem cache is enough for one test process
+@override_settings(RESPONSE_CACHE_ALIAS='default')
+class ResponseCacheTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner')
+        self.client.force_authenticate(self.user)
+        self.project = Project.objects.create(name='Project', owner=self.user)
+        self.task = Task.objects.create(project=self.project, name='Task', assignee=self.user, status='IN_PROGRESS')
+
+    def get(self, url, etag=None):
+        headers = {'If-None-Match': etag} if etag else {}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, headers=headers)
+        return response, len(queries)
+
+    def test_etag_and_invalidation(self):
+        url = reverse('task-list')
+        response, _ = self.get(url)
+        etag = response['ETag']
+        # only the user's project ids and the validators are read: max(updated_at) and a count
+        response, queries = self.get(url, etag)
+        self.assertEqual((response.status_code, queries), (304, 2))
+        response, queries = self.get(url)
+        self.assertEqual((response.status_code, queries), (200, 2))
+
+        # queryset.update(), as in the admin and bulk paths, sends no signals
+        Task.objects.filter(id=self.task.id).update(name='Renamed')
+        response, _ = self.get(url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['name'], 'Renamed')
+
+    def test_bulk_writes_bump_projects_and_users(self):
+        other = User.objects.create_user('other')
+        Task.objects.bulk_create([Task(project=self.project, name=f'Task {i}') for i in range(20)])
+        dependencies = [response_cache.table('task'), ('project', self.project.id), ('user', other.id),
+                        ('user', self.user.id)]
+        before = response_cache.versions(dependencies)
+        # one query for the distinct projects and assignees, whatever the number of rows
+        with CaptureQueriesContext(connection) as queries:
+            Task.objects.filter(project=self.project).update(assignee=other)
+        self.assertEqual(len(queries), 2)
+        self.assertTrue(all(map(str.__ne__, before, response_cache.versions(dependencies))))
+
+        # bulk_update() assigns a Case() per field, read as the new values
+        self.task.assignee = self.user
+        [before] = response_cache.versions([('user', self.user.id)])
+        Task.objects.bulk_update([self.task], ['assignee'])
+        self.assertNotEqual(response_cache.versions([('user', self.user.id)]), [before])
+
+        before = response_cache.versions(dependencies)
+        WorkLog.objects.create(user=self.user, task=self.task, hours_spent=1)
+        self.assertEqual(response_cache.versions(dependencies), before)
+
+    @override_settings(RESPONSE_CACHE_ALIAS=None)
+    def test_disabled(self):
+        url = reverse('task-list')
+        etag = self.get(url)[0]['ETag']
+        self.assertEqual(self.get(url, etag)[0].status_code, 304)
+        response, queries = self.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(queries, 1)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_dashboard_follows_its_projects_only(self):
+        url = reverse('employee-dashboard')
+        etag = self.get(url)[0]['ETag']
+        other = Project.objects.create(name='Other', owner=User.objects.create_user('other'))
+        Task.objects.create(project=other, name='Not mine')
+        self.assertEqual(self.get(url, etag)[0].status_code, 304)
+
+        self.client.post(reverse('task-mark-as-done', args=[self.task.id]))
+        response = self.get(url, etag)[0]
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['my_current_tasks'], [])
+
+    def test_last_modified(self):
+        url = reverse('project-detail', args=[self.project.id])
+        last_modified = self.get(url)[0]['Last-Modified']
+        response = self.client.get(url, headers={'If-Modified-Since': last_modified})
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(url, headers={'If-Modified-Since': 'Thu, 01 Jan 2015 00:00:00 GMT'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_match(self):
+        url = reverse('task-detail', args=[self.task.id])
+        etag = self.get(url)[0]['ETag']
+        response = self.client.patch(url, {'name': 'Mine'}, headers={'If-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.patch(url, {'name': 'Stale'}, headers={'If-Match': etag})
+        self.assertEqual(response.status_code, 412)
+        response = self.client.delete(url, headers={'If-Match': etag})
+        self.assertEqual(response.status_code, 412)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.name, 'Mine')
+
+        response = self.client.delete(url, headers={'If-Match': self.get(url)[0]['ETag']})
+        self.assertEqual(response.status_code, 204)
+
+    def test_tasks_follow_their_project_name(self):
+        for url in [reverse('task-list'), reverse('task-detail', args=[self.task.id])]:
+            with self.subTest(url=url):
+                etag = self.get(url)[0]['ETag']
+                self.project.name = f'Renamed for {url}'
+                self.project.save()
+                response = self.get(url, etag)[0]
+                self.assertEqual(response.status_code, 200)
+                self.assertIn(self.project.name, json.dumps(response.data))
+
+    def test_etags_survive_a_cache_flush(self):
+        # as after a restart, or on another worker with its own cache
+        url = reverse('task-detail', args=[self.task.id])
+        etag = self.get(url)[0]['ETag']
+        response_cache.cache().clear()
+        self.assertEqual(self.get(url, etag)[0].status_code, 304)
+        response_cache.cache().clear()
+        response = self.client.patch(url, {'name': 'Mine'}, headers={'If-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+
+class TaskFeedTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner')
+        self.other = User.objects.create_user('other')
+        self.client.force_authenticate(self.user)
+        self.project = Project.objects.create(name='Project', owner=self.user)
+        self.task = Task.objects.create(project=self.project, name='Task', assignee=self.user)
+
+    def post(self, url, data):
+        def write():
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(url, data, format='json')
+        return write
+
+    def receive(self, write, **scope):
+        """The events a subscription for `scope` gets while `write()` runs."""
+        async def run():
+            subscription = task_feed.broker.subscribe(**scope)
+            try:
+                await sync_to_async(write)()
+                await asyncio.sleep(0)
+                events = []
+                while not subscription.queue.empty():
+                    events.append(subscription.queue.get_nowait())
+                return events
+            finally:
+                task_feed.broker.unsubscribe(subscription)
+        return async_to_sync(run)()
+
+    def test_scoped_events(self):
+        reassign = self.post(reverse('task-bulk-reassign'), {'ids': [self.task.id], 'assignee_id': self.other.id})
+        # the previous assignee hears that the task left them
+        [event] = self.receive(reassign, assignee_ids=[self.user.id])
+        self.assertEqual(event['type'], task_feed.UPDATED)
+        self.assertEqual((event['task']['assignee_id'], event['previous_assignee_id']), (self.other.id, self.user.id))
+        self.assertEqual(event['actor_id'], self.user.id)
+
+        unrelated = Project.objects.create(name='Unrelated', owner=self.other)
+        start = self.post(reverse('task-start-progress', args=[self.task.id]), {})
+        self.assertEqual(self.receive(start, project_ids=[unrelated.id]), [])
+
+        create = self.post(reverse('task-list'), {'project_id': self.project.id, 'name': 'New'})
+        [event] = self.receive(create, project_ids=[self.project.id])
+        self.assertEqual((event['type'], event['task']['name']), (task_feed.CREATED, 'New'))
+
+    def test_stream(self):
+        async def run():
+            client = AsyncClient()
+            await client.aforce_login(self.user)
+            response = await client.get(reverse('async-task-events'), {'project': str(self.project.id)})
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            chunks = aiter(response.streaming_content)
+            self.assertTrue((await anext(chunks)).startswith(b'retry:'))
+
+            def mark_as_done():
+                self.task.status = 'DONE'
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.task.save()
+            await sync_to_async(mark_as_done)()
+            message = (await anext(chunks)).decode()
+            await response.streaming_content.aclose()
+            return message
+        message = async_to_sync(run)()
+        self.assertTrue(message.startswith('event: task.updated\n'))
+        event = json.loads(message.split('data: ', 1)[1])
+        self.assertEqual((event['task']['status'], event['previous_status']), ('DONE', 'TODO'))
+
+
+class AccessTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('employee')
+        self.owner = User.objects.create_user('owner')
+        self.client.force_authenticate(self.user)
+        self.mine = Project.objects.create(name='Mine', owner=self.user)
+        self.shared = Project.objects.create(name='Shared', owner=self.owner)
+        self.hidden = Project.objects.create(name='Hidden', owner=self.owner)
+        Task.objects.create(project=self.mine, name='Own project')
+        self.assigned = Task.objects.create(project=self.shared, name='Assigned', assignee=self.user)
+        Task.objects.create(project=self.shared, name='Teammate', assignee=self.owner)
+        self.hidden_task = Task.objects.create(project=self.hidden, name='Hidden', assignee=self.owner)
+
+    def names(self):
+        return sorted(task['name'] for task in self.client.get(reverse('task-list')).data['results'])
+
+    def test_task_list_is_scoped(self):
+        self.assertEqual(self.names(), ['Assigned', 'Own project', 'Teammate'])
+        response = self.client.get(reverse('task-detail', args=[self.hidden_task.id]))
+        self.assertEqual(response.status_code, 404)
+
+        # assigning a task makes its project visible at once
+        Task.objects.filter(id=self.hidden_task.id).update(assignee=self.user)
+        self.assertEqual(self.names(), ['Assigned', 'Hidden', 'Own project', 'Teammate'])
+
+        # nor does it wait for a cache invalidation, which another worker's write would not send here
+        with mock.patch.object(response_cache, 'bump'):
+            Task.objects.filter(id=self.hidden_task.id).update(assignee=self.owner)
+        self.assertEqual(self.names(), ['Assigned', 'Own project', 'Teammate'])
+
+        Task.objects.create(project=Project.objects.create(name='Other', owner=self.owner), name='Other')
+        self.assertEqual(len(self.names()), 3)
+        self.user.is_staff = True
+        self.assertEqual(len(self.names()), 5)
+
+    def test_project_tasks_are_scoped(self):
+        for project, expected in [(self.shared, ['Assigned', 'Teammate']), (self.hidden, [])]:
+            with self.subTest(project=project.name):
+                response = self.client.get(reverse('project-tasks', args=[project.id]))
+                self.assertEqual(sorted(task['name'] for task in response.data['results']), expected)
+                response = self.client.get(reverse('project-detail', args=[project.id]), {'expand': 'tasks'})
+                self.assertEqual(sorted(task['name'] for task in response.data['tasks']), expected)
+        response = self.client.get(reverse('project-list'), {'expand': 'tasks'})
+        self.assertEqual(sorted(task['name'] for project in response.data['results'] for task in project['tasks']),
+                         ['Assigned', 'Own project', 'Teammate'])
+
+    def test_object_checks_compare_ids(self):
+        request = self.client.get(reverse('task-list')).wsgi_request
+        request.method = 'POST'
+        tasks = Task.objects.only('id', 'name', 'project_id', 'assignee_id').in_bulk()
+        permission = IsAssigneeOrProjectOwner()
+        with self.assertNumQueries(1):
+            access.project_ids(request)
+        with self.assertNumQueries(0):
+            allowed = sorted(task.name for task in tasks.values()
+                             if permission.has_object_permission(request, None, task))
+        self.assertEqual(allowed, ['Assigned', 'Own project'])
+
+
+# 'default' stands in for the replica alias, so the router's choice shows as 'default' vs None
+@override_settings(DATABASE_READ_ALIAS='default')
+class ReadReplicaRoutingTests(TransactionTestCase):
+    # outside of a test transaction, which would keep reads on default
+    def route(self, request, atomic=False):
+        def get_response(request):
+            if atomic:
+                with transaction.atomic():
+                    alias = ReadReplicaRouter().db_for_read(Task)
+            else:
+                alias = ReadReplicaRouter().db_for_read(Task)
+            response = HttpResponse()
+            response.alias = alias
+            return response
+        return ReadReplicaMiddleware(get_response)(request)
+
+    def test_safe_requests_read_from_replica(self):
+        factory = RequestFactory()
+        self.assertEqual(self.route(factory.get('/')).alias, 'default')
+        self.assertIsNone(self.route(factory.get('/'), atomic=True).alias)
+        self.assertIsNone(ReadReplicaRouter().db_for_read(Task))
+
+    def test_writes_pin_the_client(self):
+        factory = RequestFactory()
+        response = self.route(factory.post('/'))
+        self.assertIsNone(response.alias)
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        request = factory.get('/')
+        request.COOKIES[PIN_COOKIE] = response.cookies[PIN_COOKIE].value
+        self.assertIsNone(self.route(request).alias)
+
+    @override_settings(RESPONSE_CACHE_ALIAS='default')
+    def test_replica_reads_are_not_cached(self):
+        cache.clear()
+        user = User.objects.create_user('owner')
+        Task.objects.create(project=Project.objects.create(name='Project', owner=user), name='Task')
+        client = APIClient()
+        client.force_authenticate(user)
+
+        def count_queries(pinned):
+            client.cookies.clear()
+            if pinned:
+                client.cookies[PIN_COOKIE] = '1'
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(client.get(reverse('task-list')).status_code, 200)
+            return len(queries)
+
+        # built twice from the replica, then cached by the first read from default: only the
+        # user's project ids and the validators are read after that
+        built = count_queries(pinned=False)
+        self.assertEqual(count_queries(pinned=False), built)
+        self.assertEqual(count_queries(pinned=True), built)
+        self.assertEqual(count_queries(pinned=True), 2)
+
+
+class SqliteTuningTests(TestCase):
+    def test_pragmas_are_applied(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings_dict = {**connection.settings_dict, 'NAME': os.path.join(directory, 'tuned.sqlite3'),
+                         'OPTIONS': dict(settings.SQLITE_TUNED_OPTIONS), 'CONN_MAX_AGE': 0}
+        tuned = load_backend(settings_dict['ENGINE']).DatabaseWrapper(settings_dict, alias='tuned')
+        self.addCleanup(tuned.close)
+        with tuned.cursor() as cursor:
+            pragmas = {}
+            for name in ['journal_mode', 'synchronous', 'busy_timeout', 'temp_store']:
+                cursor.execute(f'PRAGMA {name}')
+                pragmas[name] = cursor.fetchone()[0]
+        # synchronous NORMAL is 1, temp_store MEMORY is 2
+        self.assertEqual(pragmas, {'journal_mode': 'wal', 'synchronous': 1,
+                                   'busy_timeout': settings.SQLITE_PRAGMAS['busy_timeout'], 'temp_store': 2})
+
+
+class BenchmarkTests(TestCase):
+    def test_run_and_compare(self):
+        user = benchmarks.generate(users=3, projects=2, tasks=20, worklogs=30)[0]
+        self.assertEqual((Task.objects.count(), WorkLog.objects.count()), (20, 30))
+
+        results = benchmarks.run(user, ['task-list', 'worklog-create'], iterations=2)
+        self.assertEqual(results['task-list']['statuses'], {'200': 2})
+        self.assertEqual(results['worklog-create']['statuses'], {'201': 2})
+        self.assertGreater(results['task-list']['queries'], 0)
+
+        slower = json.loads(json.dumps(results))
+        slower['task-list']['p95_ms'] = results['task-list']['p95_ms'] * 2 + 1
+        _, regressions = benchmarks.compare({'results': results}, {'results': slower})
+        self.assertEqual([(name, metric) for name, metric, *_ in regressions], [('task-list', 'p95_ms')])
+
+        # failing scenarios are reported, and not compared
+        slower['task-list']['statuses'] = {'200': 1, '500': 1}
+        self.assertEqual(benchmarks.failures(slower), {'task-list': {'200': 1, '500': 1}})
+        rows, regressions = benchmarks.compare({'results': results}, {'results': slower})
+        self.assertEqual(({name for name, *_ in rows}, regressions), ({'worklog-create'}, []))
+
+    def test_generated_work_logs_have_a_task_or_a_project(self):
+        benchmarks.generate(users=2, projects=2, tasks=10, worklogs=50)
+        self.assertFalse(WorkLog.objects.filter(task__isnull=False, project__isnull=False).exists())
+        self.assertFalse(WorkLog.objects.filter(task__isnull=True, project__isnull=True).exists())
+        for work_log in WorkLog.objects.select_related('task'):
+            self.assertEqual(work_log.effective_project_id, work_log.project_id or work_log.task.project_id)
+
+    def test_scenarios_succeed(self):
+        server = benchmarks.FakeQuickChartServer(('127.0.0.1', 0), benchmarks.FakeQuickChartHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.shutdown)
+        user = benchmarks.generate(users=3, projects=2, tasks=20, worklogs=30)[0]
+        url = f'http://127.0.0.1:{server.server_port}/chart'
+        with override_settings(CHART_BACKEND='quickchart', QUICK_CHART_API_URL=url):
+            results = benchmarks.run(user, iterations=1)
+        self.assertEqual(benchmarks.failures(results), {})
+
+
+class RequestMetricsTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner')
+        self.client.force_authenticate(self.user)
+        project = Project.objects.create(name='Project', owner=self.user)
+        Task.objects.create(project=project, name='Task', assignee=self.user)
+
+    def test_server_timing(self):
+        response = self.client.get(reverse('task-list'))
+        timings = {entry.split(';')[0]: entry for entry in response['Server-Timing'].split(', ')}
+        self.assertEqual(set(timings), {'db', 'serialize', 'total'})
+        self.assertIn('desc="Database (', timings['db'])
+
+    def test_async_requests_time_their_queries(self):
+        # under ASGI the queries run in sync_to_async() threads, not on the event loop's
+        async def get(url):
+            client = AsyncClient()
+            await client.aforce_login(self.user)
+            return await client.get(url)
+
+        for url in [reverse('async-employee-dashboard'), reverse('project-list')]:
+            with self.subTest(url=url):
+                response = async_to_sync(get)(url)
+                self.assertEqual(response.status_code, 200)
+                timings = {entry.split(';')[0]: entry for entry in response['Server-Timing'].split(', ')}
+                self.assertIn('db', timings)
+
+    @override_settings(REQUEST_SLOW_MS=0, REQUEST_PROFILE_RATE=1)
+    def test_slow_requests_are_profiled(self):
+        with self.assertLogs('api.metrics', 'WARNING') as logs:
+            self.client.get(reverse('task-list'))
+        request_line, profile = logs.output
+        self.assertIn('status=200', request_line)
+        self.assertIn('db_queries=', request_line)
+        self.assertIn('slowest queries', profile)
+        self.assertIn('FROM "api_task"', profile)
+
+    def test_http_time(self):
+        server = benchmarks.FakeQuickChartServer(('127.0.0.1', 0), benchmarks.FakeQuickChartHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.shutdown)
+
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            HttpClient('test').post(f'http://127.0.0.1:{server.server_port}/chart', json={})
+        finally:
+            current_metrics.reset(token)
+        self.assertEqual(metrics.counts['http'], 1)
+        self.assertGreater(metrics.seconds['http'], 0)
@@ -0,0 +1,137 @@
+"""
+Timesheet and estimate reports, aggregated with one grouped query each.
+
+A work log counts towards its effective project: its own project, or its task's project when it is
+logged on a task.
+Reports whose date range ended before today cover closed periods only. Those are cached under a
+key that includes max(updated_at) and the count of the work logs they are built from, read with one
+aggregate query, so any write to those logs, including a back-dated one, a delete, or a write from
+another worker, keys a fresh entry. The cached rows hold ids only; the user, project and task names
+are added after the cache lookup, so that renames show at once.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db.models import Count, DecimalField, F, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import Project, Task
+
+# name -> (grouped field, model, name field, name key in the rows)
+GROUPINGS = {
+    'user': ('user_id', User, 'username', 'username'),
+    'project': ('effective_project_id', Project, 'name', 'project_name'),
+    'task': ('task_id', Task, 'name', 'task_name'),
+}
+RENAMED = {'effective_project_id': 'project_id'}
+
+PERIODS = {
+    'day': F('date'),
+    'week': TruncWeek('date'),
+    'month': TruncMonth('date'),
+}
+
+
+def _rename(row):
+    return {RENAMED.get(key, key): value for key, value in row.items()}
+
+
+def timesheet_totals(work_logs, group_by, period=None):
+    """timesheet_report() without the names, as cached."""
+    fields = [GROUPINGS[name][0] for name in group_by]
+    expressions = {'period_start': PERIODS[period]} if period else {}
+    # periods first, then the groupings in the order asked for
+    ordering = (['period_start'] if period else []) + fields
+
+    rows = work_logs.order_by().values(*fields, **expressions).annotate(
+        hours=Sum('hours_spent'),
+        entries=Count('id'),
+    ).order_by(*ordering)
+    totals = work_logs.order_by().aggregate(hours=Sum('hours_spent'), entries=Count('id'))
+    return {'results': [_rename(row) for row in rows], 'totals': totals}
+
+
+def add_names(report, group_by):
+    """The rows of `report` with the names of their users, projects and tasks, one query per grouping."""
+    names = {}
+    for name in group_by:
+        field, model, name_field, _ = GROUPINGS[name]
+        field = RENAMED.get(field, field)
+        ids = {row[field] for row in report['results']} - {None}
+        names[name] = dict(model.objects.filter(pk__in=ids).values_list('pk', name_field)) if ids else {}
+    results = []
+    for row in report['results']:
+        named = {key: value for key, value in row.items() if key not in ('hours', 'entries')}
+        for name in group_by:
+            field, _, _, key = GROUPINGS[name]
+            named[key] = names[name].get(row[RENAMED.get(field, field)])
+        results.append({**named, 'hours': row['hours'], 'entries': row['entries']})
+    return {'results': results, 'totals': report['totals']}
+
+
+def timesheet_report(work_logs, group_by, period=None):
+    """Hours and entry counts for `work_logs`, grouped by the names in `group_by` and optionally by period."""
+    return add_names(timesheet_totals(work_logs, group_by, period), group_by)
+
+
+def estimate_report(tasks, date_after=None, date_before=None):
+    """Estimated vs logged hours per task, for tasks with an estimate or with hours logged in the range."""
+    in_range = Q()
+    if date_after:
+        in_range &= Q(work_logs__date__gte=date_after)
+    if date_before:
+        in_range &= Q(work_logs__date__lte=date_before)
+    zero = Value(0, output_field=DecimalField(max_digits=12, decimal_places=2))
+    rows = tasks.order_by().annotate(
+        logged_hours=Coalesce(Sum('work_logs__hours_spent', filter=in_range), zero),
+    ).filter(
+        Q(estimation_hours__isnull=False) | Q(logged_hours__gt=0)
+    ).values(
+        'id', 'name', 'status', 'project_id', 'assignee_id', 'estimation_hours', 'logged_hours',
+        project_name=F('project__name'),
+    ).order_by('project_id', 'id')
+
+    results = []
+    totals = {'estimation_hours': 0, 'logged_hours': 0, 'tasks': 0, 'over_estimate': 0}
+    for row in rows:
+        estimate, logged = row['estimation_hours'], row['logged_hours']
+        row['variance_hours'] = logged - estimate if estimate is not None else None
+        results.append(row)
+        totals['tasks'] += 1
+        totals['logged_hours'] += logged
+        totals['estimation_hours'] += estimate or 0
+        totals['over_estimate'] += int(estimate is not None and logged > estimate)
+    return {'results': results, 'totals': totals}
+
+
+# Caching of closed periods
+
+def cache():
+    return caches[settings.TIMESHEET_CACHE_ALIAS]
+
+
+def is_closed(date_before):
+    return date_before is not None and date_before < timezone.localdate()
+
+
+def cache_key(kind, scope, params, work_logs):
+    validators = work_logs.order_by().aggregate(modified=Max('updated_at'), count=Count('id'))
+    material = [params, validators['modified'], validators['count']]
+    digest = hashlib.sha256(json.dumps(material, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    return f'timesheets:{kind}:{scope}:{digest}'
+
+
+def cached_report(kind, scope, params, work_logs, build):
+    """build(), cached while `work_logs` are unchanged when `params` cover closed periods only."""
+    if not is_closed(params.get('date_before')):
+        return build()
+    key = cache_key(kind, scope, params, work_logs)
+    report = cache().get(key)
+    if report is None:
+        report = build()
+        cache().set(key, report, settings.TIMESHEET_CACHE_TTL)
+    return report
@@ -1,8 +1,12 @@
-from django.urls import path, include
+from django.urls import path, re_path, include
 from rest_framework.routers import DefaultRouter
 
 from .views import ProjectViewSet, TaskViewSet, BusinessStatisticsViews, \
-    UserPersonalStatsView, WorkLogViewSet, OwnerDashboardView, EmployeeDashboardView
+    UserPersonalStatsView, WorkLogViewSet, OwnerDashboardView, EmployeeDashboardView, ChartImageView, \
+    ChartBatchView, TimesheetReportView, EstimateReportView
+
+from .async_views import AsyncProjectVelocityChartView, AsyncTaskStatusChartView, AsyncBusinessStatisticsView, \
+    AsyncUserPersonalStatsView, AsyncOwnerDashboardView, AsyncEmployeeDashboardView, AsyncTaskFeedView
 
 router = DefaultRouter()
 router.register(r'projects', ProjectViewSet, basename='project')
@@ -18,4 +22,22 @@ urlpatterns = [
     # New path
     path('dashboards/owner/', OwnerDashboardView.as_view(), name='owner-dashboard'),
     path('dashboards/employee/', EmployeeDashboardView.as_view(), name='employee-dashboard'),
+    path('reports/timesheets/', TimesheetReportView.as_view(), name='timesheet-report'),
+    path('reports/estimates/', EstimateReportView.as_view(), name='estimate-report'),
+    path('charts/batch/', ChartBatchView.as_view(), name='chart-batch'),
+    re_path(r'^charts/(?P<name>[0-9a-f]{32}\.(?:png|svg))$', ChartImageView.as_view(), name='chart-image'),
+
+    # Async (ASGI) versions of the chart and dashboard endpoints
+    path('async/projects/<int:pk>/velocity-chart/', AsyncProjectVelocityChartView.as_view(),
+         name='async-project-velocity-chart'),
+    path('async/projects/<int:pk>/task-status-chart/', AsyncTaskStatusChartView.as_view(),
+         name='async-project-task-status-chart'),
+    path('async/statistics/business/story-points-monthly/', AsyncBusinessStatisticsView.as_view(),
+         name='async-business-stats-story-points'),
+    path('async/me/statistics/task-completion-chart/', AsyncUserPersonalStatsView.as_view(),
+         name='async-user-personal-task-stats'),
+    path('async/dashboards/owner/', AsyncOwnerDashboardView.as_view(), name='async-owner-dashboard'),
+    path('async/dashboards/employee/', AsyncEmployeeDashboardView.as_view(), name='async-employee-dashboard'),
+    # Server-Sent Events of task changes (see api.task_feed)
+    path('async/tasks/events/', AsyncTaskFeedView.as_view(), name='async-task-events'),
 ]
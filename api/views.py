@@ -1,29 +1,122 @@
-from django.db.models import Count, Sum
-from django.utils import timezone
-from django.db.models.functions import TruncMonth, TruncWeek
+import os
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.http import FileResponse, Http404
+from django.views import View
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
 
 from .models import Project, Task, WorkLog
 from .permissions import IsProjectOwner, IsAssigneeOrProjectOwner, IsWorkLogOwner
-from .serializers import ProjectSerializer, TaskSerializer, WorkLogSerializer
-from .filters import TaskFilter
+from .serializers import ProjectSerializer, ProjectSummarySerializer, TaskSerializer, TaskSimpleSerializer, \
+    WorkLogSerializer, ChartBatchSerializer, TaskStatusEventSerializer, TaskBulkSerializer, \
+    TaskBulkTransitionSerializer, TaskBulkReassignSerializer, ReportParamsSerializer
+from .filters import TaskFilter, TaskSearchFilter, TaskOrderingFilter, WorkLogFilter
+from .pagination import KeysetCursorPagination, WorkLogCursorPagination
 from .quickchart_helper import get_chart_url
-from .chart_templates import (
-    get_base_pie_chart_config,
-    get_base_bar_chart_config,
-    get_base_line_chart_config
-)
-
-
-class ProjectViewSet(viewsets.ModelViewSet):
-    queryset = Project.objects.all().prefetch_related('tasks')
+from . import access, bulk, charts, exports, response_cache, timesheets, worklog_import
+from .dashboards import owned_projects_with_task_counts, owner_summary_stats
+from .chart_renderer import CONTENT_TYPES
+from .task_events import acting_as
+from .db_routers import replica_reads
+from .middleware import pinned_to_default
+
+
+def export_response(request, queryset, columns, filename):
+    export_format = request.query_params.get('export_format', exports.CSV)
+    if export_format not in exports.FORMATS:
+        return Response({'detail': f"Unknown export format; use one of {', '.join(exports.FORMATS)}."}, status=400)
+    return exports.export_response(queryset, columns, export_format, filename)
+
+
+def chart_response(request, chart_config):
+    chart_url = get_chart_url(chart_config)
+    if chart_url:
+        return Response({'chart_url': request.build_absolute_uri(chart_url)})
+    else:
+        return Response({'error': 'Could not generate chart URL.'}, status=500)
+
+
+class ConditionalViewSetMixin:
+    """
+    Cached list and retrieve responses with ETag and Last-Modified (see api.response_cache), and
+    If-Match checks on update and destroy. Subclasses give the cache dependencies and the
+    validators of their list and detail responses.
+    """
+    list_dependencies = []
+
+    def detail_dependencies(self, pk):
+        raise NotImplementedError
+
+    def list_validators(self):
+        raise NotImplementedError
+
+    def detail_validators(self, pk):
+        raise NotImplementedError
+
+    def list(self, request, *args, **kwargs):
+        return response_cache.cached_response(
+            request, f'{self.basename}-list', self.list_dependencies,
+            partial(super().list, request, *args, **kwargs), self.list_validators()
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs['pk']
+        try:
+            validators = self.detail_validators(pk)
+        except (TypeError, ValueError):
+            raise Http404
+        return response_cache.cached_response(
+            request, f'{self.basename}-detail', self.detail_dependencies(pk),
+            partial(super().retrieve, request, *args, **kwargs), validators
+        )
+
+    def check_if_match(self, instance):
+        # lock the row so that two writers holding the same ETag cannot both pass
+        type(instance).objects.select_for_update().filter(pk=instance.pk).exists()
+        response_cache.check_if_match(self.request, f'{self.basename}-detail', self.detail_validators(instance.pk))
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        self.check_if_match(serializer.instance)
+        with acting_as(self.request.user):
+            serializer.save()
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        self.check_if_match(instance)
+        instance.delete()
+
+
+class ProjectViewSet(ConditionalViewSetMixin, viewsets.ModelViewSet):
+    queryset = Project.objects.all()
     serializer_class = ProjectSerializer
     permission_classes = [permissions.IsAuthenticated]
+    list_dependencies = [response_cache.table('project'), response_cache.table('task')]
+
+    def get_queryset(self):
+        return ProjectSerializer.setup_eager_loading(super().get_queryset(), self.request)
+
+    def detail_dependencies(self, pk):
+        return [('project', pk)]
+
+    def list_validators(self):
+        return response_cache.combine_validators(
+            response_cache.queryset_validators(Project.objects.all()),
+            response_cache.queryset_validators(Task.objects.all()),
+        )
+
+    def detail_validators(self, pk):
+        return response_cache.combine_validators(
+            response_cache.queryset_validators(Project.objects.filter(pk=pk)),
+            response_cache.queryset_validators(Task.objects.filter(project_id=pk)),
+        )
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
@@ -31,7 +124,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
     def get_permissions(self):
         if self.action in ['update', 'partial_update', 'destroy']:
             self.permission_classes = [permissions.IsAuthenticated, IsProjectOwner]
-        elif self.action == 'task_status_chart':
+        elif self.action in ['task_status_chart', 'burndown_chart', 'time_totals']:
             self.permission_classes = [permissions.IsAuthenticated,
                                        IsProjectOwner]
         else:
@@ -44,149 +137,185 @@ class ProjectViewSet(viewsets.ModelViewSet):
     def project_velocity_chart(self, request, pk=None):
         project = self.get_object()
         # За замовчуванням - щотижнева швидкість за останні 3 місяці
-        three_months_ago = timezone.now() - timezone.timedelta(days=90)
-
-        velocity_data = Task.objects.filter(
-            project=project,
-            status='DONE',
-            story_points__isnull=False,
-            updated_at__gte=three_months_ago
-        ).annotate(
-            period_start=TruncWeek('updated_at')
-        ).values('period_start').annotate(
-            total_story_points=Sum('story_points')
-        ).order_by('period_start')
+        velocity_data = charts.velocity_by_project([project.id]).get(project.id)
 
         if not velocity_data:
-            return Response({"message": "Not enough data to calculate project velocity."}, status=404)
+            return Response({"message": charts.EMPTY_MESSAGES[charts.VELOCITY]}, status=404)
 
-        labels = [item['period_start'].strftime('%Y-W%W') for item in velocity_data]
-        data = [item['total_story_points'] for item in velocity_data]
-
-        chart_config = get_base_line_chart_config()
-        chart_config['data']['labels'] = labels
-        chart_config['data']['datasets'][0]['label'] = f'Project Velocity (Story Points per Week)'
-        chart_config['data']['datasets'][0]['data'] = data
-        chart_config['options']['plugins']['title']['text'] = f'Velocity for Project: {project.name}'
-
-        chart_url = get_chart_url(chart_config)
-        if chart_url:
-            return Response({'chart_url': chart_url})
-        else:
-            return Response({'error': 'Could not generate chart URL.'}, status=500)
+        return chart_response(request, charts.velocity_chart_config(project, velocity_data))
 
     @action(detail=True, methods=['get'], url_path='task-status-chart')
     def task_status_chart(self, request, pk=None):
         project = self.get_object()
-        task_statuses = project.tasks.values('status').annotate(count=Count('status')).order_by('status')
+        task_statuses = charts.task_status_by_project([project.id]).get(project.id)
 
         if not task_statuses:
-            return Response({"message": "No tasks found for this project to generate a chart."}, status=404)
-
-        labels = [item['status'] for item in task_statuses]
-        data = [item['count'] for item in task_statuses]
-
-        chart_config = get_base_pie_chart_config()
-        chart_config['data']['labels'] = labels
-        chart_config['data']['datasets'][0]['data'] = data
-        chart_config['options']['plugins']['title']['text'] = f'Task Status Distribution for {project.name}'
-        # Can customize color
-        # default_colors = chart_config['data']['datasets'][0]['backgroundColor']
-        # chart_config['data']['datasets'][0]['backgroundColor'] = [default_colors[i % len(default_colors)] for i in range(len(labels))]
-
-        chart_url = get_chart_url(chart_config)
-        if chart_url:
-            return Response({'chart_url': chart_url})
-        else:
-            return Response({'error': 'Could not generate chart URL.'}, status=500)
+            return Response({"message": charts.EMPTY_MESSAGES[charts.TASK_STATUS]}, status=404)
+
+        return chart_response(request, charts.task_status_chart_config(project, task_statuses))
+
+    @action(detail=True, methods=['get'], url_path='burndown-chart')
+    def burndown_chart(self, request, pk=None):
+        project = self.get_object()
+        burndown_data = charts.burndown_by_day(project.id)
+
+        if not any(item['remaining_story_points'] for item in burndown_data):
+            return Response({"message": charts.EMPTY_MESSAGES[charts.BURNDOWN]}, status=404)
+
+        return chart_response(request, charts.burndown_chart_config(project, burndown_data))
+
+    @action(detail=True, methods=['get'], url_path='time-totals')
+    def time_totals(self, request, pk=None):
+        """
+        Hours logged on the project and its tasks, per user and optional ?period=, within ?date_after=&date_before=.
+        Like the timesheet report, users other than the owner (and staff) only see their own hours.
+        """
+        project = self.get_object()
+        serializer = ReportParamsSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        work_logs = WorkLog.objects.filter(effective_project=project)
+        # IsProjectOwner lets every GET through
+        if not (request.user.is_staff or project.owner_id == request.user.id):
+            work_logs = work_logs.filter(user=request.user)
+        if 'date_after' in params:
+            work_logs = work_logs.filter(date__gte=params['date_after'])
+        if 'date_before' in params:
+            work_logs = work_logs.filter(date__lte=params['date_before'])
+        return Response(timesheets.timesheet_report(work_logs, params['group_by'], params.get('period')))
+
+    @action(detail=True, methods=['get'], url_path='tasks')
+    def tasks(self, request, pk=None):
+        """The project's tasks, paginated, for projects too large to embed with ?expand=tasks."""
+        project = self.get_object()
+        queryset = access.visible_tasks(request, Task.objects.filter(project=project).select_related('assignee'))
+        page = self.paginate_queryset(queryset)
+        serializer = TaskSimpleSerializer(page, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
 
 
 class BusinessStatisticsViews(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, format=None):
-        one_year_ago = timezone.now() - timezone.timedelta(days=365)
-
-        completed_tasks_monthly = Task.objects.filter(
-            status='DONE',
-            updated_at__gte=one_year_ago,
-            story_points__isnull=False
-        ).annotate(
-            month=TruncMonth('updated_at')
-        ).values('month').annotate(
-            total_story_points=Sum('story_points')
-        ).order_by('month')
+        completed_tasks_monthly = charts.business_story_points_monthly()
 
         if not completed_tasks_monthly:
-            return Response({"message": "No completed tasks with story points found for the last year."}, status=404)
-
-        labels = [item['month'].strftime('%Y-%m') for item in completed_tasks_monthly]
-        data = [item['total_story_points'] for item in completed_tasks_monthly]
-
-        chart_config = get_base_bar_chart_config()
-        chart_config['data']['labels'] = labels
-        chart_config['data']['datasets'][0]['label'] = 'Completed Story Points'
-        chart_config['data']['datasets'][0]['data'] = data
-        chart_config['options']['plugins']['title']['text'] = 'Monthly Completed Story Points (Last Year)'
-        # Can customize color
-        # chart_config['data']['datasets'][0]['backgroundColor'] = 'rgba(54, 162, 235, 0.7)'
-        # chart_config['data']['datasets'][0]['borderColor'] = 'rgba(54, 162, 235, 1)'
-
-        chart_url = get_chart_url(chart_config)
-        if chart_url:
-            return Response({'chart_url': chart_url})
-        else:
-            return Response({'error': 'Could not generate chart URL.'}, status=500)
+            return Response({"message": charts.EMPTY_MESSAGES[charts.BUSINESS_STORY_POINTS]}, status=404)
+
+        return chart_response(request, charts.business_story_points_chart_config(completed_tasks_monthly))
+
+
+class ChartImageView(View):
+    """Serves images rendered by the local chart backend. Names are content hashes, so they never change."""
+
+    def get(self, request, name):
+        path = os.path.join(settings.CHART_STORAGE_DIR, name)
+        if not os.path.exists(path):
+            raise Http404("Chart not found.")
+        response = FileResponse(open(path, 'rb'), content_type=CONTENT_TYPES[name.rsplit('.', 1)[1]])
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return response
 
 
 class UserPersonalStatsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, format=None):
-        user = request.user
-        one_year_ago = timezone.now() - timezone.timedelta(days=365)
-
-        completed_tasks_monthly = Task.objects.filter(
-            assignee=user,
-            status='DONE',
-            updated_at__gte=one_year_ago
-        ).annotate(
-            month=TruncMonth('updated_at')
-        ).values('month').annotate(
-            tasks_count=Count('id')
-        ).order_by('month')
+        completed_tasks_monthly = charts.personal_completions_monthly(request.user)
 
         if not completed_tasks_monthly:
-            return Response({"message": "You have no completed tasks in the last year."}, status=404)
-
-        labels = [item['month'].strftime('%Y-%m') for item in completed_tasks_monthly]
-        data = [item['tasks_count'] for item in completed_tasks_monthly]
-
-        chart_config = get_base_line_chart_config()
-        chart_config['data']['labels'] = labels
-        chart_config['data']['datasets'][0]['label'] = 'My Completed Tasks'
-        chart_config['data']['datasets'][0]['data'] = data
-        chart_config['options']['plugins']['title']['text'] = 'My Monthly Task Completions (Last Year)'
-        # Can customize color
-        # chart_config['data']['datasets'][0]['borderColor'] = 'rgba(255, 99, 132, 0.9)'
-        # chart_config['data']['datasets'][0]['backgroundColor'] = 'rgba(255, 99, 132, 0.2)'
-
-        chart_url = get_chart_url(chart_config)
-        if chart_url:
-            return Response({'chart_url': chart_url})
-        else:
-            return Response({'error': 'Could not generate chart URL.'}, status=500)
+            return Response({"message": charts.EMPTY_MESSAGES[charts.PERSONAL_COMPLETIONS]}, status=404)
+
+        return chart_response(request, charts.personal_completions_chart_config(completed_tasks_monthly))
 
 
-class TaskViewSet(viewsets.ModelViewSet):
+class ChartBatchView(APIView):
+    """
+    Builds several charts in one request: data for each chart type is aggregated with one grouped
+    query, and the chart URLs are generated concurrently.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, format=None):
+        # only reads, so the aggregations may use the replica like the GET statistics endpoints
+        with replica_reads(not pinned_to_default(request)):
+            return self.build_charts(request)
+
+    def build_charts(self, request):
+        serializer = ChartBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        specs = serializer.validated_data['charts']
+
+        project_ids = {spec['project_id'] for spec in specs if spec['type'] in charts.PROJECT_CHART_TYPES}
+        projects = Project.objects.in_bulk(project_ids)
+
+        velocity = {}
+        for days in {spec['days'] for spec in specs if spec['type'] == charts.VELOCITY}:
+            ids = [spec['project_id'] for spec in specs if spec['type'] == charts.VELOCITY and spec['days'] == days]
+            velocity[days] = charts.velocity_by_project(ids, days=days)
+        task_statuses = charts.task_status_by_project(
+            [spec['project_id'] for spec in specs if spec['type'] == charts.TASK_STATUS]
+        ) if any(spec['type'] == charts.TASK_STATUS for spec in specs) else {}
+        monthly = {}
+
+        results, configs = [], []
+        for spec in specs:
+            result = {key: value for key, value in spec.items() if value is not None}
+            results.append(result)
+            chart_type, days = spec['type'], spec['days']
+
+            project = None
+            if chart_type in charts.PROJECT_CHART_TYPES:
+                project = projects.get(spec['project_id'])
+                # like the GET chart endpoints, which serve any project's charts to authenticated users
+                if project is None:
+                    result.update(status=404, message="Project not found.")
+                    continue
+
+            if chart_type == charts.VELOCITY:
+                data = velocity[days].get(project.id)
+                chart_config = data and charts.velocity_chart_config(project, data)
+            elif chart_type == charts.TASK_STATUS:
+                data = task_statuses.get(project.id)
+                chart_config = data and charts.task_status_chart_config(project, data)
+            elif chart_type == charts.BUSINESS_STORY_POINTS:
+                if (chart_type, days) not in monthly:
+                    monthly[chart_type, days] = charts.business_story_points_monthly(days=days)
+                data = monthly[chart_type, days]
+                chart_config = data and charts.business_story_points_chart_config(data)
+            else:
+                if (chart_type, days) not in monthly:
+                    monthly[chart_type, days] = charts.personal_completions_monthly(request.user, days=days)
+                data = monthly[chart_type, days]
+                chart_config = data and charts.personal_completions_chart_config(data)
+
+            if not data:
+                result.update(status=404, message=charts.EMPTY_MESSAGES[chart_type])
+                continue
+            configs.append((result, chart_config))
+
+        chart_urls = charts.get_chart_urls([config for _, config in configs])
+        for (result, _), chart_url in zip(configs, chart_urls):
+            if chart_url:
+                result.update(status=200, chart_url=request.build_absolute_uri(chart_url))
+            else:
+                result.update(status=500, error='Could not generate chart URL.')
+
+        return Response({'charts': results})
+
+
+class TaskViewSet(ConditionalViewSetMixin, viewsets.ModelViewSet):
     queryset = Task.objects.all().select_related('project', 'assignee')
     serializer_class = TaskSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, TaskSearchFilter, TaskOrderingFilter]
     filterset_class = TaskFilter
     search_fields = ['name', 'description', 'project__name']
     ordering_fields = ['created_at', 'deadline', 'status', 'name']
     ordering = ['-created_at']
+    pagination_class = KeysetCursorPagination
+    list_dependencies = [response_cache.table('task'), response_cache.table('project')]
 
     # def get_permissions(self):
     #     if self.action in ['update', 'partial_update', 'destroy']:
@@ -197,13 +326,33 @@ class TaskViewSet(viewsets.ModelViewSet):
     #             self.permission_classes = [permissions.IsAuthenticated]
     #         return super().get_permissions()
 
+    def get_queryset(self):
+        return access.visible_tasks(self.request, super().get_queryset())
+
+    def detail_dependencies(self, pk):
+        # the task itself is covered by the validators
+        return [response_cache.table('project')]
+
+    # tasks render their project's name, so a project rename changes them too
+    def list_validators(self):
+        return response_cache.queryset_validators(self.filter_queryset(self.get_queryset()), related=['project'])
+
+    def detail_validators(self, pk):
+        # empty for a task the user cannot see, so no 304 is given for it
+        return response_cache.queryset_validators(self.get_queryset().filter(pk=pk), related=['project'])
+
+    def perform_create(self, serializer):
+        with acting_as(self.request.user):
+            serializer.save()
+
     @action(detail=True, methods=['post'], url_path='start-progress',
             permission_classes=[permissions.IsAuthenticated, IsAssigneeOrProjectOwner])
     def start_progress(self, request, pk=None):
         task = self.get_object()
         if task.status == 'TODO':
             task.status = 'IN_PROGRESS'
-            task.save()
+            with acting_as(request.user):
+                task.save()
             return Response({'status': 'Task moved to In Progress', 'task_status': task.status})
         return Response({'status': 'Task cannot be moved to In Progress from current state'}, status=400)
 
@@ -212,21 +361,66 @@ class TaskViewSet(viewsets.ModelViewSet):
         task = self.get_object()
         if task.status == 'IN_PROGRESS':
             task.status = 'DONE'
-            task.completed_at = timezone.now()
-            task.updated_at = timezone.now()
-            task.save()
+            with acting_as(request.user):
+                task.save()
             return Response({'status': 'Task marked as Done', 'task_status': task.status})
         return Response({'status': 'Task cannot be marked as Done from current state'}, status=400)
 
+    @action(detail=False, methods=['post'], url_path='bulk-create')
+    def bulk_create(self, request):
+        """{"tasks": [<task>, ...]}: creates the valid tasks in one transaction, one result per item."""
+        serializer = TaskBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response({'results': bulk.bulk_create_tasks(request, serializer.validated_data['tasks'])})
+
+    @action(detail=False, methods=['patch'], url_path='bulk-update')
+    def bulk_update(self, request):
+        """{"tasks": [{"id": 1, <fields>}, ...]}: partial updates of several tasks."""
+        serializer = TaskBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response({'results': bulk.bulk_update_tasks(request, serializer.validated_data['tasks'])})
+
+    @action(detail=False, methods=['post'], url_path='bulk-transition')
+    def bulk_transition(self, request):
+        """{"ids": [...], "status": "IN_PROGRESS" | "DONE"}, with the rules of start-progress and mark-as-done."""
+        serializer = TaskBulkTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        return Response({'results': bulk.bulk_transition_tasks(request, data['ids'], data['status'])})
+
+    @action(detail=False, methods=['post'], url_path='bulk-reassign')
+    def bulk_reassign(self, request):
+        """{"ids": [...], "assignee_id": <user id or null>}."""
+        serializer = TaskBulkReassignSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        return Response({'results': bulk.bulk_reassign_tasks(request, data['ids'], data['assignee_id'])})
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        """All tasks matching the list filters as a streamed ?export_format=csv (default) or ndjson file."""
+        return export_response(request, self.filter_queryset(self.get_queryset()), exports.TASK_COLUMNS, 'tasks')
+
+    @action(detail=True, methods=['get'], url_path='history')
+    def history(self, request, pk=None):
+        """The task's status transitions, oldest first."""
+        task = self.get_object()
+        events = task.status_events.select_related('actor')
+        return Response(TaskStatusEventSerializer(events, many=True).data)
+
 class WorkLogViewSet(viewsets.ModelViewSet):
     queryset = WorkLog.objects.all()
     serializer_class = WorkLogSerializer
     permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = WorkLogFilter
+    pagination_class = WorkLogCursorPagination
 
     def get_queryset(self):
+        queryset = WorkLog.objects.select_related('user')
         if self.request.user.is_staff:
-            return WorkLog.objects.all()
-        return WorkLog.objects.filter(user=self.request.user)
+            return queryset
+        return queryset.filter(user=self.request.user)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -236,6 +430,94 @@ class WorkLogViewSet(viewsets.ModelViewSet):
             return [permissions.IsAuthenticated(), IsWorkLogOwner()]
         return super().get_permissions()
 
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        """The visible work logs matching the filters (e.g. ?date_after=&date_before=) as a streamed file."""
+        return export_response(request, self.filter_queryset(self.get_queryset()), exports.WORK_LOG_COLUMNS, 'worklogs')
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_work_logs(self, request):
+        """
+        Imports a timesheet streamed as the request body (text/csv or application/x-ndjson) or uploaded
+        as `file`. ?import_format=csv|jsonl overrides the detected format. Staff may set user_id per row.
+        """
+        upload = request.FILES.get('file') if request.content_type.startswith('multipart/') else None
+        if upload is not None:
+            lines, detected = upload, worklog_import.guess_format(upload.content_type, upload.name)
+        else:
+            lines, detected = request._request, worklog_import.guess_format(request.content_type)
+        import_format = request.query_params.get('import_format', detected)
+        if import_format not in worklog_import.FORMATS:
+            return Response({'detail': f"Unknown import format; use one of {', '.join(worklog_import.FORMATS)}."},
+                            status=400)
+        report = worklog_import.WorkLogImport(request.user, allow_other_users=request.user.is_staff).run(
+            lines, import_format
+        )
+        return Response(report, status=201 if report['created'] else 400)
+
+
+class ReportView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_params(self, request):
+        serializer = ReportParamsSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    def get_scope(self, request):
+        return 'staff' if request.user.is_staff else f'user-{request.user.id}'
+
+
+class TimesheetReportView(ReportView):
+    """
+    Logged hours grouped by ?group_by=user,project,task and optionally ?period=day|week|month, for the
+    work logs the user may see: their own, and those on projects they own (staff see all).
+    """
+
+    def get(self, request, format=None):
+        params = self.get_params(request)
+        work_logs = self.get_work_logs(request, params)
+        report = timesheets.cached_report(
+            'timesheet', self.get_scope(request), params, work_logs,
+            lambda: timesheets.timesheet_totals(work_logs, params['group_by'], params.get('period'))
+        )
+        return Response(timesheets.add_names(report, params['group_by']))
+
+    def get_work_logs(self, request, params):
+        user = request.user
+        work_logs = WorkLog.objects.all()
+        if not user.is_staff:
+            work_logs = work_logs.filter(Q(user=user) | Q(effective_project__owner=user))
+        if 'date_after' in params:
+            work_logs = work_logs.filter(date__gte=params['date_after'])
+        if 'date_before' in params:
+            work_logs = work_logs.filter(date__lte=params['date_before'])
+        if 'user_id' in params:
+            work_logs = work_logs.filter(user_id=params['user_id'])
+        if 'task_id' in params:
+            work_logs = work_logs.filter(task_id=params['task_id'])
+        if 'project_id' in params:
+            work_logs = work_logs.filter(effective_project_id=params['project_id'])
+        return work_logs
+
+
+class EstimateReportView(ReportView):
+    """Estimated vs logged hours per task, for tasks in the user's projects or assigned to them."""
+
+    def get(self, request, format=None):
+        params = self.get_params(request)
+        user = request.user
+        tasks = Task.objects.all()
+        if not user.is_staff:
+            tasks = tasks.filter(Q(project__owner=user) | Q(assignee=user))
+        if 'project_id' in params:
+            tasks = tasks.filter(project_id=params['project_id'])
+        if 'user_id' in params:
+            tasks = tasks.filter(assignee_id=params['user_id'])
+        if 'task_id' in params:
+            tasks = tasks.filter(id=params['task_id'])
+        return Response(timesheets.estimate_report(tasks, params.get('date_after'), params.get('date_before')))
+
 
 class OwnerDashboardView(APIView):
     permission_classes = [permissions.IsAuthenticated] # switch to IsBusinessOwner later
@@ -245,29 +527,26 @@ class OwnerDashboardView(APIView):
         if not user.profile.is_owner:
             return Response({"detail": "Not authorized"}, status=403)
 
-        owned_projects = Project.objects.filter(owner=user)
-        active_projects_count = owned_projects.filter(tasks__status__in=['TODO', 'IN_PROGRESS']).distinct().count()
-        total_projects_count = owned_projects.count()
-
-        tasks_in_owned_projects = Task.objects.filter(project__owner=user)
-        total_tasks = tasks_in_owned_projects.count()
-        todo_tasks = tasks_in_owned_projects.filter(status='TODO').count()
-        inprogress_tasks = tasks_in_owned_projects.filter(status='IN_PROGRESS').count()
-        done_tasks = tasks_in_owned_projects.filter(status='DONE').count()
-
-        projects_data = ProjectSerializer(owned_projects, many=True, context={'request': request}).data
+        project_ids = Project.objects.filter(owner=user).values_list('id', flat=True)
+        validators = response_cache.combine_validators(
+            response_cache.queryset_validators(Project.objects.filter(owner=user)),
+            response_cache.queryset_validators(Task.objects.filter(project__owner=user)),
+        )
+        return response_cache.cached_response(
+            request, 'owner-dashboard', [('user', user.id), *(('project', pk) for pk in project_ids)],
+            partial(self.build, request), validators
+        )
+
+    def build(self, request):
+        user = request.user
+        # one query: per-project task counts, summed up for the summary stats
+        owned_projects = list(owned_projects_with_task_counts(user))
+        projects_data = ProjectSummarySerializer(owned_projects, many=True, context={'request': request}).data
         # business_stats_chart_url = request.build_absolute_uri(reverse('business-stats-story-points'))
 
 
         dashboard_data = {
-            'summary_stats': {
-                'total_projects': total_projects_count,
-                'active_projects': active_projects_count,
-                'total_tasks': total_tasks,
-                'tasks_todo': todo_tasks,
-                'tasks_inprogress': inprogress_tasks,
-                'tasks_done': done_tasks,
-            },
+            'summary_stats': owner_summary_stats(owned_projects),
             'projects_list': projects_data,
             # 'charts': {
             #     'business_story_points_monthly_url': business_stats_chart_url,
@@ -281,14 +560,30 @@ class EmployeeDashboardView(APIView):
 
     def get(self, request, format=None):
         user = request.user
+        project_ids = Task.objects.filter(assignee=user).order_by().values_list('project_id', flat=True).distinct()
+        validators = response_cache.combine_validators(
+            response_cache.queryset_validators(Project.objects.filter(id__in=project_ids)),
+            response_cache.queryset_validators(Task.objects.filter(project_id__in=project_ids)),
+        )
+        return response_cache.cached_response(
+            request, 'employee-dashboard', [('user', user.id), *(('project', pk) for pk in project_ids)],
+            partial(self.build, request), validators
+        )
+
+    def build(self, request):
+        user = request.user
 
         assigned_task_projects_ids = Task.objects.filter(assignee=user).values_list('project_id', flat=True).distinct()
-        involved_projects = Project.objects.filter(id__in=assigned_task_projects_ids)
+        involved_projects = ProjectSerializer.setup_eager_loading(
+            Project.objects.filter(id__in=assigned_task_projects_ids), request
+        )
         projects_data = ProjectSerializer(involved_projects, many=True, context={'request': request}).data
 
         # add logic for Team
 
-        current_tasks = Task.objects.filter(assignee=user, status__in=['TODO', 'IN_PROGRESS'])
+        current_tasks = Task.objects.filter(
+            assignee=user, status__in=['TODO', 'IN_PROGRESS']
+        ).select_related('project', 'assignee')
         current_tasks_data = TaskSerializer(current_tasks, many=True, context={'request': request}).data
 
         # personal_task_completion_chart_url = request.build_absolute_uri(reverse('user-personal-task-stats'))
@@ -0,0 +1,140 @@
+"""
+Streaming import of work logs from CSV or JSON Lines, behind POST /worklogs/import/ and
+`manage.py import_worklogs`.
+
+Rows are read lazily and handled in chunks: each chunk resolves its user, task and project ids with
+one query per model (also giving each log its effective project), applies the task-xor-project rule of WorkLogSerializer and bulk-inserts its
+valid rows in its own transaction, so memory stays flat however long the upload is. Invalid rows are
+skipped and reported with their line number.
+"""
+import codecs
+import csv
+import json
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from rest_framework.exceptions import ErrorDetail
+
+from .models import Project, Task, WorkLog
+from .serializers import WorkLogImportRowSerializer
+
+CSV = 'csv'
+JSONL = 'jsonl'
+FORMATS = [CSV, JSONL]
+CONTENT_TYPES = {
+    'text/csv': CSV,
+    'application/x-ndjson': JSONL,
+    'application/jsonl': JSONL,
+    'application/x-jsonlines': JSONL,
+}
+
+CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+
+def guess_format(content_type=None, filename=None):
+    if content_type in CONTENT_TYPES:
+        return CONTENT_TYPES[content_type]
+    extension = (filename or '').rsplit('.', 1)[-1].lower()
+    if extension in ('jsonl', 'ndjson'):
+        return JSONL
+    if extension == CSV:
+        return CSV
+    return None
+
+
+def read_rows(lines, format):
+    """Yields (line number, row dict, error) for an iterable of byte lines."""
+    lines = codecs.iterdecode(lines, 'utf-8-sig')
+    if format == CSV:
+        reader = csv.DictReader(lines)
+        for row in reader:
+            # empty cells mean "not set", as a missing key does in JSON
+            yield reader.line_num, {key: value for key, value in row.items() if key and value not in ('', None)}, None
+        return
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, None, {'non_field_errors': [f'Invalid JSON: {e}']}
+            continue
+        if not isinstance(row, dict):
+            yield number, None, {'non_field_errors': ['Expected a JSON object.']}
+            continue
+        yield number, row, None
+
+
+class WorkLogImport:
+    def __init__(self, user, allow_other_users=False, chunk_size=CHUNK_SIZE):
+        self.user = user
+        self.allow_other_users = allow_other_users
+        self.chunk_size = chunk_size
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def run(self, lines, format):
+        chunk = []
+        for row in read_rows(lines, format):
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                self.import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self.import_chunk(chunk)
+        return self.report()
+
+    def report(self):
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': sorted(self.errors, key=lambda error: error['line']),
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+    def fail(self, line, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def import_chunk(self, chunk):
+        rows = []
+        for line, row, error in chunk:
+            if error:
+                self.fail(line, error)
+                continue
+            serializer = WorkLogImportRowSerializer(data=row)
+            if not serializer.is_valid():
+                self.fail(line, serializer.errors)
+                continue
+            data = serializer.validated_data
+            data.setdefault('user_id', self.user.id)
+            rows.append((line, data))
+
+        def existing(model, field, column='id'):
+            ids = {data.get(field) for _, data in rows} - {None}
+            return dict(model.objects.filter(id__in=ids).values_list('id', column)) if ids else {}
+
+        users, projects = existing(User, 'user_id'), existing(Project, 'project_id')
+        task_projects = existing(Task, 'task_id', 'project_id')
+
+        work_logs = []
+        for line, data in rows:
+            errors = {}
+            for field, ids in (('user_id', users), ('task_id', task_projects), ('project_id', projects)):
+                if data.get(field) is not None and data[field] not in ids:
+                    errors[field] = [ErrorDetail(f'Invalid pk "{data[field]}" - object does not exist.', code='does_not_exist')]
+            if data['user_id'] != self.user.id and not self.allow_other_users:
+                errors['user_id'] = [ErrorDetail('You can only import your own work logs.', code='permission_denied')]
+            if errors:
+                self.fail(line, errors)
+                continue
+            # bulk_create skips WorkLog.save(), which would set this
+            effective_project_id = data.get('project_id') or task_projects[data['task_id']]
+            work_logs.append(WorkLog(**data, effective_project_id=effective_project_id))
+
+        with transaction.atomic():
+            WorkLog.objects.bulk_create(work_logs, batch_size=self.chunk_size)
+        self.created += len(work_logs)
@@ -46,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -53,6 +54,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.ReadReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'employeest_be.urls'
@@ -78,12 +80,108 @@ WSGI_APPLICATION = 'employeest_be.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# SQLite unless POSTGRES_DB is set. A read replica is added as 'replica' when DB_REPLICA_NAME (an SQLite
+# file, refreshed with `manage.py sync_replica`) or POSTGRES_REPLICA_HOST is set; see api.db_routers.
+# Connections are kept for DB_CONN_MAX_AGE seconds, or pooled with DB_POOL_SIZE on PostgreSQL (psycopg[pool]).
+# The default is 60 on PostgreSQL and 0 on SQLite, where opening a connection costs no round trip.
+
+DB_CONN_MAX_AGE = os.environ.get('DB_CONN_MAX_AGE')
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 0))
+
+# SQLITE_TUNED=1 sets these on every SQLite connection, for several workers sharing the file: WAL lets
+# reads run alongside the writer, IMMEDIATE transactions take the write lock up front instead of
+# failing to upgrade a read lock, and writers wait busy_timeout ms for the lock before giving up.
+# Compare with `manage.py bench_sqlite_concurrency`.
+SQLITE_TUNED = os.environ.get('SQLITE_TUNED', '').lower() in ('1', 'true', 'yes')
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    # negative: in KiB rather than pages
+    'cache_size': -int(os.environ.get('SQLITE_CACHE_KB', 64 * 1024)),
+    'temp_store': 'MEMORY',
+}
+SQLITE_TUNED_OPTIONS = {
+    'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000,
+}
+
+
+def postgres_database(host):
+    database = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ['POSTGRES_DB'],
+        'USER': os.environ.get('POSTGRES_USER', 'postgres'),
+        'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+        'HOST': host,
+        'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+        'CONN_MAX_AGE': int(DB_CONN_MAX_AGE or 60),
+        'CONN_HEALTH_CHECKS': True,
+    }
+    if DB_POOL_SIZE:
+        # pooled connections are returned after each request instead of being kept
+        database.update(CONN_MAX_AGE=0, OPTIONS={'pool': {'min_size': 1, 'max_size': DB_POOL_SIZE}})
+    return database
 
-DATABASES = {
-    'default': {
+
+def sqlite_database(name):
+    return {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': name,
+        'CONN_MAX_AGE': int(DB_CONN_MAX_AGE or 0),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': dict(SQLITE_TUNED_OPTIONS) if SQLITE_TUNED else {},
+    }
+
+
+if os.environ.get('POSTGRES_DB'):
+    DATABASES = {'default': postgres_database(os.environ.get('POSTGRES_HOST', 'localhost'))}
+    if os.environ.get('POSTGRES_REPLICA_HOST'):
+        DATABASES['replica'] = postgres_database(os.environ['POSTGRES_REPLICA_HOST'])
+else:
+    DATABASES = {'default': sqlite_database(BASE_DIR / 'db.sqlite3')}
+    if os.environ.get('DB_REPLICA_NAME'):
+        DATABASES['replica'] = sqlite_database(os.environ['DB_REPLICA_NAME'])
+if 'replica' in DATABASES:
+    # tests read the replica through the default connection
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['api.db_routers.ReadReplicaRouter']
+DATABASE_READ_ALIAS = 'replica'
+# How long a client reads from default after its own write
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+
+
+# Shared Redis cache when REDIS_URL is set (needs the redis package), otherwise per-process memory
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
     }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'employeest',
+            'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 10000))},
+        }
+    }
+
+# Versioned cache of list, detail and dashboard responses (api.response_cache). Writes invalidate it by
+# replacing version tokens in this cache, which a per-process LocMem cache would hide from the other
+# workers, so it is off (None) unless REDIS_URL gives a shared one. Point RESPONSE_CACHE_ALIAS at a LocMem
+# alias only when a single process serves the API. ETags and 304s do not depend on it.
+RESPONSE_CACHE_ALIAS = os.environ.get('RESPONSE_CACHE_ALIAS') or ('default' if os.environ.get('REDIS_URL') else None)
+RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 300))
+
+
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.CreatedAtCursorPagination',
+    'PAGE_SIZE': int(os.environ.get('API_PAGE_SIZE', 50)),
 }
 
 
@@ -127,3 +225,63 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Charts
+# CHART_BACKEND is 'quickchart' (external QuickChart API) or 'local' (rendered in-process and served from /api/v1/charts/)
+
+CHART_BACKEND = os.environ.get('CHART_BACKEND', 'quickchart')
+QUICK_CHART_API_URL = os.environ.get('QUICK_CHART_API_URL', 'https://quickchart.io/chart')
+CHART_RENDER_TIMEOUT = float(os.environ.get('CHART_RENDER_TIMEOUT', 10))
+CHART_STORAGE_DIR = os.environ.get('CHART_STORAGE_DIR', BASE_DIR / 'chart_images')
+CHART_RENDER_PROCESSES = int(os.environ.get('CHART_RENDER_PROCESSES', 0))
+# Threads used by /api/v1/charts/batch/ to generate chart URLs concurrently
+CHART_BATCH_WORKERS = int(os.environ.get('CHART_BATCH_WORKERS', 4))
+
+# Chart URLs are cached in-process; set CHART_CACHE_ALIAS to one of CACHES to share them between workers
+CHART_CACHE_TTL = int(os.environ.get('CHART_CACHE_TTL', 3600))
+CHART_CACHE_MAX_ENTRIES = int(os.environ.get('CHART_CACHE_MAX_ENTRIES', 1024))
+CHART_CACHE_ALIAS = os.environ.get('CHART_CACHE_ALIAS') or None
+
+# Pooled HTTP client used by the QuickChart backend
+QUICKCHART_CONNECT_TIMEOUT = float(os.environ.get('QUICKCHART_CONNECT_TIMEOUT', 3))
+QUICKCHART_READ_TIMEOUT = float(os.environ.get('QUICKCHART_READ_TIMEOUT', 10))
+QUICKCHART_RETRIES = int(os.environ.get('QUICKCHART_RETRIES', 2))
+QUICKCHART_RETRY_BACKOFF = float(os.environ.get('QUICKCHART_RETRY_BACKOFF', 0.3))
+QUICKCHART_POOL_SIZE = int(os.environ.get('QUICKCHART_POOL_SIZE', 10))
+QUICKCHART_CIRCUIT_FAILURES = int(os.environ.get('QUICKCHART_CIRCUIT_FAILURES', 5))
+QUICKCHART_CIRCUIT_RESET = float(os.environ.get('QUICKCHART_CIRCUIT_RESET', 30))
+
+# Timesheet reports covering closed periods (ending before today) are cached under max(updated_at) and the count of
+# their work logs, so a per-process cache never serves a report that another worker's write changed
+TIMESHEET_CACHE_ALIAS = os.environ.get('TIMESHEET_CACHE_ALIAS', 'default')
+TIMESHEET_CACHE_TTL = int(os.environ.get('TIMESHEET_CACHE_TTL', 24 * 3600))
+
+# Task change feed (Server-Sent Events at /api/v1/async/tasks/events/, served under ASGI)
+# TASK_FEED_BACKEND is 'memory' (events reach the streams of the same process) or 'redis' (all workers)
+TASK_FEED_BACKEND = os.environ.get('TASK_FEED_BACKEND', 'memory')
+TASK_FEED_REDIS_URL = os.environ.get('TASK_FEED_REDIS_URL', os.environ.get('REDIS_URL', 'redis://localhost:6379/0'))
+TASK_FEED_CHANNEL = os.environ.get('TASK_FEED_CHANNEL', 'employeest:task-feed')
+TASK_FEED_QUEUE_SIZE = int(os.environ.get('TASK_FEED_QUEUE_SIZE', 1000))
+TASK_FEED_HEARTBEAT = float(os.environ.get('TASK_FEED_HEARTBEAT', 15))
+TASK_FEED_RETRY_MS = int(os.environ.get('TASK_FEED_RETRY_MS', 3000))
+
+# Per-request metrics (api.middleware.RequestMetricsMiddleware): a Server-Timing header with database,
+# serialization and external HTTP time, and a log line per request on the api.metrics logger
+REQUEST_METRICS = os.environ.get('REQUEST_METRICS', '1').lower() in ('1', 'true', 'yes')
+REQUEST_SLOW_MS = float(os.environ.get('REQUEST_SLOW_MS', 1000))
+# Share of requests run under cProfile with their queries captured; slow ones are logged with both
+REQUEST_PROFILE_RATE = float(os.environ.get('REQUEST_PROFILE_RATE', 0))
+REQUEST_PROFILE_DIR = os.environ.get('REQUEST_PROFILE_DIR') or None
+
+# API_LOG_LEVEL=INFO also shows a line per request and per QuickChart call
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api': {'handlers': ['console'], 'level': os.environ.get('API_LOG_LEVEL', 'WARNING')},
+    },
+}